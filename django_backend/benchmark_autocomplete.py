@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Autocomplete Benchmark
+Per-keystroke lookup latency of the prefix index against istartswith queries on a large fleet
+Usage: python benchmark_autocomplete.py [boats]
+"""
+import os
+import sys
+import random
+import time
+import django
+from decimal import Decimal
+
+# Set up Django environment
+sys.path.append('.')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yachtak_api.settings')
+django.setup()
+
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import setup_test_environment
+from boats.autocomplete import build_index
+from boats.models import Boat
+
+BOATS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+LOOKUPS = 2000
+LOCATIONS = ['El Gouna, Egypt', 'Hurghada Marina', 'Sahl Hasheesh', 'Soma Bay', 'Port Ghalib', 'Marsa Alam']
+MODELS = ['D28', 'D36', 'D42', 'D50', 'D60']
+WORDS = ['Sea', 'Blue', 'Desert', 'Red', 'Coral', 'Golden', 'Silver', 'Wind', 'Star', 'Dream', 'Pearl', 'Lady']
+
+
+def seed():
+    boats = []
+    for i in range(BOATS):
+        boats.append(Boat(
+            name=f'{random.choice(WORDS)} {random.choice(WORDS)} {i}', model=random.choice(MODELS),
+            capacity=10, length=Decimal('12.80'), location=random.choice(LOCATIONS),
+            daily_rate=Decimal('1800.00'),
+        ))
+        if len(boats) == 10000:
+            Boat.objects.bulk_create(boats)
+            boats = []
+    Boat.objects.bulk_create(boats)
+
+
+def keystrokes():
+    """Every prefix of the queries a user might type"""
+    words = [word.lower() for word in WORDS] + ['hurghada', 'marsa', 'd4', 'port g', 'sea star 12']
+    prefixes = []
+    for word in words:
+        prefixes.extend(word[:n] for n in range(1, len(word) + 1))
+    return [random.choice(prefixes) for _ in range(LOOKUPS)]
+
+
+def percentiles(timings):
+    timings.sort()
+    return timings[len(timings) // 2] * 1e6, timings[int(len(timings) * 0.99)] * 1e6
+
+
+def main():
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"⌨️  Autocomplete benchmark: {BOATS} boats, {LOOKUPS} keystrokes")
+        seed()
+        started = time.perf_counter()
+        index = build_index()
+        print(f"   index built in {(time.perf_counter() - started) * 1e3:.0f} ms ({len(index)} suggestions)")
+
+        queries = keystrokes()
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            index.lookup(query)
+            timings.append(time.perf_counter() - started)
+        median, p99 = percentiles(timings)
+        print(f"   prefix index      median {median:8.1f} µs, p99 {p99:8.1f} µs")
+
+        timings = []
+        for query in queries[:200]:
+            started = time.perf_counter()
+            list(Boat.objects.filter(
+                Q(name__istartswith=query) | Q(model__istartswith=query) | Q(location__istartswith=query)
+            ).values_list('name', 'model', 'location')[:10])
+            timings.append(time.perf_counter() - started)
+        median, p99 = percentiles(timings)
+        print(f"   istartswith query median {median:8.1f} µs, p99 {p99:8.1f} µs")
+        print("✅ Autocomplete benchmark complete")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
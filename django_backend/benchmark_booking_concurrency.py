@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Concurrent Booking Benchmark
+Hammers /bookings/rental/ from many threads and checks for double bookings
+Usage: python benchmark_booking_concurrency.py [threads] [requests_per_thread]
+"""
+import os
+import sys
+import json
+import random
+import threading
+import time
+import django
+from datetime import date, timedelta
+from decimal import Decimal
+
+# Set up Django environment
+sys.path.append('.')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yachtak_api.settings')
+django.setup()
+
+import logging
+logging.disable(logging.WARNING)
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment
+from boats.models import Boat
+from bookings.models import Booking
+
+THREADS = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+REQUESTS = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+DAYS = 60
+
+
+def run(boat_ids):
+    """Every thread books random two-day stays on random boats"""
+    barrier = threading.Barrier(THREADS)
+    statuses = []
+
+    def worker(n):
+        try:
+            client = Client()
+            barrier.wait()
+            for i in range(REQUESTS):
+                start = date.today() + timedelta(days=1 + random.randint(0, DAYS))
+                response = client.post('/bookings/rental/', json.dumps({
+                    'boat_id': random.choice(boat_ids),
+                    'contact_phone': f'+2010{n:03d}{i:05d}',
+                    'start_date': start.isoformat(),
+                    'end_date': (start + timedelta(days=1)).isoformat(),
+                }), content_type='application/json')
+                statuses.append(response.status_code)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(THREADS)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statuses, time.perf_counter() - started
+
+
+def double_bookings():
+    """Pairs of active bookings on the same boat with overlapping dates"""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT COUNT(*) FROM bookings_booking a JOIN bookings_booking b
+              ON a.boat_id = b.boat_id AND a.id < b.id
+             AND a.start_date <= b.end_date AND b.start_date <= a.end_date
+             AND a.status IN ('confirmed', 'pending') AND b.status IN ('confirmed', 'pending')
+        """)
+        return cursor.fetchone()[0]
+
+
+def main():
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"🔒 Concurrent booking benchmark: {THREADS} threads x {REQUESTS} requests")
+        for label, boat_count in [('one hot boat', 1), ('32 boats', 32)]:
+            Booking.objects.all().delete()
+            Boat.objects.all().delete()
+            boat_ids = [
+                Boat.objects.create(
+                    name=f'Yacht {i}', model='D42', capacity=10, length=Decimal('12.80'),
+                    location='Hurghada', daily_rate=Decimal('1000.00'),
+                ).id for i in range(boat_count)
+            ]
+            statuses, elapsed = run(boat_ids)
+            print(f"   {label}: {len(statuses) / elapsed:.0f} requests/s, "
+                  f"{statuses.count(201)} booked, {statuses.count(400)} refused, "
+                  f"{sum(1 for s in statuses if s >= 500)} errors, "
+                  f"{double_bookings()} double bookings")
+        print("✅ Concurrent booking benchmark complete")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Full-Text Search Benchmark
+Times /boats/text-search/ against a LIKE scan over the same columns on a large synthetic fleet
+Usage: python benchmark_fulltext.py [boats]
+"""
+import os
+import sys
+import random
+import time
+import django
+from decimal import Decimal
+
+# Set up Django environment
+sys.path.append('.')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yachtak_api.settings')
+django.setup()
+
+from django.db import connection
+from django.db.models import Exists, OuterRef, Q
+from django.test import Client
+from django.test.utils import setup_test_environment
+from boats.fulltext import parse_query, rebuild_index
+from boats.models import Boat, BoatFeature
+
+BOATS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+SEARCHES = 50
+LOCATIONS = ['El Gouna, Egypt', 'Hurghada Marina', 'Sahl Hasheesh', 'Soma Bay', 'Port Ghalib']
+MODELS = ['D28', 'D36', 'D42', 'D50', 'D60']
+WORDS = ['spacious', 'cruiser', 'family', 'sunset', 'diving', 'luxury', 'classic', 'fast', 'quiet', 'sailing']
+FEATURES = ['Flybridge', 'Jacuzzi', 'Tender', 'Jet ski', 'Snorkel gear', 'Air conditioning', 'Watermaker']
+QUERIES = [
+    'flybridge hurghada 12 guests', 'jacuzzi gouna', 'diving soma bay', 'luxury d50',
+    'tender sunset 8 guests', 'watermaker port ghalib', 'classic sail',
+]
+
+
+def seed():
+    boats = []
+    for i in range(BOATS):
+        boats.append(Boat(
+            name=f'Yacht {i}', model=random.choice(MODELS), capacity=random.randint(4, 16),
+            length=Decimal('12.80'), location=random.choice(LOCATIONS), daily_rate=Decimal('1800.00'),
+            description=' '.join(random.sample(WORDS, 4)),
+        ))
+        if len(boats) == 10000:
+            Boat.objects.bulk_create(boats)
+            boats = []
+    Boat.objects.bulk_create(boats)
+
+    features = []
+    for boat_id in Boat.objects.values_list('id', flat=True).iterator(chunk_size=10000):
+        for name in random.sample(FEATURES, 3):
+            features.append(BoatFeature(boat_id=boat_id, feature_name=name, feature_value='Yes'))
+        if len(features) >= 30000:
+            BoatFeature.objects.bulk_create(features)
+            features = []
+    BoatFeature.objects.bulk_create(features)
+
+
+def like_search(text, limit=20):
+    """The LIKE scan the index replaces: every term in some column, unranked"""
+    terms, min_capacity = parse_query(text)
+    boats = Boat.objects.filter(is_active=True, allow_public_rental=True, capacity__gte=min_capacity)
+    for term in terms:
+        feature = BoatFeature.objects.filter(boat=OuterRef('pk'), feature_name__icontains=term)
+        boats = boats.filter(
+            Q(name__icontains=term) | Q(model__icontains=term) | Q(location__icontains=term)
+            | Q(description__icontains=term) | Exists(feature)
+        )
+    return list(boats.values_list('id', flat=True)[:limit])
+
+
+def report(label, timings):
+    timings.sort()
+    print(f"   {label:<22} median {timings[len(timings) // 2] * 1e3:8.2f} ms, "
+          f"p95 {timings[int(len(timings) * 0.95)] * 1e3:8.2f} ms")
+
+
+def main():
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"🔎 Full-text search benchmark: {BOATS} boats ({connection.vendor})")
+        started = time.perf_counter()
+        seed()
+        print(f"   seeded in {time.perf_counter() - started:.1f} s")
+        started = time.perf_counter()
+        rebuild_index()
+        print(f"   indexed in {time.perf_counter() - started:.1f} s")
+
+        client = Client()
+        indexed, scanned = [], []
+        found = 0
+        for i in range(SEARCHES):
+            query = QUERIES[i % len(QUERIES)]
+            started = time.perf_counter()
+            response = client.get('/boats/text-search/', {'q': query})
+            indexed.append(time.perf_counter() - started)
+            found += response.json()['count']
+
+            started = time.perf_counter()
+            like_search(query)
+            scanned.append(time.perf_counter() - started)
+
+        report('indexed, ranked', indexed)
+        report('LIKE scan, unranked', scanned)
+        print(f"   average boats returned: {found / SEARCHES:.1f}")
+        print("✅ Full-text search benchmark complete")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Occupancy Index Benchmark
+Compares indexed conflict checks with the per-request ORM overlap query
+Usage: python benchmark_occupancy.py [bookings_per_boat]
+"""
+import os
+import sys
+import random
+import time
+import django
+from datetime import date, timedelta
+from decimal import Decimal
+
+# Set up Django environment
+sys.path.append('.')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yachtak_api.settings')
+django.setup()
+
+from django.db import connection
+from django.test.utils import setup_test_environment
+from django.contrib.auth import get_user_model
+from boats.models import Boat
+from bookings.models import Booking, CalendarEvent
+from bookings.occupancy import get_occupancy_index, invalidate_occupancy
+
+User = get_user_model()
+
+BOOKINGS_PER_BOAT = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+QUERIES = 2000
+
+
+def seed(boat, user):
+    """Lay out back-to-back 1-3 day bookings with periodic maintenance"""
+    bookings = []
+    events = []
+    day = date(2020, 1, 1)
+    for i in range(BOOKINGS_PER_BOAT):
+        length = random.randint(0, 2)
+        bookings.append(Booking(
+            boat=boat, user=user, status=random.choice(['confirmed', 'pending', 'cancelled']),
+            start_date=day, end_date=day + timedelta(days=length),
+        ))
+        if i % 50 == 0:
+            events.append(CalendarEvent(
+                boat=boat, event_type='maintenance', title='Service',
+                start_date=day, end_date=day + timedelta(days=1),
+            ))
+        day += timedelta(days=length + random.randint(1, 3))
+    Booking.objects.bulk_create(bookings, batch_size=2000)
+    CalendarEvent.objects.bulk_create(events, batch_size=2000)
+    return date(2020, 1, 1), day
+
+
+def timed(label, fn, probes):
+    started = time.perf_counter()
+    for start, end in probes:
+        fn(start, end)
+    elapsed = time.perf_counter() - started
+    print(f"   {label:<28} {elapsed / len(probes) * 1e6:9.1f} µs/check")
+    return elapsed
+
+
+def main():
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        boat = Boat.objects.create(
+            name='Bench', model='D42', capacity=10, length=Decimal('12.80'),
+            location='Hurghada', daily_rate=Decimal('1000.00'),
+        )
+        user = User.objects.create(phone='+201000009999')
+        first_day, last_day = seed(boat, user)
+        span = (last_day - first_day).days
+
+        print(f"🚤 Occupancy benchmark: {BOOKINGS_PER_BOAT} bookings on one boat")
+        probes = []
+        for _ in range(QUERIES):
+            start = first_day + timedelta(days=random.randint(0, span))
+            probes.append((start, start + timedelta(days=random.randint(0, 6))))
+
+        invalidate_occupancy()
+        started = time.perf_counter()
+        index = get_occupancy_index(boat.id)
+        print(f"   index build                  {(time.perf_counter() - started) * 1e3:9.1f} ms ({len(index)} intervals)")
+
+        def orm_check(start, end):
+            return Booking.objects.filter(
+                boat=boat, status__in=['confirmed', 'pending'],
+                start_date__lte=end, end_date__gte=start,
+            ).exists()
+
+        orm = timed('ORM overlap query', orm_check, probes)
+        cached = timed('index is_free', index.is_free, probes)
+        timed('index conflicts', index.conflicts, probes)
+        timed('index is_free (verify=True)',
+              lambda s, e: get_occupancy_index(boat.id, verify=True).is_free(s, e), probes)
+        print(f"✅ Cached index is {orm / cached:.0f}x faster than the ORM query")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
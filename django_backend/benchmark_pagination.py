@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Pagination Benchmark
+Compares OFFSET paging with the keyset cursors behind /bookings/list/ at increasing depth
+Usage: python benchmark_pagination.py [bookings]
+"""
+import os
+import sys
+import random
+import time
+import django
+from datetime import date, timedelta
+from decimal import Decimal
+
+# Set up Django environment
+sys.path.append('.')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yachtak_api.settings')
+django.setup()
+
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import setup_test_environment
+from django.contrib.auth import get_user_model
+from boats.models import Boat
+from bookings.models import Booking
+from yachtak_api.pagination import encode_cursor, paginate
+
+User = get_user_model()
+
+BOOKINGS = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+PAGE_SIZE = 50
+REPEATS = 20
+
+
+def seed():
+    """A fleet's worth of booking history with many identical timestamps"""
+    users = [User.objects.create(phone=f'+2010000{i:05d}') for i in range(50)]
+    boats = [
+        Boat.objects.create(
+            name=f'Benchmark Yacht {i}', model='D42', capacity=10,
+            length=Decimal('12.80'), location='El Gouna, Egypt', daily_rate=Decimal('1800.00'),
+        )
+        for i in range(20)
+    ]
+    today = date.today()
+    batch = []
+    for i in range(BOOKINGS):
+        start = today + timedelta(days=random.randint(-700, 700))
+        batch.append(Booking(
+            boat=random.choice(boats), user=random.choice(users),
+            status=random.choice(['confirmed', 'pending', 'cancelled']),
+            start_date=start, end_date=start + timedelta(days=random.randint(0, 3)),
+        ))
+        if len(batch) == 10000:
+            Booking.objects.bulk_create(batch)
+            batch = []
+    Booking.objects.bulk_create(batch)
+
+
+def median_ms(fn):
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2] * 1e3
+
+
+def offset_page(offset):
+    """The old approach: ORDER BY ... LIMIT ... OFFSET"""
+    query = Booking.objects.select_related('boat', 'user').order_by('-created_at', '-id')
+    return list(query[offset:offset + PAGE_SIZE])
+
+
+def keyset_page(request):
+    """The new approach: seek past the cursor, as /bookings/list/ does"""
+    query = Booking.objects.select_related('boat', 'user')
+    return paginate(query, request, ('-created_at', '-id'))[0]
+
+
+def cursor_at(depth):
+    """Cursor for the page starting depth rows in, built from the row just before it"""
+    if depth == 0:
+        return None
+    row = Booking.objects.order_by('-created_at', '-id').values_list('created_at', 'id')[depth - 1]
+    return encode_cursor(list(row))
+
+
+def main():
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"📄 Pagination benchmark: {BOOKINGS} bookings, {PAGE_SIZE} per page")
+        seed()
+        factory = RequestFactory()
+
+        depths = [0, BOOKINGS // 100, BOOKINGS // 10, BOOKINGS // 2, BOOKINGS - PAGE_SIZE]
+        for depth in depths:
+            cursor = cursor_at(depth)
+            params = {'limit': PAGE_SIZE}
+            if cursor:
+                params['cursor'] = cursor
+
+            request = factory.get('/bookings/list/', params)
+            assert [b.id for b in keyset_page(request)] == [b.id for b in offset_page(depth)]
+
+            offset_ms = median_ms(lambda: offset_page(depth))
+            keyset_ms = median_ms(lambda: keyset_page(request))
+            print(f"   depth {depth:>7}: OFFSET {offset_ms:7.2f} ms, keyset {keyset_ms:7.2f} ms")
+
+        print("✅ Pagination benchmark complete")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Price Calendar Benchmark
+Times a year of /boats/<id>/price-calendar/ for a boat with many seasons and bookings
+Usage: python benchmark_price_calendar.py [seasons] [bookings]
+"""
+import os
+import sys
+import random
+import time
+import django
+from datetime import date, timedelta
+from decimal import Decimal
+
+# Set up Django environment
+sys.path.append('.')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yachtak_api.settings')
+django.setup()
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment
+from django.contrib.auth import get_user_model
+from boats.models import Boat
+from bookings.models import Booking
+from ownership.models import BookingRule
+
+User = get_user_model()
+
+SEASONS = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+BOOKINGS = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+REQUESTS = 200
+
+
+def seed():
+    """One boat with overlapping seasons and a dense booking history"""
+    user = User.objects.create(phone='+201000009999')
+    boat = Boat.objects.create(
+        name='Benchmark Yacht', model='D42', capacity=10,
+        length=Decimal('12.80'), location='El Gouna, Egypt', daily_rate=Decimal('1800.00'),
+    )
+    today = date.today()
+    rules = []
+    for i in range(SEASONS):
+        first, last = sorted(random.sample(range(0, 400), 2))
+        rules.append(BookingRule(
+            boat=boat, rule_type='seasonal_multiplier', rule_name=f'Season {i}',
+            start_date=today + timedelta(days=first), end_date=today + timedelta(days=last),
+            multiplier_value=Decimal(random.choice(['0.80', '1.10', '1.25', '1.50'])),
+        ))
+    BookingRule.objects.bulk_create(rules)
+
+    day = today - timedelta(days=BOOKINGS)
+    batch = []
+    for _ in range(BOOKINGS):
+        length = random.randint(0, 2)
+        batch.append(Booking(
+            boat=boat, user=user, status=random.choice(['confirmed', 'pending', 'cancelled']),
+            start_date=day, end_date=day + timedelta(days=length),
+        ))
+        day += timedelta(days=length + random.randint(1, 3))
+    Booking.objects.bulk_create(batch, batch_size=5000)
+    return boat
+
+
+def main():
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"📅 Price calendar benchmark: {SEASONS} seasons, {BOOKINGS} bookings")
+        boat = seed()
+        client = Client()
+        url = f'/boats/{boat.id}/price-calendar/'
+
+        started = time.perf_counter()
+        data = client.get(url).json()
+        print(f"   cold request {(time.perf_counter() - started) * 1e3:.1f} ms")
+
+        timings = []
+        for _ in range(REQUESTS):
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+
+        print(f"   warm median {timings[len(timings) // 2] * 1e3:.2f} ms, "
+              f"p95 {timings[int(len(timings) * 0.95)] * 1e3:.2f} ms per boat-year")
+        print(f"   {data['days']} days in {len(data['prices'])} price runs, "
+              f"{len(data['unavailable'])} unavailable runs, {len(response.content)} bytes")
+        print("✅ Price calendar benchmark complete")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
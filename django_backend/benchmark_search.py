@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Fleet Search Benchmark
+Times /boats/search/ against a large synthetic fleet
+Usage: python benchmark_search.py [boats] [bookings]
+"""
+import os
+import sys
+import random
+import time
+import django
+from datetime import date, timedelta
+from decimal import Decimal
+
+# Set up Django environment
+sys.path.append('.')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yachtak_api.settings')
+django.setup()
+
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import setup_test_environment, CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from boats.models import Boat
+from bookings.models import Booking, CalendarEvent
+
+User = get_user_model()
+
+BOATS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+BOOKINGS = int(sys.argv[2]) if len(sys.argv) > 2 else 1000000
+SEARCHES = 50
+LOCATIONS = ['El Gouna, Egypt', 'Hurghada Marina', 'Sahl Hasheesh', 'Soma Bay']
+
+
+def seed():
+    """Spread bookings across the fleet, most of them in the past"""
+    user = User.objects.create(phone='+201000009999')
+    Boat.objects.bulk_create([
+        Boat(
+            name=f'Yacht {i}', model=random.choice(['D28', 'D36', 'D42', 'D50', 'D60']),
+            capacity=random.randint(6, 16), length=Decimal('12.80'),
+            location=random.choice(LOCATIONS), daily_rate=Decimal(random.randint(5, 40) * 100),
+        ) for i in range(BOATS)
+    ], batch_size=1000)
+    boat_ids = list(Boat.objects.values_list('id', flat=True))
+
+    per_boat = BOOKINGS // len(boat_ids)
+    first_day = date.today() - timedelta(days=per_boat * 3)
+    batch = []
+    events = []
+    for boat_id in boat_ids:
+        day = first_day + timedelta(days=random.randint(0, 3))
+        for i in range(per_boat):
+            length = random.randint(0, 2)
+            batch.append(Booking(
+                boat_id=boat_id, user=user, status=random.choice(['confirmed', 'pending', 'cancelled', 'completed']),
+                start_date=day, end_date=day + timedelta(days=length),
+            ))
+            day += timedelta(days=length + 1)
+        events.append(CalendarEvent(
+            boat_id=boat_id, event_type='maintenance', title='Service',
+            start_date=date.today() + timedelta(days=random.randint(0, 60)),
+            end_date=date.today() + timedelta(days=random.randint(61, 65)),
+        ))
+        if len(batch) >= 50000:
+            Booking.objects.bulk_create(batch, batch_size=5000)
+            batch = []
+    Booking.objects.bulk_create(batch, batch_size=5000)
+    CalendarEvent.objects.bulk_create(events, batch_size=1000)
+
+
+def main():
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"🔍 Fleet search benchmark: {BOATS} boats, {BOOKINGS} bookings")
+        started = time.perf_counter()
+        seed()
+        print(f"   seeded in {time.perf_counter() - started:.1f} s")
+
+        client = Client()
+        timings = []
+        query_counts = set()
+        found = 0
+        for _ in range(SEARCHES):
+            start = date.today() + timedelta(days=random.randint(-30, 90))
+            params = {
+                'start_date': start.isoformat(),
+                'end_date': (start + timedelta(days=random.randint(0, 6))).isoformat(),
+                'guest_count': random.randint(2, 12),
+                'location': random.choice(['gouna', 'marina', '']),
+                'max_price': random.choice(['', '10000', '25000']),
+            }
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.get('/boats/search/', params)
+                timings.append(time.perf_counter() - started)
+            query_counts.add(len(queries))
+            found += response.json()['count']
+
+        timings.sort()
+        print(f"   median {timings[len(timings) // 2] * 1e3:.1f} ms, "
+              f"p95 {timings[int(len(timings) * 0.95)] * 1e3:.1f} ms per search")
+        print(f"   queries per search: {sorted(query_counts)}")
+        print(f"   average boats returned: {found / SEARCHES:.1f}")
+        print("✅ Fleet search benchmark complete")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
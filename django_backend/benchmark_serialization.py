@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Serialization Benchmark
+Rows per second for the booking list payload: hand-built dicts vs field plans vs the .values() path
+Usage: python benchmark_serialization.py [bookings]
+"""
+import os
+import sys
+import json
+import random
+import time
+import django
+from datetime import date, time as dtime, timedelta
+from decimal import Decimal
+
+# Set up Django environment
+sys.path.append('.')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yachtak_api.settings')
+django.setup()
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.test.utils import setup_test_environment
+from django.contrib.auth import get_user_model
+from boats.models import Boat
+from bookings.models import Booking
+from yachtak_api import serializers
+from yachtak_api.serializers import BOOKING_LIST, dumps
+
+User = get_user_model()
+
+BOOKINGS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+
+def seed():
+    users = [User.objects.create(phone=f'+2010000{i:05d}', first_name='Owner', last_name=str(i)) for i in range(100)]
+    boats = [
+        Boat.objects.create(
+            name=f'Benchmark Yacht {i}', model='D42', capacity=10,
+            length=Decimal('12.80'), location='El Gouna, Egypt', daily_rate=Decimal('1800.00'),
+        )
+        for i in range(20)
+    ]
+    today = date.today()
+    batch = []
+    for i in range(BOOKINGS):
+        start = today + timedelta(days=random.randint(-365, 365))
+        batch.append(Booking(
+            boat=random.choice(boats), user=random.choice(users), status='confirmed',
+            start_date=start, end_date=start + timedelta(days=random.randint(0, 3)),
+            start_time=dtime(9), end_time=dtime(17), guest_count=random.randint(1, 10),
+            total_amount=Decimal('1800.00') * random.randint(1, 4), notes='Benchmark booking',
+        ))
+        if len(batch) == 10000:
+            Booking.objects.bulk_create(batch)
+            batch = []
+    Booking.objects.bulk_create(batch)
+
+
+def hand_built(booking):
+    """The per-view dict the list endpoints assembled before field plans"""
+    return {
+        'id': booking.id,
+        'boat': {
+            'id': booking.boat.id,
+            'name': booking.boat.name,
+            'model': booking.boat.model,
+            'location': booking.boat.location,
+        },
+        'user': {
+            'phone': booking.user.phone,
+            'first_name': booking.user.first_name,
+            'last_name': booking.user.last_name,
+        },
+        'booking_type': booking.booking_type,
+        'status': booking.status,
+        'start_date': booking.start_date.isoformat(),
+        'end_date': booking.end_date.isoformat(),
+        'start_time': booking.start_time.isoformat() if booking.start_time else None,
+        'end_time': booking.end_time.isoformat() if booking.end_time else None,
+        'guest_count': booking.guest_count,
+        'total_amount': str(booking.total_amount) if booking.total_amount else None,
+        'duration_days': booking.duration_days,
+        'notes': booking.notes,
+        'created_at': booking.created_at.isoformat(),
+    }
+
+
+def timed(label, build):
+    started = time.perf_counter()
+    rows = build()
+    built = time.perf_counter()
+    body = encode(rows)
+    done = time.perf_counter()
+    print(f"   {label:<28} {BOOKINGS / (built - started):>9,.0f} rows/s built, "
+          f"{BOOKINGS / (done - started):>9,.0f} rows/s with encoding ({len(body) / 1e6:.1f} MB)")
+    return rows
+
+
+def encode(rows):
+    return dumps({'bookings': rows})
+
+
+def main():
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"🧾 Serialization benchmark: {BOOKINGS} bookings")
+        seed()
+        queryset = Booking.objects.order_by('-created_at', '-id')
+        related = queryset.select_related(*BOOKING_LIST.related)
+
+        print(f"   orjson {'available' if serializers.orjson else 'not installed, using json'}")
+        started = time.perf_counter()
+        legacy = [hand_built(booking) for booking in related.all()]
+        body = json.dumps({'bookings': legacy}, cls=DjangoJSONEncoder)
+        elapsed = time.perf_counter() - started
+        print(f"   {'hand-built + JsonResponse':<28} {BOOKINGS / elapsed:>9,.0f} rows/s with encoding "
+              f"({len(body) / 1e6:.1f} MB)")
+
+        planned = timed('field plan, models', lambda: BOOKING_LIST.serialize_many(related.all()))
+        values = timed('field plan, .values()', lambda: BOOKING_LIST.serialize_queryset(queryset.all()))
+
+        assert planned == values == legacy, 'serializers disagree'
+        print("✅ Serialization benchmark complete")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
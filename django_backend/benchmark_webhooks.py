@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Webhook Replay Benchmark
+Acknowledgement latency and inbox throughput for a replay of recorded Stripe webhook deliveries
+Usage: python benchmark_webhooks.py [events] [fixture_path]
+"""
+import os
+import sys
+import json
+import logging
+import random
+import time
+import django
+from decimal import Decimal
+
+# Set up Django environment
+sys.path.append('.')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yachtak_api.settings')
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import setup_test_environment
+from ownership.models import FuelWallet
+from payment_system.ledger import verify_balances
+from payment_system.models import PaymentIntent, StripeWebhookEvent
+from payment_system.webhooks import process_pending
+
+EVENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+FIXTURE = sys.argv[2] if len(sys.argv) > 2 else 'webhook_replay.ndjson'
+TOPUP_AMOUNT = Decimal('250.00')
+
+# Deliveries per PaymentIntent: a declined attempt, the success, Stripe
+# redelivering the success, and a charge event the inbox does not handle
+DELIVERIES_PER_INTENT = 4
+
+User = get_user_model()
+
+
+def write_fixture(path, events):
+    """Record a delivery stream with redeliveries and some out-of-order arrivals"""
+    deliveries = []
+    created = 1700000000
+    for n in range(events // DELIVERIES_PER_INTENT):
+        intent_id = f'pi_replay_{n}'
+        failed = {'id': f'evt_{n}_failed', 'type': 'payment_intent.payment_failed', 'created': created,
+                  'data': {'object': {'id': intent_id, 'object': 'payment_intent', 'status': 'requires_payment_method'}}}
+        succeeded = {'id': f'evt_{n}_succeeded', 'type': 'payment_intent.succeeded', 'created': created + 1,
+                     'data': {'object': {'id': intent_id, 'object': 'payment_intent', 'status': 'succeeded'}}}
+        charge = {'id': f'evt_{n}_charge', 'type': 'charge.succeeded', 'created': created + 1,
+                  'data': {'object': {'id': f'ch_replay_{n}', 'object': 'charge', 'payment_intent': intent_id}}}
+        deliveries.extend([failed, succeeded, succeeded, charge])
+        created += 2
+
+    # Stripe does not guarantee delivery order; shuffle within short windows
+    window = 16
+    for start in range(0, len(deliveries), window):
+        chunk = deliveries[start:start + window]
+        random.shuffle(chunk)
+        deliveries[start:start + window] = chunk
+
+    with open(path, 'w') as fixture:
+        for delivery in deliveries:
+            fixture.write(json.dumps(delivery) + '\n')
+
+
+def seed(intents):
+    users = User.objects.bulk_create([User(phone=f'+2019{n:08d}') for n in range(intents)])
+    wallets = FuelWallet.objects.bulk_create([FuelWallet(owner=user) for user in users])
+    PaymentIntent.objects.bulk_create([
+        PaymentIntent(
+            stripe_payment_intent_id=f'pi_replay_{n}', user=user, payment_type='fuel_topup',
+            amount=TOPUP_AMOUNT, fuel_wallet=wallet,
+        )
+        for n, (user, wallet) in enumerate(zip(users, wallets))
+    ])
+
+
+def percentiles(timings):
+    timings.sort()
+    return timings[len(timings) // 2] * 1e3, timings[int(len(timings) * 0.99)] * 1e3
+
+
+def main():
+    if not os.path.exists(FIXTURE):
+        write_fixture(FIXTURE, EVENTS)
+        print(f"📝 Wrote replay fixture {FIXTURE}")
+    with open(FIXTURE, 'rb') as fixture:
+        deliveries = [line.rstrip(b'\n') for line in fixture if line.strip()]
+    intents = len({
+        event['data']['object']['id'] for event in map(json.loads, deliveries)
+        if event['type'].startswith('payment_intent.')
+    })
+
+    # Measure the acknowledgement alone; the inbox is drained below
+    settings.STRIPE_WEBHOOK_PROCESS_IN_BACKGROUND = False
+    logging.disable(logging.WARNING)
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"📨 Webhook replay benchmark: {len(deliveries)} deliveries for {intents} PaymentIntents")
+        seed(intents)
+        client = Client()
+
+        timings = []
+        started = time.perf_counter()
+        for delivery in deliveries:
+            ack_started = time.perf_counter()
+            response = client.post('/webhooks/stripe/', data=delivery, content_type='application/json')
+            timings.append(time.perf_counter() - ack_started)
+            assert response.status_code == 200, response.status_code
+        elapsed = time.perf_counter() - started
+        median, p99 = percentiles(timings)
+        print(f"   acknowledged      median {median:6.2f} ms, p99 {p99:6.2f} ms, {len(deliveries) / elapsed:7.0f} deliveries/s")
+        stored = StripeWebhookEvent.objects.count()
+        print(f"   stored {stored} events ({len(deliveries) - stored} duplicate deliveries dropped)")
+
+        started = time.perf_counter()
+        applied = process_pending()
+        elapsed = time.perf_counter() - started
+        print(f"   processed         {applied} events applied in {elapsed:.2f} s ({stored / elapsed:7.0f} events/s, "
+              f"{settings.STRIPE_WEBHOOK_WORKERS} workers)")
+
+        statuses = dict(StripeWebhookEvent.objects.values_list('status').annotate(n=Count('id')))
+        print(f"   statuses          {statuses}")
+        assert 'pending' not in statuses and 'failed' not in statuses, statuses
+        assert not FuelWallet.objects.exclude(current_balance=TOPUP_AMOUNT).exists(), "wallet credited more than once"
+        assert not PaymentIntent.objects.exclude(status='succeeded').exists(), "late failure overrode a success"
+        assert verify_balances() == [], "ledger disagrees with wallet balances"
+        print("✅ Every top-up credited exactly once; ledger verified")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
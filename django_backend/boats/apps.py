@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class BoatsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'boats'
+
+    def ready(self):
+        # Register catalog cache invalidation, snapshot publishing,
+        # full-text index and autocomplete index signals
+        from . import autocomplete, caching, fulltext, snapshot  # noqa: F401
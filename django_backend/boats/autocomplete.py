@@ -0,0 +1,136 @@
+"""
+Boat Autocomplete
+In-memory prefix index over boat names, models and marinas for per-keystroke suggestions
+"""
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import namedtuple
+from django.db import transaction
+from django.db.models import Count, Max
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Boat
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Seconds an index may serve lookups before it is rebuilt. Signals keep it
+# exact within a process; the TTL bounds staleness across workers.
+AUTOCOMPLETE_TTL_SECONDS = 60
+
+Suggestion = namedtuple('Suggestion', ['text', 'kind', 'boat_id', 'count'])
+
+
+def normalize(text):
+    """Lowercase, accent-free, single-spaced form used for both keys and queries"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.lower().split())
+
+
+class AutocompleteIndex:
+    """
+    Sorted-array prefix index
+    Each suggestion is keyed by its full normalized text, and separately by
+    every later word ('marina' finds 'Hurghada Marina'). A lookup bisects
+    each sorted key list to the first key >= the query and reads forward
+    while keys still match, so its cost depends on the result size, not the
+    fleet size. Matches on the start of the text rank first.
+    """
+
+    def __init__(self, suggestions, token=None):
+        self.built_at = time.monotonic()
+        self.token = token
+        self.suggestions = suggestions
+        leading = []
+        inner = []
+        for position, suggestion in enumerate(suggestions):
+            words = normalize(suggestion.text).split(' ')
+            leading.append((' '.join(words), position))
+            inner.extend((' '.join(words[i:]), position) for i in range(1, len(words)))
+        self._levels = []
+        for entries in (leading, inner):
+            entries.sort()
+            self._levels.append(([key for key, _ in entries], [position for _, position in entries]))
+
+    def __len__(self):
+        return len(self.suggestions)
+
+    def lookup(self, query, limit=10):
+        """Suggestions whose text, or a word within it, starts with query"""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        found = []
+        seen = set()
+        for keys, positions in self._levels:
+            i = bisect_left(keys, prefix)
+            while i < len(keys) and len(found) < limit and keys[i].startswith(prefix):
+                if positions[i] not in seen:
+                    seen.add(positions[i])
+                    found.append(self.suggestions[positions[i]])
+                i += 1
+        return found
+
+
+def _public_boats():
+    return Boat.objects.filter(is_active=True, allow_public_rental=True)
+
+
+def _catalog_token():
+    """Cheap fingerprint of the public catalog: row count and latest update"""
+    state = _public_boats().aggregate(count=Count('id'), latest=Max('updated_at'))
+    return (state['count'], state['latest'])
+
+
+def build_index():
+    """Build a fresh index from active public boats"""
+    token = _catalog_token()
+    boats = _public_boats()
+    rows = list(boats.order_by('name', 'id').values_list('id', 'name', 'model', 'location'))
+
+    suggestions = [Suggestion(name, 'boat', boat_id, 1) for boat_id, name, _, _ in rows]
+    for kind, column in (('model', 2), ('location', 3)):
+        counts = {}
+        for row in rows:
+            if row[column]:
+                counts[row[column]] = counts.get(row[column], 0) + 1
+        suggestions.extend(Suggestion(text, kind, None, count) for text, count in sorted(counts.items()))
+    return AutocompleteIndex(suggestions, token=token)
+
+
+_index = None
+
+
+def get_autocomplete_index():
+    """
+    The cached index
+    Past the TTL, one aggregate query checks for boat writes made by other
+    workers; the index is only rebuilt if there were any.
+    """
+    global _index
+    index = _index
+    if index is not None and time.monotonic() - index.built_at >= AUTOCOMPLETE_TTL_SECONDS:
+        if index.token == _catalog_token():
+            index.built_at = time.monotonic()
+        else:
+            index = None
+    if index is None:
+        index = _index = build_index()
+        logger.debug(f"Autocomplete index built: {len(index)} suggestions")
+    return index
+
+
+def invalidate_autocomplete():
+    """Drop the cached index so the next lookup rebuilds it"""
+    global _index
+    _index = None
+
+
+@receiver(post_save, sender=Boat)
+@receiver(post_delete, sender=Boat)
+def _invalidate_on_change(sender, instance, **kwargs):
+    """Rebuild suggestions after any boat write"""
+    invalidate_autocomplete()
+    transaction.on_commit(invalidate_autocomplete)
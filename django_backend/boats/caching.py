@@ -0,0 +1,26 @@
+"""
+Catalog Cache Tags
+Model writes that retire cached boat catalog, detail, calendar and quote responses
+"""
+from bookings.models import Booking, CalendarEvent
+from ownership.models import BookingRule
+from yachtak_api.caching import CachePolicy, invalidate_on
+from .models import Boat, BoatFeature
+
+# Availability reads keep expiring rental holds in view, so calendars and
+# quotes are only cached as long as the occupancy index itself
+CATALOG_CACHE = CachePolicy('boats.catalog', ttl=300, vary=('fields',), tags=('boats',))
+BOAT_DETAIL_CACHE = CachePolicy('boats.detail', ttl=300, vary=('fields',), tags=('boat:{boat_id}',))
+PRICE_CALENDAR_CACHE = CachePolicy('boats.price_calendar', ttl=30, vary=('from', 'to'), tags=('boat:{boat_id}',))
+BOAT_CALENDAR_CACHE = CachePolicy(
+    'bookings.boat_calendar', ttl=30, vary=('start_date', 'end_date'), tags=('boat:{boat_id}',)
+)
+RENTAL_QUOTE_CACHE = CachePolicy(
+    'bookings.rental_quote', ttl=30, vary=('start_date', 'end_date', 'guest_count'), tags=('boat:{boat_id}',)
+)
+
+invalidate_on(Boat, 'boats', 'boat:{id}')
+invalidate_on(BoatFeature, 'boats', 'boat:{boat_id}')
+invalidate_on(Booking, 'boat:{boat_id}')
+invalidate_on(CalendarEvent, 'boat:{boat_id}')
+invalidate_on(BookingRule, 'boat:{boat_id}')
@@ -0,0 +1,154 @@
+"""
+Boat Full-Text Search
+Ranked search over boat names, models, locations, descriptions and features
+"""
+import re
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Boat, BoatFeature
+
+# The index is an FTS5 table on SQLite and a GIN-indexed tsvector table on
+# PostgreSQL (see migration 0003); other databases have no index
+SUPPORTED_VENDORS = ('sqlite', 'postgresql')
+
+# Boats reindexed per statement when rebuilding the whole index
+REINDEX_BATCH_SIZE = 2000
+
+# "12 guests", "8 people", "10 pax" become a capacity filter, not search terms
+GUESTS_PATTERN = re.compile(r'\b(\d+)\s*(?:guests?|people|persons?|pax)\b', re.IGNORECASE)
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# FTS5 bm25() weights for name, model, location, description, features
+SQLITE_COLUMN_WEIGHTS = (10.0, 8.0, 5.0, 1.0, 4.0)
+
+SQLITE_SEARCH = f"""
+    SELECT b.id, -bm25(boats_boat_search, {', '.join(map(str, SQLITE_COLUMN_WEIGHTS))}) AS score
+    FROM boats_boat_search JOIN boats_boat b ON b.id = boats_boat_search.rowid
+    WHERE boats_boat_search MATCH %s
+      AND b.is_active AND b.allow_public_rental AND b.capacity >= %s
+    ORDER BY score DESC, b.id
+    LIMIT %s
+"""
+
+POSTGRESQL_SEARCH = """
+    SELECT b.id, ts_rank_cd(s.document, query) AS score
+    FROM boats_boat_search s JOIN boats_boat b ON b.id = s.boat_id,
+         to_tsquery('english', %s) query
+    WHERE s.document @@ query
+      AND b.is_active AND b.allow_public_rental AND b.capacity >= %s
+    ORDER BY score DESC, b.id
+    LIMIT %s
+"""
+
+POSTGRESQL_UPSERT = """
+    INSERT INTO boats_boat_search (boat_id, document)
+    SELECT b.id,
+           setweight(to_tsvector('english', b.name || ' ' || b.model), 'A')
+           || setweight(to_tsvector('english', b.location), 'B')
+           || setweight(to_tsvector('english', doc.features), 'B')
+           || setweight(to_tsvector('english', b.description), 'C')
+    FROM boats_boat b JOIN (SELECT unnest(%s::bigint[]) AS id, unnest(%s::text[]) AS features) doc
+      ON doc.id = b.id
+    ON CONFLICT (boat_id) DO UPDATE SET document = EXCLUDED.document
+"""
+
+
+def parse_query(text):
+    """
+    Split a search box query into search terms and a minimum capacity
+    Returns: (terms, min_capacity)
+    """
+    min_capacity = 0
+    for match in GUESTS_PATTERN.finditer(text):
+        min_capacity = max(min_capacity, int(match.group(1)))
+    terms = TOKEN_PATTERN.findall(GUESTS_PATTERN.sub(' ', text).lower())
+    return terms, min_capacity
+
+
+def _match_expression(terms):
+    # Every term must match; the last one may be a prefix still being typed
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' AND '.join(quoted)
+
+
+def _tsquery(terms):
+    return ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+
+
+def search_boat_ids(text, limit=20):
+    """
+    Public boats matching a free-text query, best match first
+    Returns: list of (boat_id, score); higher scores rank higher
+    """
+    terms, min_capacity = parse_query(text)
+    if not terms:
+        boats = Boat.objects.filter(is_active=True, allow_public_rental=True, capacity__gte=min_capacity)
+        return [(boat_id, None) for boat_id in boats.values_list('id', flat=True)[:limit]]
+
+    if connection.vendor == 'sqlite':
+        sql, expression = SQLITE_SEARCH, _match_expression(terms)
+    elif connection.vendor == 'postgresql':
+        sql, expression = POSTGRESQL_SEARCH, _tsquery(terms)
+    else:
+        raise NotImplementedError(f"Full-text search is not available on {connection.vendor}")
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [expression, min_capacity, limit])
+        return [(boat_id, round(score, 4)) for boat_id, score in cursor.fetchall()]
+
+
+def _documents(boat_ids):
+    """(id, name, model, location, description, features text) for boats that still exist"""
+    features = {}
+    rows = BoatFeature.objects.filter(boat_id__in=boat_ids).order_by('boat_id', 'id')
+    for boat_id, name, value in rows.values_list('boat_id', 'feature_name', 'feature_value'):
+        features.setdefault(boat_id, []).append(f'{name} {value}')
+    boats = Boat.objects.filter(id__in=boat_ids).values_list('id', 'name', 'model', 'location', 'description')
+    return [(*boat, ' '.join(features.get(boat[0], []))) for boat in boats]
+
+
+def index_boats(boat_ids):
+    """Bring the index rows of boat_ids up to date, dropping boats that no longer exist"""
+    boat_ids = list(boat_ids)
+    if not boat_ids or connection.vendor not in SUPPORTED_VENDORS:
+        return
+    documents = _documents(boat_ids)
+    placeholders = ', '.join(['%s'] * len(boat_ids))
+    # One transaction per batch rather than one commit per inserted row
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM boats_boat_search WHERE rowid IN ({placeholders})", boat_ids)
+            cursor.executemany(
+                "INSERT INTO boats_boat_search (rowid, name, model, location, description, features) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                documents,
+            )
+        else:
+            cursor.execute(f"DELETE FROM boats_boat_search WHERE boat_id IN ({placeholders})", boat_ids)
+            cursor.execute(POSTGRESQL_UPSERT, [
+                [document[0] for document in documents], [document[5] for document in documents],
+            ])
+
+
+def rebuild_index():
+    """Reindex every boat, for data loaded without model signals"""
+    boat_ids = list(Boat.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(boat_ids), REINDEX_BATCH_SIZE):
+        index_boats(boat_ids[start:start + REINDEX_BATCH_SIZE])
+    return len(boat_ids)
+
+
+@receiver(post_save, sender=Boat)
+@receiver(post_delete, sender=Boat)
+def _reindex_boat(sender, instance, **kwargs):
+    """Index writes join the caller's transaction, so a rolled-back boat never reaches the index"""
+    index_boats([instance.id])
+
+
+@receiver(post_save, sender=BoatFeature)
+@receiver(post_delete, sender=BoatFeature)
+def _reindex_feature_boat(sender, instance, **kwargs):
+    index_boats([instance.boat_id])
@@ -0,0 +1,16 @@
+"""
+Publish the catalog snapshot
+Run after bulk catalog changes that bypass model signals, and on a schedule when background rebuilds are off
+"""
+from django.core.management.base import BaseCommand
+from boats.snapshot import publish_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the precompressed boat catalog snapshot from the database'
+
+    def handle(self, *args, **options):
+        snapshot = publish_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f'Published snapshot {snapshot.version} with {len(snapshot.documents)} document(s)'
+        ))
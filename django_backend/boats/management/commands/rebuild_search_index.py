@@ -0,0 +1,14 @@
+"""
+Rebuild the boat full-text index
+Run after loading boats with bulk_create or raw SQL, which skip model signals
+"""
+from django.core.management.base import BaseCommand
+from boats.fulltext import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Reindex every boat for full-text search'
+
+    def handle(self, *args, **options):
+        indexed = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} boat(s)'))
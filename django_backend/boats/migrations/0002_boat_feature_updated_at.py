@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boats', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boatfeature',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
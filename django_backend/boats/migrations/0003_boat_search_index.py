@@ -0,0 +1,64 @@
+# Full-text index over the boat catalog: FTS5 on SQLite, tsvector + GIN on PostgreSQL
+
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE boats_boat_search USING fts5(
+        name, model, location, description, features,
+        tokenize = 'porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO boats_boat_search (rowid, name, model, location, description, features)
+    SELECT b.id, b.name, b.model, b.location, b.description,
+           COALESCE((SELECT group_concat(f.feature_name || ' ' || f.feature_value, ' ')
+                     FROM boats_boat_feature f WHERE f.boat_id = b.id), '')
+    FROM boats_boat b
+    """,
+]
+
+POSTGRESQL_FORWARD = [
+    """
+    CREATE TABLE boats_boat_search (
+        boat_id bigint PRIMARY KEY REFERENCES boats_boat (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        document tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX boats_boat_search_document ON boats_boat_search USING GIN (document)",
+    """
+    INSERT INTO boats_boat_search (boat_id, document)
+    SELECT b.id,
+           setweight(to_tsvector('english', b.name || ' ' || b.model), 'A')
+           || setweight(to_tsvector('english', b.location), 'B')
+           || setweight(to_tsvector('english', COALESCE((
+                  SELECT string_agg(f.feature_name || ' ' || f.feature_value, ' ')
+                  FROM boats_boat_feature f WHERE f.boat_id = b.id), '')), 'B')
+           || setweight(to_tsvector('english', b.description), 'C')
+    FROM boats_boat b
+    """,
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE IF EXISTS boats_boat_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boats', '0002_boat_feature_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -50,6 +50,7 @@ class BoatFeature(models.Model):
     boat = models.ForeignKey(Boat, on_delete=models.CASCADE, related_name='features')
     feature_name = models.CharField(max_length=100)
     feature_value = models.CharField(max_length=200, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'boats_boat_feature'
@@ -0,0 +1,61 @@
+"""
+Boat Price Calendar
+Daily prices and availability for a date range as run-length encoded arrays
+"""
+from decimal import Decimal
+from bookings.occupancy import get_occupancy_index
+from ownership.rules import get_boat_rules
+
+CENT = Decimal('0.01')
+
+
+def price_runs(boat, start_date, end_date):
+    """
+    Runs of equal daily price across [start_date, end_date]
+    Built from the seasonal segments of the compiled rules, so a year with
+    a handful of seasons costs a handful of steps rather than 365.
+    Returns: list of [day_offset, days, price]
+    """
+    runs = []
+    for segment_start, days, multiplier, _ in get_boat_rules(boat.id).seasonal_segments(start_date, end_date):
+        price = str((boat.daily_rate * multiplier).quantize(CENT))
+        if runs and runs[-1][2] == price:
+            runs[-1][1] += days
+        else:
+            runs.append([(segment_start - start_date).days, days, price])
+    return runs
+
+
+def unavailable_runs(boat, start_date, end_date):
+    """
+    Runs of days blocked by bookings or calendar events
+    Overlapping and adjacent occupancies are merged into one run.
+    Returns: list of [day_offset, days]
+    """
+    last_offset = (end_date - start_date).days
+    spans = sorted(
+        (max((o.start_date - start_date).days, 0), min((o.end_date - start_date).days, last_offset))
+        for o in get_occupancy_index(boat.id).conflicts(start_date, end_date)
+    )
+
+    runs = []
+    for first, last in spans:
+        if runs and first <= runs[-1][0] + runs[-1][1]:
+            runs[-1][1] = max(runs[-1][1], last - runs[-1][0] + 1)
+        else:
+            runs.append([first, last - first + 1])
+    return runs
+
+
+def build_price_calendar(boat, start_date, end_date):
+    """Price calendar payload for one boat"""
+    return {
+        'boat_id': boat.id,
+        'boat_name': boat.name,
+        'from': start_date.isoformat(),
+        'to': end_date.isoformat(),
+        'days': (end_date - start_date).days + 1,
+        'daily_rate': str(boat.daily_rate),
+        'prices': price_runs(boat, start_date, end_date),
+        'unavailable': unavailable_runs(boat, start_date, end_date),
+    }
@@ -0,0 +1,90 @@
+"""
+Fleet Availability Search
+Find bookable boats for a date range in a constant number of queries
+"""
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from bookings.models import Booking, CalendarEvent
+from bookings.occupancy import BLOCKING_BOOKING_STATUSES, BLOCKING_EVENT_TYPES
+from ownership.models import BookingRule
+from ownership.rules import get_rules_for_boats
+from .models import Boat
+
+
+def _overlapping(queryset, start_date, end_date):
+    """Rows of a boat-scoped queryset overlapping the closed range"""
+    return queryset.filter(
+        boat=OuterRef('pk'),
+        start_date__lte=end_date,
+        end_date__gte=start_date,
+    )
+
+
+def bookable_boats(start_date, end_date, guest_count=1, location=None):
+    """
+    Boats open for public rental with room for guest_count and nothing
+    blocking [start_date, end_date]
+    Conflicts are anti-joins, so the database never returns a busy boat.
+    """
+    duration_days = (end_date - start_date).days + 1
+
+    booked = _overlapping(
+        Booking.objects.filter(status__in=BLOCKING_BOOKING_STATUSES).exclude(
+            hold_expires_at__lte=timezone.now()
+        ),
+        start_date, end_date,
+    )
+    blocked = _overlapping(
+        CalendarEvent.objects.filter(event_type__in=BLOCKING_EVENT_TYPES), start_date, end_date
+    )
+    minimum_stay = _overlapping(
+        BookingRule.objects.filter(
+            is_active=True, rule_type='minimum_stay', days_requirement__gt=duration_days
+        ),
+        start_date, end_date,
+    )
+
+    boats = Boat.objects.filter(
+        is_active=True,
+        allow_public_rental=True,
+        capacity__gte=guest_count,
+    )
+    if location:
+        boats = boats.filter(location__icontains=location)
+
+    return boats.filter(
+        ~Exists(booked), ~Exists(blocked), ~Exists(minimum_stay)
+    ).order_by('id')
+
+
+def quote_boat(boat, rule_set, start_date, end_date):
+    """
+    Price a stay from the boat's compiled booking rules
+    Returns: (total_amount, quote dict)
+    """
+    quote = rule_set.price(boat.daily_rate, start_date, end_date)
+    return quote.total_amount, {
+        'daily_rate': str(boat.daily_rate),
+        'duration_days': (end_date - start_date).days + 1,
+        'base_amount': str(quote.base_amount),
+        'applied_multipliers': quote.applied_multipliers,
+        'total_amount': str(quote.total_amount),
+    }
+
+
+def search_fleet(start_date, end_date, guest_count=1, location=None, max_price=None, limit=50):
+    """
+    Search the fleet and quote each bookable boat
+    Returns: list of (boat, quote) sorted by total price, at most limit long
+    """
+    boats = list(bookable_boats(start_date, end_date, guest_count, location))
+    rule_sets = get_rules_for_boats([boat.id for boat in boats])
+    results = []
+    for boat in boats:
+        total_amount, quote = quote_boat(boat, rule_sets[boat.id], start_date, end_date)
+        if max_price is not None and total_amount > max_price:
+            continue
+        results.append((total_amount, boat.id, boat, quote))
+
+    results.sort(key=lambda item: item[:2])
+    return [(boat, quote) for _, _, boat, quote in results[:limit]]
@@ -0,0 +1,391 @@
+"""
+Catalog Snapshot
+Precompressed boat catalog and detail documents, republished after the catalog changes
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+from pathlib import Path
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from yachtak_api.serializers import BOAT, BOAT_DETAIL, dumps
+from .models import Boat, BoatFeature
+import logging
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks for a snapshot published, or a catalog write
+# made, by another worker
+SNAPSHOT_CHECK_SECONDS = 1
+
+# Seconds a catalog write waits before the snapshot is rebuilt, so a burst
+# of writes (a bulk edit, an import) costs one rebuild
+SNAPSHOT_REBUILD_DELAY = 2
+
+# Published versions kept on disk; older ones are removed
+SNAPSHOT_KEEP_VERSIONS = 3
+
+# File suffix per Content-Encoding, in order of preference
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz', 'identity': ''}
+
+
+class Document:
+    """
+    One JSON document in every encoding
+    variants maps a Content-Encoding to the encoded bytes, or to the path
+    of the file holding them for a snapshot read back from disk.
+    """
+
+    def __init__(self, etag, variants):
+        self.etag = etag
+        self.variants = variants
+
+    def negotiate(self, accept_encoding):
+        """Best encoding the client accepts, identity if none"""
+        accepted = set()
+        for part in accept_encoding.split(','):
+            coding, _, params = part.strip().partition(';')
+            if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                accepted.add(coding.strip().lower())
+        for encoding in ENCODING_SUFFIXES:
+            if encoding in self.variants and (encoding in accepted or encoding == 'identity'):
+                return encoding
+        return 'identity'
+
+
+class Snapshot:
+    """A published catalog: the 'catalog' document and a 'boats/<id>' document per active boat"""
+
+    def __init__(self, version, built_at, documents):
+        self.version = version
+        self.built_at = built_at
+        self.documents = documents
+
+    def document(self, name):
+        return self.documents.get(name)
+
+    @classmethod
+    def load(cls, directory, version):
+        """Snapshot published to directory by this or another worker"""
+        root = Path(directory) / version
+        manifest = json.loads((root / 'manifest.json').read_text())
+        documents = {
+            name: Document(etag, {
+                encoding: root / f'{name}.json{ENCODING_SUFFIXES[encoding]}'
+                for encoding in manifest['encodings']
+            })
+            for name, etag in manifest['documents'].items()
+        }
+        return cls(version, manifest['built_at'], documents)
+
+
+def _encode(body):
+    variants = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(body, quality=11)
+    return variants
+
+
+def _documents():
+    """Catalog and per-boat detail bodies, as list_boats and boat_detail render them"""
+    boats = Boat.objects.filter(is_active=True)
+    bodies = {'catalog': dumps(BOAT.serialize_queryset(boats.filter(allow_public_rental=True)))}
+
+    features = defaultdict(list)
+    rows = BoatFeature.objects.filter(boat__is_active=True).order_by('boat_id', 'id')
+    for boat_id, name, value in rows.values_list('boat_id', 'feature_name', 'feature_value'):
+        features[boat_id].append({'name': name, 'value': value})
+
+    for boat in BOAT_DETAIL.serialize_queryset(boats):
+        boat['features'] = features.get(boat['id'], [])
+        bodies[f"boats/{boat['id']}"] = dumps(boat)
+    return bodies
+
+
+def build_snapshot():
+    """Read the catalog once and encode every document"""
+    built_at = time.time()
+    documents = {}
+    for name, body in _documents().items():
+        documents[name] = Document(f'W/"{hashlib.md5(body).hexdigest()}"', _encode(body))
+    version = hashlib.md5(
+        ''.join(f'{name}={documents[name].etag}' for name in sorted(documents)).encode()
+    ).hexdigest()
+    return Snapshot(version, built_at, documents)
+
+
+def _read_dirty(root):
+    """Time of the latest catalog write recorded under root, or None"""
+    try:
+        return float((root / 'DIRTY').read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _read_pointer(root):
+    """(version, built_at) of the current snapshot on disk, or None"""
+    try:
+        version, built_at = (root / 'CURRENT').read_text().split()
+        return version, float(built_at)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write(directory, snapshot):
+    """
+    Write snapshot under directory and point CURRENT at it
+    Files are written to a temporary directory that is renamed into place,
+    and CURRENT is replaced atomically, so readers never see a partial
+    version. A snapshot built before the one already current is not
+    pointed to. Returns the current (version, built_at).
+    """
+    root = Path(directory)
+    target = root / snapshot.version
+    if not target.exists():
+        staging = root / f'.{snapshot.version}.{os.getpid()}.{threading.get_ident()}'
+        for name, document in snapshot.documents.items():
+            for encoding, body in document.variants.items():
+                path = staging / f'{name}.json{ENCODING_SUFFIXES[encoding]}'
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(body)
+        staging.mkdir(parents=True, exist_ok=True)
+        (staging / 'manifest.json').write_text(json.dumps({
+            'built_at': snapshot.built_at,
+            'encodings': list(next(iter(snapshot.documents.values())).variants),
+            'documents': {name: document.etag for name, document in snapshot.documents.items()},
+        }))
+        try:
+            os.rename(staging, target)
+        except OSError:
+            # Another worker published the same content first
+            shutil.rmtree(staging, ignore_errors=True)
+
+    current = _read_pointer(root)
+    if current is not None and current[1] > snapshot.built_at:
+        return current
+    pointer = root / f'.CURRENT.{os.getpid()}.{threading.get_ident()}'
+    pointer.write_text(f'{snapshot.version} {snapshot.built_at}')
+    os.replace(pointer, root / 'CURRENT')
+    _prune(root, snapshot.version)
+    return snapshot.version, snapshot.built_at
+
+
+def _prune(root, keep):
+    versions = sorted(
+        (path for path in root.iterdir() if path.is_dir() and not path.name.startswith('.')),
+        key=lambda path: path.stat().st_mtime, reverse=True,
+    )
+    for path in versions[SNAPSHOT_KEEP_VERSIONS:]:
+        if path.name != keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+# This worker's snapshot, or None until one is published or loaded from
+# disk. _dirty_at is the time of the latest catalog write seen, here or in
+# another worker; a snapshot built before it is not served.
+_current = None
+_dirty_at = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def publish_snapshot():
+    """Rebuild the catalog snapshot from the database and publish it"""
+    global _current, _checked_at
+    with _lock:
+        snapshot = build_snapshot()
+        directory = settings.CATALOG_SNAPSHOT_DIR
+        if directory:
+            version, _ = _write(directory, snapshot)
+            if version != snapshot.version:
+                snapshot = Snapshot.load(directory, version)
+        _current = snapshot
+        _checked_at = time.monotonic()
+        logger.info(f"Published catalog snapshot {snapshot.version} ({len(snapshot.documents)} documents)")
+        return snapshot
+
+
+def warm_snapshot():
+    """
+    Make a snapshot available before the first request
+    Loads the one another worker published if it is still current, and
+    builds one otherwise. Called at startup, never on the request path.
+    """
+    global _current, _checked_at
+    directory = settings.CATALOG_SNAPSHOT_DIR
+    if directory:
+        root = Path(directory)
+        current = _read_pointer(root)
+        dirty_at = _read_dirty(root)
+        if current is not None and (dirty_at is None or dirty_at < current[1]):
+            _current = Snapshot.load(directory, current[0])
+            _checked_at = time.monotonic()
+            return _current
+    return publish_snapshot()
+
+
+def invalidate_snapshot():
+    """Stop serving this worker's snapshot until one is built after now"""
+    mark_dirty()
+
+
+def mark_dirty(shared=False):
+    """
+    Record a catalog write; reads fall through to the views until a
+    snapshot built after it is published
+    shared also records the write in CATALOG_SNAPSHOT_DIR for other workers.
+    """
+    global _dirty_at
+    _dirty_at = time.time()
+    directory = settings.CATALOG_SNAPSHOT_DIR
+    if shared and directory:
+        root = Path(directory)
+        root.mkdir(parents=True, exist_ok=True)
+        marker = root / f'.DIRTY.{os.getpid()}.{threading.get_ident()}'
+        marker.write_text(str(_dirty_at))
+        os.replace(marker, root / 'DIRTY')
+
+
+def get_snapshot():
+    """
+    The current catalog snapshot, reloaded if another worker published a newer one
+    Never builds: returns None while there is no snapshot, or a catalog
+    write is newer than the one there is, and schedules a background
+    rebuild for the first case if background rebuilds are on.
+    """
+    global _current, _checked_at, _dirty_at
+    snapshot = _current
+    directory = settings.CATALOG_SNAPSHOT_DIR
+    if directory and time.monotonic() - _checked_at >= SNAPSHOT_CHECK_SECONDS:
+        _checked_at = time.monotonic()
+        root = Path(directory)
+        current = _read_pointer(root)
+        if current is not None and (snapshot is None or (current[0] != snapshot.version and current[1] > snapshot.built_at)):
+            snapshot = _current = Snapshot.load(directory, current[0])
+        dirty_at = _read_dirty(root)
+        if dirty_at is not None and (_dirty_at is None or dirty_at > _dirty_at):
+            _dirty_at = dirty_at
+
+    if snapshot is None:
+        if settings.CATALOG_SNAPSHOT_REBUILD_IN_BACKGROUND:
+            _rebuilder.schedule()
+        return None
+    if _dirty_at is not None and _dirty_at >= snapshot.built_at:
+        return None
+    return snapshot
+
+
+class _Rebuilder:
+    """Rebuilds the snapshot on a background thread, once per burst of writes"""
+
+    def __init__(self):
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def schedule(self):
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Timer(SNAPSHOT_REBUILD_DELAY, self._run)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _run(self):
+        with self._lock:
+            self._timer = None
+        try:
+            publish_snapshot()
+        except Exception as e:
+            logger.error(f"Failed to rebuild catalog snapshot: {e}")
+        finally:
+            connection.close()
+
+
+_rebuilder = _Rebuilder()
+
+
+def snapshot_response(request, name):
+    """Response for a snapshot document, or None if the snapshot is dirty or has no such document"""
+    snapshot = get_snapshot()
+    if snapshot is None:
+        return None
+    document = snapshot.document(name)
+    if document is None:
+        return None
+
+    encoding = document.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    body = document.variants[encoding]
+    if isinstance(body, Path):
+        # Another worker's snapshot: let the server send the file
+        response = FileResponse(body.open('rb'), content_type='application/json')
+        del response['Content-Disposition']
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    if encoding != 'identity':
+        response['Content-Encoding'] = encoding
+    response['Vary'] = 'Accept-Encoding'
+    response['ETag'] = document.etag
+    response['Last-Modified'] = http_date(snapshot.built_at)
+    return get_conditional_response(
+        request, etag=document.etag, last_modified=int(snapshot.built_at), response=response
+    )
+
+
+def serve_snapshot(name):
+    """
+    Serve a GET view's default representation from the catalog snapshot
+    name is formatted with the view's URL kwargs. Requests with ?fields=,
+    and documents the snapshot lacks, fall through to the view.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if 'fields' not in request.GET:
+                try:
+                    response = snapshot_response(request, name.format(**kwargs))
+                except Exception as e:
+                    logger.warning(f"Catalog snapshot unavailable: {e}")
+                    response = None
+                if response is not None:
+                    return response
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@receiver(post_save, sender=Boat)
+@receiver(post_delete, sender=Boat)
+@receiver(post_save, sender=BoatFeature)
+@receiver(post_delete, sender=BoatFeature)
+def _mark_dirty_on_change(sender, instance, **kwargs):
+    """
+    Stop serving the snapshot until it is rebuilt after this write
+    The rebuild runs on a background thread after SNAPSHOT_REBUILD_DELAY,
+    or from the publish_catalog_snapshot command when
+    CATALOG_SNAPSHOT_REBUILD_IN_BACKGROUND is off, never in the request.
+    """
+    mark_dirty()
+    transaction.on_commit(_on_catalog_commit)
+
+
+def _on_catalog_commit():
+    mark_dirty(shared=True)
+    if settings.CATALOG_SNAPSHOT_REBUILD_IN_BACKGROUND:
+        _rebuilder.schedule()
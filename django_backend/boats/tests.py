@@ -1,3 +1,719 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from bookings.models import Booking, CalendarEvent
+from ownership.rules import invalidate_rules
+from .autocomplete import get_autocomplete_index, invalidate_autocomplete
+from .snapshot import Snapshot, invalidate_snapshot, publish_snapshot, warm_snapshot
+from yachtak_api.caching import cache_metrics, reset_cache_metrics
+from yachtak_api.singleflight import SingleFlight, reset_single_flight_metrics, single_flight_metrics, single_flight_view
+from .models import Boat, BoatFeature
 
-# Create your tests here.
+User = get_user_model()
+
+
+def make_boat(**overrides):
+    fields = {
+        'name': 'Test Yacht', 'model': 'D42', 'capacity': 10,
+        'length': Decimal('12.80'), 'location': 'Hurghada',
+        'daily_rate': Decimal('1000.00'),
+    }
+    fields.update(overrides)
+    return Boat.objects.create(**fields)
+
+
+class AllBoatsAvailabilityTests(TestCase):
+    """Fleet availability endpoint - windowed bulk fetch"""
+
+    def setUp(self):
+        self.user = User.objects.create(phone='+201000000001')
+        self.today = date.today()
+
+    def add_boats(self, count):
+        for i in range(count):
+            boat = make_boat(name=f'Yacht {Boat.objects.count()}')
+            Booking.objects.create(
+                boat=boat, user=self.user, status='confirmed',
+                start_date=self.today + timedelta(days=10), end_date=self.today + timedelta(days=12),
+            )
+            CalendarEvent.objects.create(
+                boat=boat, event_type='maintenance', title='Service',
+                start_date=self.today + timedelta(days=20), end_date=self.today + timedelta(days=20),
+            )
+
+    def fetch(self, params=None):
+        response = self.client.get('/boats/availability/', params or {})
+        self.assertEqual(response.status_code, 200)
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_query_count_constant_as_fleet_grows(self):
+        self.add_boats(2)
+        with self.assertNumQueries(3):
+            small = self.fetch()
+        self.add_boats(20)
+        with self.assertNumQueries(3):
+            large = self.fetch()
+        self.assertEqual(small['total_boats'], 2)
+        self.assertEqual(large['total_boats'], 22)
+
+    def test_window_filters_bookings(self):
+        self.add_boats(1)
+        data = self.fetch()
+        boat = data['boats_availability'][0]
+        self.assertEqual(len(boat['upcoming_bookings']), 1)
+        self.assertEqual(len(boat['blocked_periods']), 1)
+
+        data = self.fetch({
+            'start_date': (self.today + timedelta(days=13)).isoformat(),
+            'end_date': (self.today + timedelta(days=19)).isoformat(),
+        })
+        boat = data['boats_availability'][0]
+        self.assertEqual(boat['upcoming_bookings'], [])
+        self.assertEqual(boat['blocked_periods'], [])
+
+    def test_default_window_is_90_days(self):
+        data = self.fetch()
+        self.assertEqual(data['window'], {
+            'start_date': self.today.isoformat(),
+            'end_date': (self.today + timedelta(days=90)).isoformat(),
+        })
+
+    def test_invalid_window(self):
+        response = self.client.get('/boats/availability/', {'start_date': '2025-13-01'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/boats/availability/', {
+            'start_date': '2025-01-01', 'end_date': '2027-01-01',
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+class SearchBoatsTests(TestCase):
+    """Fleet availability search - anti-join against bookings and blocked dates"""
+
+    def setUp(self):
+        from ownership.models import BookingRule
+        invalidate_rules()
+        self.user = User.objects.create(phone='+201000000001')
+        self.start = date.today() + timedelta(days=30)
+        self.end = self.start + timedelta(days=2)
+        self.free = make_boat(name='Free', capacity=12, location='El Gouna, Egypt')
+        self.booked = make_boat(name='Booked', capacity=12, location='El Gouna, Egypt')
+        self.serviced = make_boat(name='Serviced', capacity=12, location='El Gouna, Egypt')
+        self.small = make_boat(name='Small', capacity=4, location='El Gouna, Egypt')
+        self.elsewhere = make_boat(name='Elsewhere', capacity=12, location='Hurghada Marina')
+        self.peak = make_boat(name='Peak', capacity=12, location='El Gouna, Egypt', daily_rate=Decimal('500.00'))
+        Booking.objects.create(
+            boat=self.booked, user=self.user, status='pending',
+            start_date=self.end, end_date=self.end + timedelta(days=3),
+        )
+        Booking.objects.create(
+            boat=self.free, user=self.user, status='cancelled',
+            start_date=self.start, end_date=self.end,
+        )
+        CalendarEvent.objects.create(
+            boat=self.serviced, event_type='blocked', title='Owner hold',
+            start_date=self.start - timedelta(days=5), end_date=self.start,
+        )
+        BookingRule.objects.create(
+            boat=self.peak, rule_type='seasonal_multiplier', rule_name='Peak',
+            start_date=self.start, end_date=self.end, multiplier_value=Decimal('1.5'),
+        )
+
+    def search(self, **params):
+        params.setdefault('start_date', self.start.isoformat())
+        params.setdefault('end_date', self.end.isoformat())
+        response = self.client.get('/boats/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_only_bookable_boats_returned_cheapest_first(self):
+        with self.assertNumQueries(2):
+            data = self.search(guest_count=8, location='gouna')
+        self.assertEqual([b['name'] for b in data['boats']], ['Peak', 'Free'])
+        self.assertEqual(data['boats'][0]['quote']['total_amount'], '2250.0000')
+        self.assertEqual(data['boats'][1]['quote']['total_amount'], '3000.00')
+
+    def test_max_price_applies_to_quoted_total(self):
+        data = self.search(guest_count=8, location='gouna', max_price='2500')
+        self.assertEqual([b['name'] for b in data['boats']], ['Peak'])
+
+    def test_minimum_stay_rule_excludes_boat(self):
+        from ownership.models import BookingRule
+        BookingRule.objects.create(
+            boat=self.free, rule_type='minimum_stay', rule_name='Week only',
+            start_date=self.start, end_date=self.end, days_requirement=7,
+        )
+        data = self.search(guest_count=8, location='gouna')
+        self.assertEqual([b['name'] for b in data['boats']], ['Peak'])
+
+    def test_limit_is_clamped_to_at_least_one(self):
+        for limit in (-1, 0):
+            data = self.search(guest_count=8, location='gouna', limit=limit)
+            self.assertEqual([b['name'] for b in data['boats']], ['Peak'])
+
+    def test_requires_dates(self):
+        response = self.client.get('/boats/search/')
+        self.assertEqual(response.status_code, 400)
+
+
+class NextAvailableTests(TestCase):
+    """Next-available-slot finder"""
+
+    def test_returns_earliest_windows(self):
+        user = User.objects.create(phone='+201000000001')
+        boat = make_boat()
+        start = date.today() + timedelta(days=10)
+        Booking.objects.create(
+            boat=boat, user=user, status='confirmed',
+            start_date=start, end_date=start + timedelta(days=3),
+        )
+        response = self.client.get(f'/boats/{boat.id}/next-available/', {
+            'start_date': start.isoformat(), 'days': 2, 'count': 2,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['windows'], [{
+            'start_date': (start + timedelta(days=4)).isoformat(),
+            'end_date': (start + timedelta(days=5)).isoformat(),
+            'free_until': None,
+        }, {
+            'start_date': (start + timedelta(days=6)).isoformat(),
+            'end_date': (start + timedelta(days=7)).isoformat(),
+            'free_until': None,
+        }])
+
+    def test_idle_boat_returns_every_window_asked_for(self):
+        boat = make_boat()
+        start = date.today() + timedelta(days=10)
+        response = self.client.get(f'/boats/{boat.id}/next-available/', {
+            'start_date': start.isoformat(), 'days': 3, 'count': 5,
+        })
+        windows = response.json()['windows']
+        self.assertEqual(len(windows), 5)
+        self.assertEqual(
+            [window['start_date'] for window in windows],
+            [(start + timedelta(days=3 * n)).isoformat() for n in range(5)],
+        )
+        self.assertEqual(windows[-1]['end_date'], (start + timedelta(days=14)).isoformat())
+
+    def test_rejects_bad_count(self):
+        boat = make_boat()
+        response = self.client.get(f'/boats/{boat.id}/next-available/', {'count': 0})
+        self.assertEqual(response.status_code, 400)
+
+
+class PriceCalendarTests(TestCase):
+    """Run-length encoded price calendar"""
+
+    def setUp(self):
+        from ownership.models import BookingRule
+        invalidate_rules()
+        self.user = User.objects.create(phone='+201000000001')
+        self.boat = make_boat()
+        self.start = date.today() + timedelta(days=10)
+        BookingRule.objects.create(
+            boat=self.boat, rule_type='seasonal_multiplier', rule_name='Peak',
+            start_date=self.start + timedelta(days=5), end_date=self.start + timedelta(days=9),
+            multiplier_value=Decimal('1.5'),
+        )
+        Booking.objects.create(
+            boat=self.boat, user=self.user, status='confirmed',
+            start_date=self.start + timedelta(days=2), end_date=self.start + timedelta(days=3),
+        )
+        CalendarEvent.objects.create(
+            boat=self.boat, event_type='maintenance', title='Service',
+            start_date=self.start + timedelta(days=3), end_date=self.start + timedelta(days=4),
+        )
+
+    def test_runs_cover_range(self):
+        response = self.client.get(f'/boats/{self.boat.id}/price-calendar/', {
+            'from': self.start.isoformat(),
+            'to': (self.start + timedelta(days=19)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['days'], 20)
+        self.assertEqual(data['prices'], [
+            [0, 5, '1000.00'], [5, 5, '1500.00'], [10, 10, '1000.00'],
+        ])
+        self.assertEqual(data['unavailable'], [[2, 3]])
+
+    def test_default_is_one_year(self):
+        data = self.client.get(f'/boats/{self.boat.id}/price-calendar/').json()
+        self.assertEqual(data['days'], 365)
+        self.assertEqual(sum(run[1] for run in data['prices']), 365)
+
+    def test_rejects_long_range(self):
+        response = self.client.get(f'/boats/{self.boat.id}/price-calendar/', {
+            'from': '2025-01-01', 'to': '2027-06-01',
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+class SparseFieldsTests(TestCase):
+    """?fields= on the boat catalog"""
+
+    def setUp(self):
+        self.boat = make_boat(daily_rate=Decimal('800.00'), description='Long text ' * 50)
+        BoatFeature.objects.create(boat=self.boat, feature_name='Flybridge', feature_value='Yes')
+
+    def test_list_returns_only_requested_fields(self):
+        boats = self.client.get('/boats/', {'fields': 'id,name,daily_rate,image_url'}).json()
+        self.assertEqual(boats, [{'id': self.boat.id, 'name': 'Test Yacht', 'daily_rate': '800.00', 'image_url': ''}])
+        self.assertIn('description', self.client.get('/boats/').json()[0])
+
+    def test_detail_features_are_selectable(self):
+        detail = self.client.get(f'/boats/{self.boat.id}/', {'fields': 'name,features'}).json()
+        self.assertEqual(detail, {'name': 'Test Yacht', 'features': [{'name': 'Flybridge', 'value': 'Yes'}]})
+        self.assertNotIn('features', self.client.get(f'/boats/{self.boat.id}/', {'fields': 'id'}).json())
+
+    def test_unknown_field_is_rejected(self):
+        self.assertEqual(self.client.get('/boats/', {'fields': 'id,secret'}).status_code, 400)
+        self.assertEqual(self.client.get('/boats/', {'fields': 'name.first'}).status_code, 400)
+        self.assertEqual(self.client.get('/boats/', {'fields': ','}).status_code, 400)
+
+
+class ConditionalGetTests(TestCase):
+    """ETags on catalog reads; Last-Modified only from the snapshot"""
+
+    def setUp(self):
+        self.boat = make_boat()
+        self.feature = BoatFeature.objects.create(boat=self.boat, feature_name='Flybridge', feature_value='Yes')
+
+    def revalidate(self, path, response, **params):
+        return self.client.get(path, params, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_catalog_is_not_modified(self):
+        response = self.client.get('/boats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response)
+        again = self.revalidate('/boats/', response)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b'')
+
+    def test_if_modified_since_alone_never_answers_stale(self):
+        # A deleted booking leaves every timestamp where it was
+        user = User.objects.create(phone='+201000000001')
+        start = date.today() + timedelta(days=5)
+        booking = Booking.objects.create(boat=self.boat, user=user, status='confirmed', start_date=start, end_date=start)
+        calendar = f'/boats/{self.boat.id}/calendar/'
+        response = self.client.get(calendar)
+        self.assertNotIn('Last-Modified', response)
+        booking.delete()
+        again = self.client.get(calendar, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(again.status_code, 200)
+        self.assertNotEqual(again['ETag'], response['ETag'])
+
+    def test_query_string_is_part_of_the_etag(self):
+        response = self.client.get('/boats/')
+        self.assertEqual(self.revalidate('/boats/', response, fields='id').status_code, 200)
+
+    def test_boat_edit_changes_the_etag(self):
+        path = f'/boats/{self.boat.id}/'
+        response = self.client.get(path)
+        self.boat.daily_rate = Decimal('1200.00')
+        self.boat.save()
+        again = self.revalidate(path, response)
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json()['daily_rate'], '1200.00')
+
+    def test_feature_edit_and_delete_change_the_etag(self):
+        path = f'/boats/{self.boat.id}/'
+        response = self.client.get(path)
+        self.feature.feature_value = 'No'
+        self.feature.save()
+        edited = self.revalidate(path, response)
+        self.assertEqual(edited.status_code, 200)
+        self.feature.delete()
+        self.assertEqual(self.revalidate(path, edited).status_code, 200)
+
+    def test_booking_changes_calendar_etags(self):
+        user = User.objects.create(phone='+201000000001')
+        calendar = f'/boats/{self.boat.id}/calendar/'
+        prices = f'/boats/{self.boat.id}/price-calendar/'
+        calendar_response = self.client.get(calendar)
+        prices_response = self.client.get(prices)
+        self.assertEqual(self.revalidate(calendar, calendar_response).status_code, 304)
+        self.assertEqual(self.revalidate(prices, prices_response).status_code, 304)
+        start = date.today() + timedelta(days=5)
+        Booking.objects.create(boat=self.boat, user=user, status='confirmed', start_date=start, end_date=start)
+        self.assertEqual(self.revalidate(calendar, calendar_response).status_code, 200)
+        self.assertEqual(self.revalidate(prices, prices_response).status_code, 200)
+
+
+class ResponseCacheTests(TestCase):
+    """Per-view cache policies and tag invalidation"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(phone='+201000000001')
+        self.boat = make_boat()
+        self.other = make_boat(name='Other Yacht')
+        self.start = date.today() + timedelta(days=10)
+        reset_cache_metrics()
+
+    def test_repeat_reads_are_hits(self):
+        self.assertEqual(self.client.get('/boats/', {'fields': 'id,name'})['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/boats/', {'fields': 'id,name', 'utm_source': 'mail'})['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get('/boats/', {'fields': 'id'})['X-Cache'], 'MISS')
+        catalog = cache_metrics()['policies']['boats.catalog']
+        self.assertEqual((catalog['hits'], catalog['misses'], catalog['stores']), (1, 2, 2))
+        self.assertEqual(catalog['hit_ratio'], 0.333)
+
+    def test_errors_are_not_cached(self):
+        self.client.get('/boats/9999/', {'fields': 'id'})
+        self.assertEqual(self.client.get('/boats/9999/', {'fields': 'id'}).status_code, 404)
+        self.assertNotIn('stores', cache_metrics()['policies']['boats.detail'])
+
+    def test_boat_save_invalidates_catalog_and_detail(self):
+        detail = f'/boats/{self.boat.id}/'
+        fields = {'fields': 'id,daily_rate'}
+        self.client.get('/boats/', fields)
+        self.client.get(detail, fields)
+        self.boat.daily_rate = Decimal('1500.00')
+        self.boat.save()
+        response = self.client.get(detail, fields)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['daily_rate'], '1500.00')
+        self.assertEqual(self.client.get('/boats/', fields)['X-Cache'], 'MISS')
+
+    def test_booking_invalidates_only_its_boat(self):
+        params = {'start_date': self.start.isoformat(), 'end_date': self.start.isoformat()}
+        for boat in (self.boat, self.other):
+            self.client.get(f'/boats/{boat.id}/rental-quote/', params)
+        Booking.objects.create(
+            boat=self.boat, user=self.user, status='confirmed', start_date=self.start, end_date=self.start,
+        )
+        quote = self.client.get(f'/boats/{self.boat.id}/rental-quote/', params)
+        self.assertEqual(quote['X-Cache'], 'MISS')
+        self.assertFalse(quote.json()['available'])
+        self.assertEqual(self.client.get(f'/boats/{self.other.id}/rental-quote/', params)['X-Cache'], 'HIT')
+        self.assertEqual(cache_metrics()['invalidations']['boat'], 1)
+
+    def test_file_backend(self):
+        with tempfile.TemporaryDirectory() as location:
+            backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+            with override_settings(CACHES={'default': backend}):
+                self.assertEqual(self.client.get(f'/boats/{self.boat.id}/calendar/')['X-Cache'], 'MISS')
+                self.assertEqual(self.client.get(f'/boats/{self.boat.id}/calendar/')['X-Cache'], 'HIT')
+
+    def test_unreachable_backend_serves_uncached(self):
+        backend = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:1/0'}
+        with override_settings(CACHES={'default': backend}):
+            response = self.client.get('/boats/', {'fields': 'id'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Cache', response)
+        self.assertEqual(cache_metrics()['policies']['boats.catalog']['errors'], 1)
+
+
+class SingleFlightTests(TestCase):
+    """Concurrent identical computations run once"""
+
+    def setUp(self):
+        cache.clear()
+        reset_single_flight_metrics()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        return {'boats': self.calls}
+
+    def run_concurrently(self, flights, count):
+        results = []
+        threads = [
+            threading.Thread(target=lambda flight=flight: results.append(flight.do('catalog', self.compute)))
+            for flight in flights[:1] + flights[-1:] * (count - 1)
+        ]
+        threads[0].start()
+        self.started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.2)
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+        return results
+
+    def test_waiters_share_the_leaders_result(self):
+        flight = SingleFlight('test.local', across_workers=False)
+        results = self.run_concurrently([flight], 8)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [{'boats': 1}] * 8)
+        self.assertEqual(single_flight_metrics()['test.local'], {'leaders': 1, 'coalesced': 7})
+        self.assertEqual(flight.do('catalog', self.compute), {'boats': 2})
+
+    def test_workers_share_through_the_cache_lock(self):
+        # Two instances stand in for two workers sharing one cache backend
+        worker_a = SingleFlight('test.shared', across_workers=True, poll_interval=0.01)
+        worker_b = SingleFlight('test.shared', across_workers=True, poll_interval=0.01)
+        results = self.run_concurrently([worker_a, worker_b], 4)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [{'boats': 1}] * 4)
+        metrics = single_flight_metrics()['test.shared']
+        self.assertEqual(metrics['leaders'], 1)
+        self.assertEqual(metrics['remote'], 1)
+        self.assertEqual(metrics['coalesced'], 2)
+
+    def test_unshared_result_is_recomputed_by_other_workers(self):
+        worker_a = SingleFlight('test.private', across_workers=True, poll_interval=0.01, share=lambda result: False)
+        worker_b = SingleFlight('test.private', across_workers=True, poll_interval=0.01)
+        self.run_concurrently([worker_a, worker_b], 2)
+        self.assertEqual(self.calls, 2)
+
+    def test_availability_response_is_unchanged(self):
+        make_boat()
+        response = self.client.get('/boats/availability/')
+        body = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(body['total_boats'], 1)
+        self.assertEqual(single_flight_metrics()['boats.availability'], {'leaders': 1})
+
+    def test_replayed_response_keeps_every_header(self):
+        @single_flight_view('test.headers')
+        def view(request):
+            response = HttpResponse(b'{}', content_type='application/json', status=200)
+            response['Content-Disposition'] = 'attachment; filename="boats.json"'
+            response['Vary'] = 'Accept-Encoding'
+            response['Cache-Control'] = 'max-age=60'
+            return response
+
+        response = view(RequestFactory().get('/boats/'))
+        self.assertEqual(response.content, b'{}')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="boats.json"')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Cache-Control'], 'max-age=60')
+
+    def test_streaming_response_is_passed_through(self):
+        streamed = []
+
+        @single_flight_view('test.streaming')
+        def view(request):
+            response = StreamingHttpResponse(iter([b'[', b']']), content_type='application/json')
+            streamed.append(response)
+            return response
+
+        response = view(RequestFactory().get('/boats/availability/'))
+        self.assertIs(response, streamed[0])
+        self.assertEqual(b''.join(response.streaming_content), b'[]')
+
+
+@override_settings(CATALOG_SNAPSHOT_DIR='')
+class CatalogSnapshotTests(TestCase):
+    """Precompressed catalog served without the ORM"""
+
+    def setUp(self):
+        self.boat = make_boat(description='Long text ' * 50)
+        BoatFeature.objects.create(boat=self.boat, feature_name='Flybridge', feature_value='Yes')
+        make_boat(name='Private Yacht', allow_public_rental=False)
+        publish_snapshot()
+
+    def test_snapshot_matches_orm_rendering(self):
+        for path in ('/boats/', f'/boats/{self.boat.id}/'):
+            snapshot = self.client.get(path).json()
+            invalidate_snapshot()
+            fields = ','.join(snapshot if isinstance(snapshot, dict) else snapshot[0])
+            self.assertEqual(snapshot, self.client.get(path, {'fields': fields}).json())
+
+    def test_reads_do_not_query(self):
+        self.client.get('/boats/')
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.client.get('/boats/').json()), 1)
+            detail = self.client.get(f'/boats/{self.boat.id}/').json()
+        self.assertEqual(detail['features'], [{'name': 'Flybridge', 'value': 'Yes'}])
+
+    def test_gzip_variant(self):
+        response = self.client.get('/boats/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content))[0]['id'], self.boat.id)
+        self.assertEqual(
+            self.client.get('/boats/', HTTP_ACCEPT_ENCODING='gzip;q=0').get('Content-Encoding'), None
+        )
+
+    def test_feature_save_bypasses_stale_snapshot(self):
+        etag = self.client.get(f'/boats/{self.boat.id}/')['ETag']
+        BoatFeature.objects.create(boat=self.boat, feature_name='Tender', feature_value='Yes')
+        response = self.client.get(f'/boats/{self.boat.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['features']), 2)
+        self.assertEqual(
+            self.client.get(f'/boats/{self.boat.id}/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304
+        )
+
+        # Served from the snapshot again once it is rebuilt
+        publish_snapshot()
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.client.get(f'/boats/{self.boat.id}/').json()['features']), 2)
+
+    @override_settings(CATALOG_SNAPSHOT_REBUILD_IN_BACKGROUND=True)
+    def test_burst_of_writes_rebuilds_once_in_background(self):
+        with mock.patch('boats.snapshot.SNAPSHOT_REBUILD_DELAY', 0.1), \
+                mock.patch('boats.snapshot.publish_snapshot') as publish:
+            for n in range(5):
+                with self.captureOnCommitCallbacks(execute=True):
+                    BoatFeature.objects.create(boat=self.boat, feature_name=f'Extra {n}', feature_value='Yes')
+            publish.assert_not_called()
+            time.sleep(0.3)
+        publish.assert_called_once_with()
+
+    @override_settings(CATALOG_SNAPSHOT_REBUILD_IN_BACKGROUND=True)
+    def test_cold_worker_falls_through_without_building(self):
+        with mock.patch('boats.snapshot._current', None), \
+                mock.patch('boats.snapshot.build_snapshot') as build, \
+                mock.patch('boats.snapshot._rebuilder') as rebuilder:
+            response = self.client.get('/boats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['id'], self.boat.id)
+        build.assert_not_called()
+        rebuilder.schedule.assert_called_once_with()
+
+    def test_warm_snapshot_loads_one_already_published(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(CATALOG_SNAPSHOT_DIR=directory):
+            published = publish_snapshot()
+            with mock.patch('boats.snapshot.build_snapshot') as build:
+                warmed = warm_snapshot()
+            build.assert_not_called()
+            self.assertEqual(warmed.version, published.version)
+
+    def test_unknown_boat_falls_through(self):
+        self.assertEqual(self.client.get('/boats/9999/').status_code, 404)
+
+    def test_published_files_are_served_by_other_workers(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(CATALOG_SNAPSHOT_DIR=directory):
+            published = publish_snapshot()
+            self.assertTrue(os.path.exists(os.path.join(directory, published.version, 'catalog.json.gz')))
+            loaded = Snapshot.load(directory, published.version)
+            self.assertEqual(loaded.document('catalog').etag, published.document('catalog').etag)
+            self.assertEqual(
+                loaded.document(f'boats/{self.boat.id}').variants['identity'].read_bytes(),
+                published.document(f'boats/{self.boat.id}').variants['identity'],
+            )
+
+
+class FullTextSearchTests(TestCase):
+    """Ranked search over the catalog index"""
+
+    def setUp(self):
+        self.flybridge = make_boat(name='Sea Breeze', location='Hurghada Marina', capacity=12,
+                                   description='Spacious cruiser for families')
+        BoatFeature.objects.create(boat=self.flybridge, feature_name='Flybridge', feature_value='Yes')
+        self.small = make_boat(name='Little Gull', location='Hurghada Marina', capacity=6,
+                               description='Has a flybridge lounge')
+        self.gouna = make_boat(name='Desert Rose', location='El Gouna', capacity=14,
+                               description='Flybridge, two decks')
+
+    def search(self, q, **params):
+        response = self.client.get('/boats/text-search/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_terms_and_guest_count(self):
+        body = self.search('flybridge Hurghada 12 guests')
+        self.assertEqual(body['search']['terms'], ['flybridge', 'hurghada'])
+        self.assertEqual(body['search']['min_capacity'], 12)
+        self.assertEqual([boat['id'] for boat in body['boats']], [self.flybridge.id])
+
+    def test_feature_match_outranks_description_match(self):
+        ids = [boat['id'] for boat in self.search('flybridge hurghada')['boats']]
+        self.assertEqual(ids, [self.flybridge.id, self.small.id])
+        scores = [boat['score'] for boat in self.search('flybridge')['boats']]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_limit_is_clamped_to_at_least_one(self):
+        self.assertEqual(self.search('flybridge', limit=-1)['count'], 1)
+        self.assertEqual(self.search('flybridge', limit=0)['count'], 1)
+
+    def test_boat_removed_after_ranking_is_skipped(self):
+        ranked = [(self.gouna.id, 2.0), (999999, 1.5), (self.small.id, 1.0)]
+        with mock.patch('boats.fulltext.search_boat_ids', return_value=ranked):
+            body = self.search('flybridge')
+        self.assertEqual([boat['id'] for boat in body['boats']], [self.gouna.id, self.small.id])
+
+    def test_stemming_and_prefix(self):
+        self.assertEqual(self.search('cruisers')['count'], 1)
+        self.assertEqual(self.search('desert ro')['boats'][0]['id'], self.gouna.id)
+
+    def test_index_follows_writes(self):
+        self.assertEqual(self.search('tender')['count'], 0)
+        feature = BoatFeature.objects.create(boat=self.gouna, feature_name='Tender', feature_value='Jet ski')
+        self.assertEqual(self.search('jet ski')['boats'][0]['id'], self.gouna.id)
+        feature.delete()
+        self.assertEqual(self.search('tender')['count'], 0)
+        self.gouna.name = 'Nile Star'
+        self.gouna.save()
+        self.assertEqual(self.search('nile')['count'], 1)
+        self.assertEqual(self.search('rose')['count'], 0)
+        self.gouna.delete()
+        self.assertEqual(self.search('nile')['count'], 0)
+
+    def test_fields_and_validation(self):
+        body = self.search('gouna', fields='name')
+        self.assertEqual(body['boats'], [{'name': 'Desert Rose'}])
+        self.assertEqual(self.client.get('/boats/text-search/').status_code, 400)
+        self.assertEqual(self.client.get('/boats/text-search/', {'q': '"; DROP'}).status_code, 200)
+
+
+class AutocompleteTests(TestCase):
+    """Prefix suggestions from the in-memory index"""
+
+    def setUp(self):
+        invalidate_autocomplete()
+        self.breeze = make_boat(name='Sea Breeze', model='D42', location='Hurghada Marina')
+        make_boat(name='Seahorse', model='D50', location='Hurghada Marina')
+        make_boat(name='Zephyr', model='D42', location='Marsa Alam')
+        make_boat(name='Hidden', allow_public_rental=False)
+
+    def suggest(self, q, **params):
+        response = self.client.get('/boats/autocomplete/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(item['text'], item['type']) for item in response.json()['suggestions']]
+
+    def test_prefix_matches_every_kind(self):
+        self.assertEqual(self.suggest('sea'), [('Sea Breeze', 'boat'), ('Seahorse', 'boat')])
+        self.assertEqual(self.suggest('d4'), [('D42', 'model')])
+        self.assertEqual(self.suggest('  HURG '), [('Hurghada Marina', 'location')])
+        self.assertEqual(self.suggest('hid'), [])
+
+    def test_word_matches_rank_after_leading_matches(self):
+        self.assertEqual(self.suggest('mar'), [('Marsa Alam', 'location'), ('Hurghada Marina', 'location')])
+        self.assertEqual(self.suggest('breeze'), [('Sea Breeze', 'boat')])
+
+    def test_counts_and_limit(self):
+        response = self.client.get('/boats/autocomplete/', {'q': 'hurghada'}).json()
+        self.assertEqual(response['suggestions'][0]['count'], 2)
+        self.assertEqual(len(self.suggest('s', limit=1)), 1)
+        self.assertEqual(self.client.get('/boats/autocomplete/').status_code, 400)
+
+    def test_boat_writes_refresh_the_index(self):
+        self.assertEqual(self.suggest('sea b'), [('Sea Breeze', 'boat')])
+        self.breeze.name = 'Blue Lagoon'
+        self.breeze.save()
+        self.assertEqual(self.suggest('sea b'), [])
+        self.assertEqual(self.suggest('lagoon'), [('Blue Lagoon', 'boat')])
+
+    def test_lookup_does_not_query(self):
+        get_autocomplete_index()
+        with self.assertNumQueries(0):
+            self.suggest('sea')
+
+    def test_expired_index_is_kept_while_the_catalog_is_unchanged(self):
+        index = get_autocomplete_index()
+        index.built_at -= 3600
+        self.assertIs(get_autocomplete_index(), index)
+        Boat.objects.filter(id=self.breeze.id).update(name='Blue Lagoon', updated_at=timezone.now())
+        index.built_at -= 3600
+        self.assertIsNot(get_autocomplete_index(), index)
+        self.assertEqual(self.suggest('lagoon'), [('Blue Lagoon', 'boat')])
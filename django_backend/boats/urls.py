@@ -10,7 +10,12 @@ app_name = 'boats'
 urlpatterns = [
     # Task 2 - Boats API endpoints
     path('boats/', views_task2.list_boats, name='list-boats'),
+    path('boats/search/', views_task2.search_boats, name='search-boats'),
+    path('boats/text-search/', views_task2.text_search_boats, name='text-search-boats'),
+    path('boats/autocomplete/', views_task2.autocomplete_boats, name='autocomplete-boats'),
     path('boats/<int:boat_id>/', views_task2.boat_detail, name='boat-detail'),
     path('boats/<int:boat_id>/availability/', views_task2.boat_availability, name='boat-availability'),
+    path('boats/<int:boat_id>/next-available/', views_task2.boat_next_available, name='boat-next-available'),
+    path('boats/<int:boat_id>/price-calendar/', views_task2.boat_price_calendar, name='boat-price-calendar'),
     path('boats/availability/', views_task2.all_boats_availability, name='all-boats-availability'),
 ]
\ No newline at end of file
@@ -3,46 +3,69 @@ Task 2 - Boats API Views
 Public API for listing boats/yachts
 """
 import json
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
-from .models import Boat
-from bookings.models import Booking
-from datetime import datetime
+from django.utils import timezone
+from .models import Boat, BoatFeature
+from .caching import BOAT_DETAIL_CACHE, CATALOG_CACHE, PRICE_CALENDAR_CACHE
+from .snapshot import serve_snapshot
+from bookings.models import Booking, CalendarEvent
+from ownership.models import BookingRule
+from yachtak_api.caching import cached
+from yachtak_api.conditional import conditional_on
+from yachtak_api.singleflight import SingleFlight, single_flight_view
+from yachtak_api.serializers import BOAT, BOAT_DETAIL, InvalidFields, json_response, sparse
+from datetime import datetime, date, timedelta
+from decimal import Decimal, InvalidOperation
 import logging
 
 logger = logging.getLogger(__name__)
 
+def _catalog_scope(request):
+    return [Boat.objects.filter(is_active=True, allow_public_rental=True)]
+
+def _boat_scope(request, boat_id):
+    return [Boat.objects.filter(id=boat_id), BoatFeature.objects.filter(boat_id=boat_id)]
+
+def _price_calendar_scope(request, boat_id):
+    # Live holds are counted separately: one lapsing frees its dates
+    # without touching any row
+    return [
+        Boat.objects.filter(id=boat_id),
+        Booking.objects.filter(boat_id=boat_id),
+        Booking.objects.filter(boat_id=boat_id, hold_expires_at__gt=timezone.now()),
+        CalendarEvent.objects.filter(boat_id=boat_id),
+        BookingRule.objects.filter(boat_id=boat_id),
+    ]
+
 @require_http_methods(["GET"])
+@serve_snapshot('catalog')
+@conditional_on(_catalog_scope)
+@cached(CATALOG_CACHE)
+@single_flight_view('boats.catalog', vary=CATALOG_CACHE.vary)
 def list_boats(request):
     """
     Task 2 - List boats & basic fields
-    GET /boats/
-    Returns: Array of boats with id,name,model,capacity,location,allow_public_rental
+    GET /boats/?fields=id,name,daily_rate,image_url
+    Returns: Array of boats with id,name,model,capacity,location,allow_public_rental;
+    ?fields= limits both the columns read and the keys returned
     """
     try:
+        plan, _ = sparse(BOAT, request)
+        
         # Get all active boats that allow public rental
         boats = Boat.objects.filter(is_active=True, allow_public_rental=True)
-        
-        boats_data = []
-        for boat in boats:
-            boats_data.append({
-                'id': boat.id,
-                'name': boat.name,
-                'model': boat.model,
-                'capacity': boat.capacity,
-                'location': boat.location,
-                'allow_public_rental': boat.allow_public_rental,
-                'daily_rate': str(boat.daily_rate),
-                'length': str(boat.length),
-                'description': boat.description,
-                'image_url': boat.image_url,
-            })
+        boats_data = plan.serialize_queryset(boats)
         
         logger.info(f"Boats API called, returned {len(boats_data)} boats")
         
-        return JsonResponse(boats_data, safe=False)
+        return json_response(boats_data)
         
+    except InvalidFields as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
     except Exception as e:
         logger.error(f"Error in boats API: {e}")
         return JsonResponse({
@@ -50,41 +73,32 @@ def list_boats(request):
         }, status=500)
 
 @require_http_methods(["GET"])
+@serve_snapshot('boats/{boat_id}')
+@conditional_on(_boat_scope)
+@cached(BOAT_DETAIL_CACHE)
 def boat_detail(request, boat_id):
     """
     Get detailed information about a specific boat
-    GET /boats/{id}/
+    GET /boats/{id}/?fields=name,features
     """
     try:
-        boat = Boat.objects.get(id=boat_id, is_active=True)
+        plan, extras = sparse(BOAT_DETAIL, request, extra=('features',))
+        boat = plan.load(Boat.objects.filter(is_active=True)).get(id=boat_id)
+        boat_data = plan.serialize(boat)
         
         # Get boat features
-        features = []
-        for feature in boat.features.all():
-            features.append({
-                'name': feature.feature_name,
-                'value': feature.feature_value
-            })
-        
-        boat_data = {
-            'id': boat.id,
-            'name': boat.name,
-            'model': boat.model,
-            'capacity': boat.capacity,
-            'location': boat.location,
-            'allow_public_rental': boat.allow_public_rental,
-            'daily_rate': str(boat.daily_rate),
-            'length': str(boat.length),
-            'beam': str(boat.beam) if boat.beam else None,
-            'description': boat.description,
-            'image_url': boat.image_url,
-            'features': features,
-            'created_at': boat.created_at.isoformat(),
-            'updated_at': boat.updated_at.isoformat(),
-        }
+        if 'features' in extras:
+            boat_data['features'] = [
+                {'name': name, 'value': value}
+                for name, value in boat.features.values_list('feature_name', 'feature_value')
+            ]
         
         return JsonResponse(boat_data)
         
+    except InvalidFields as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
     except Boat.DoesNotExist:
         return JsonResponse({
             'error': 'Boat not found'
@@ -103,8 +117,7 @@ def boat_availability(request, boat_id):
     Returns: {"available": boolean, "conflicting_bookings": [...]}
     """
     try:
-        from datetime import datetime
-        from bookings.models import Booking
+        from bookings.occupancy import get_occupancy_index, conflict_summary
         
         boat = Boat.objects.get(id=boat_id, is_active=True)
         
@@ -124,30 +137,29 @@ def boat_availability(request, boat_id):
                 'error': 'Invalid date format. Use YYYY-MM-DD'
             }, status=400)
         
-        if start_date >= end_date:
+        if start_date > end_date:
             return JsonResponse({
-                'error': 'start_date must be before end_date'
+                'error': 'start_date must be before or equal to end_date'
             }, status=400)
         
-        # Check for conflicting bookings
-        conflicting_bookings = Booking.objects.filter(
-            boat=boat,
-            status__in=['confirmed', 'pending'],
-            start_date__lt=end_date,
-            end_date__gt=start_date
-        )
+        # Check bookings and blocking calendar events via the occupancy index
+        occupancy = get_occupancy_index(boat.id)
+        occupied = occupancy.conflicts(start_date, end_date)
         
-        conflicts = []
-        for booking in conflicting_bookings:
-            conflicts.append({
-                'id': booking.id,
-                'start_date': booking.start_date.isoformat(),
-                'end_date': booking.end_date.isoformat(),
-                'status': booking.status,
-                'guest_count': booking.guest_count
-            })
+        conflicts = [conflict_summary(o) for o in occupied if o.source == 'booking']
+        blocked_periods = [conflict_summary(o) for o in occupied if o.source == 'event']
         
-        is_available = len(conflicts) == 0
+        is_available = len(occupied) == 0
+        
+        # Offer the nearest free windows of the same length instead of a retry loop
+        alternatives = []
+        if not is_available:
+            duration_days = (end_date - start_date).days + 1
+            for window_start, gap_end in occupancy.free_windows(start_date, duration_days, 3):
+                alternatives.append({
+                    'start_date': window_start.isoformat(),
+                    'end_date': (window_start + timedelta(days=duration_days - 1)).isoformat(),
+                })
         
         return JsonResponse({
             'boat_id': boat_id,
@@ -158,7 +170,9 @@ def boat_availability(request, boat_id):
             },
             'available': is_available,
             'conflicting_bookings': conflicts,
-            'message': 'Available for booking' if is_available else f'{len(conflicts)} conflicting booking(s) found'
+            'blocked_periods': blocked_periods,
+            'alternatives': alternatives,
+            'message': 'Available for booking' if is_available else f'{len(conflicts)} conflicting booking(s), {len(blocked_periods)} blocked period(s) found'
         })
         
     except Boat.DoesNotExist:
@@ -171,55 +185,412 @@ def boat_availability(request, boat_id):
             'error': 'Failed to check boat availability'
         }, status=500)
 
-@csrf_exempt
 @require_http_methods(["GET"])
-def all_boats_availability(request):
+def boat_next_available(request, boat_id):
+    """
+    Find the earliest free windows for a boat
+    GET /boats/{id}/next-available/?start_date=YYYY-MM-DD&days=3&count=5
+    Returns: up to `count` windows of `days` days on or after start_date (default today)
+    """
+    try:
+        from bookings.occupancy import get_occupancy_index
+        
+        boat = Boat.objects.get(id=boat_id, is_active=True)
+        
+        try:
+            start_date_str = request.GET.get('start_date')
+            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date() if start_date_str else date.today()
+        except ValueError:
+            return JsonResponse({
+                'error': 'Invalid date format. Use YYYY-MM-DD'
+            }, status=400)
+        
+        try:
+            days = int(request.GET.get('days', 1))
+            count = int(request.GET.get('count', 3))
+        except ValueError:
+            return JsonResponse({
+                'error': 'days and count must be integers'
+            }, status=400)
+        
+        if days < 1 or not 1 <= count <= 20:
+            return JsonResponse({
+                'error': 'days must be at least 1 and count between 1 and 20'
+            }, status=400)
+        
+        gaps = get_occupancy_index(boat.id).free_windows(start_date, days, count)
+        
+        windows = []
+        for window_start, gap_end in gaps:
+            windows.append({
+                'start_date': window_start.isoformat(),
+                'end_date': (window_start + timedelta(days=days - 1)).isoformat(),
+                'free_until': gap_end.isoformat() if gap_end else None,
+            })
+        
+        return JsonResponse({
+            'boat_id': boat.id,
+            'boat_name': boat.name,
+            'search_from': start_date.isoformat(),
+            'duration_days': days,
+            'windows': windows,
+            'count': len(windows),
+        })
+        
+    except Boat.DoesNotExist:
+        return JsonResponse({
+            'error': 'Boat not found'
+        }, status=404)
+    except Exception as e:
+        logger.error(f"Error finding next available windows for boat {boat_id}: {e}")
+        return JsonResponse({
+            'error': 'Failed to find available windows'
+        }, status=500)
+
+PRICE_CALENDAR_DAYS = 365
+MAX_PRICE_CALENDAR_DAYS = 731
+
+@require_http_methods(["GET"])
+@conditional_on(_price_calendar_scope)
+@cached(PRICE_CALENDAR_CACHE)
+def boat_price_calendar(request, boat_id):
+    """
+    Daily prices and availability for a heatmap
+    GET /boats/{id}/price-calendar/?from=YYYY-MM-DD&to=YYYY-MM-DD
+    Returns: run-length encoded prices [[day_offset, days, price], ...] and
+    unavailable days [[day_offset, days], ...]; defaults to a year from today
+    """
+    try:
+        from .price_calendar import build_price_calendar
+
+        boat = Boat.objects.get(id=boat_id, is_active=True)
+
+        try:
+            from_str = request.GET.get('from')
+            to_str = request.GET.get('to')
+            start_date = datetime.strptime(from_str, '%Y-%m-%d').date() if from_str else date.today()
+            end_date = (
+                datetime.strptime(to_str, '%Y-%m-%d').date() if to_str
+                else start_date + timedelta(days=PRICE_CALENDAR_DAYS - 1)
+            )
+        except ValueError:
+            return JsonResponse({
+                'error': 'Invalid date format. Use YYYY-MM-DD'
+            }, status=400)
+
+        if start_date > end_date:
+            return JsonResponse({
+                'error': 'from must be before or equal to to'
+            }, status=400)
+
+        if (end_date - start_date).days + 1 > MAX_PRICE_CALENDAR_DAYS:
+            return JsonResponse({
+                'error': f'Price calendar cannot exceed {MAX_PRICE_CALENDAR_DAYS} days'
+            }, status=400)
+
+        return JsonResponse(build_price_calendar(boat, start_date, end_date))
+
+    except Boat.DoesNotExist:
+        return JsonResponse({
+            'error': 'Boat not found'
+        }, status=404)
+    except Exception as e:
+        logger.error(f"Error building price calendar for boat {boat_id}: {e}")
+        return JsonResponse({
+            'error': 'Failed to build price calendar'
+        }, status=500)
+
+@require_http_methods(["GET"])
+def search_boats(request):
     """
-    Get availability for all boats
-    GET /boats/availability/
+    Search bookable boats for a date range
+    GET /boats/search/?start_date=YYYY-MM-DD&end_date=YYYY-MM-DD&guest_count=8&location=Gouna&max_price=5000&limit=20
+    Returns: boats free for the whole range with their quoted price, cheapest first
     """
     try:
-        boats = Boat.objects.all()
-        boats_availability = []
-        
-        for boat in boats:
-            # Get existing bookings for the boat
-            bookings = Booking.objects.filter(
-                boat=boat,
-                status__in=['confirmed', 'pending']
-            ).order_by('start_date')
-            
-            # Create availability data
-            boat_data = {
-                'boat_id': boat.id,
+        from .search import search_fleet
+        
+        start_date_str = request.GET.get('start_date')
+        end_date_str = request.GET.get('end_date')
+        location = request.GET.get('location', '').strip() or None
+        
+        if not start_date_str or not end_date_str:
+            return JsonResponse({
+                'error': 'start_date and end_date parameters are required'
+            }, status=400)
+        
+        try:
+            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+        except ValueError:
+            return JsonResponse({
+                'error': 'Invalid date format. Use YYYY-MM-DD'
+            }, status=400)
+        
+        if start_date > end_date:
+            return JsonResponse({
+                'error': 'start_date must be before or equal to end_date'
+            }, status=400)
+        
+        try:
+            guest_count = int(request.GET.get('guest_count', 1))
+            limit = max(1, min(int(request.GET.get('limit', 50)), 200))
+            max_price = request.GET.get('max_price')
+            max_price = Decimal(max_price) if max_price else None
+        except (ValueError, InvalidOperation):
+            return JsonResponse({
+                'error': 'guest_count, limit and max_price must be numeric'
+            }, status=400)
+        
+        results = search_fleet(
+            start_date, end_date,
+            guest_count=guest_count,
+            location=location,
+            max_price=max_price,
+            limit=limit,
+        )
+        
+        boats_data = []
+        for boat, quote in results:
+            boats_data.append({
+                'id': boat.id,
                 'name': boat.name,
                 'model': boat.model,
+                'capacity': boat.capacity,
                 'location': boat.location,
-                'daily_rate': str(boat.daily_rate) if boat.daily_rate else None,
-                'availability_status': 'available' if boat.is_active else 'maintenance',
-                'upcoming_bookings': []
-            }
-            
-            # Add upcoming bookings
-            for booking in bookings:
-                boat_data['upcoming_bookings'].append({
-                    'booking_id': booking.id,
-                    'start_date': booking.start_date.isoformat(),
-                    'end_date': booking.end_date.isoformat(),
-                    'status': booking.status,
-                    'booking_type': booking.booking_type,
-                })
-            
-            boats_availability.append(boat_data)
+                'image_url': boat.image_url,
+                'quote': quote,
+            })
         
         return JsonResponse({
-            'boats_availability': boats_availability,
-            'total_boats': len(boats_availability),
-            'available_boats': len([b for b in boats_availability if b['availability_status'] == 'available']),
+            'search': {
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat(),
+                'guest_count': guest_count,
+                'location': location,
+                'max_price': str(max_price) if max_price is not None else None,
+            },
+            'boats': boats_data,
+            'count': len(boats_data),
+        })
+        
+    except Exception as e:
+        logger.error(f"Error searching boats: {e}")
+        return JsonResponse({
+            'error': 'Failed to search boats'
+        }, status=500)
+
+# Default and maximum number of autocomplete suggestions
+AUTOCOMPLETE_LIMIT = 10
+MAX_AUTOCOMPLETE_LIMIT = 25
+
+@require_http_methods(["GET"])
+def autocomplete_boats(request):
+    """
+    Per-keystroke suggestions for the search box
+    GET /boats/autocomplete/?q=hur&limit=10
+    Returns: boat names, models and marinas starting with q, or with a word starting with q
+    """
+    try:
+        from .autocomplete import get_autocomplete_index
+        
+        query = request.GET.get('q', '')
+        if not query.strip():
+            return JsonResponse({
+                'error': 'q parameter is required'
+            }, status=400)
+        
+        try:
+            limit = min(int(request.GET.get('limit', AUTOCOMPLETE_LIMIT)), MAX_AUTOCOMPLETE_LIMIT)
+        except ValueError:
+            return JsonResponse({
+                'error': 'limit must be numeric'
+            }, status=400)
+        
+        suggestions = get_autocomplete_index().lookup(query, limit=limit)
+        return json_response({
+            'q': query,
+            'suggestions': [
+                {
+                    'text': suggestion.text,
+                    'type': suggestion.kind,
+                    'boat_id': suggestion.boat_id,
+                    'count': suggestion.count,
+                } for suggestion in suggestions
+            ],
         })
         
+    except Exception as e:
+        logger.error(f"Error in boat autocomplete: {e}")
+        return JsonResponse({
+            'error': 'Failed to fetch suggestions'
+        }, status=500)
+
+# Default and maximum number of full-text search results
+TEXT_SEARCH_LIMIT = 20
+MAX_TEXT_SEARCH_LIMIT = 100
+
+@require_http_methods(["GET"])
+def text_search_boats(request):
+    """
+    Ranked full-text search over the public catalog
+    GET /boats/text-search/?q=flybridge hurghada 12 guests&limit=20&fields=id,name
+    Matches boat name, model, location, description and features; "N guests"
+    filters on capacity. Returns: boats best match first, each with its score
+    """
+    try:
+        from .fulltext import parse_query, search_boat_ids
+        
+        query = request.GET.get('q', '').strip()
+        if not query:
+            return JsonResponse({
+                'error': 'q parameter is required'
+            }, status=400)
+        
+        try:
+            limit = max(1, min(int(request.GET.get('limit', TEXT_SEARCH_LIMIT)), MAX_TEXT_SEARCH_LIMIT))
+        except ValueError:
+            return JsonResponse({
+                'error': 'limit must be numeric'
+            }, status=400)
+        
+        plan, extras = sparse(BOAT, request, extra=('score',))
+        ranked = search_boat_ids(query, limit=limit)
+        rows = plan.values(Boat.objects.filter(id__in=[boat_id for boat_id, _ in ranked]), 'id')
+        boats = {row['id']: plan.from_values(row) for row in rows}
+        
+        results = []
+        for boat_id, score in ranked:
+            # Deleted or unpublished since the index was searched
+            if boat_id not in boats:
+                continue
+            boat_data = boats[boat_id]
+            if 'score' in extras:
+                boat_data['score'] = score
+            results.append(boat_data)
+        
+        terms, min_capacity = parse_query(query)
+        return json_response({
+            'search': {
+                'q': query,
+                'terms': terms,
+                'min_capacity': min_capacity,
+            },
+            'boats': results,
+            'count': len(results),
+        })
+        
+    except InvalidFields as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
+    except Exception as e:
+        logger.error(f"Error in full-text boat search: {e}")
+        return JsonResponse({
+            'error': 'Failed to search boats'
+        }, status=500)
+
+# Default and maximum look-ahead for fleet availability
+AVAILABILITY_WINDOW_DAYS = 90
+MAX_AVAILABILITY_WINDOW_DAYS = 366
+
+# Concurrent requests for the same window share one occupancy fetch; each
+# still streams its own response
+AVAILABILITY_FLIGHT = SingleFlight('boats.availability', across_workers=False)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def all_boats_availability(request):
+    """
+    Get availability for all boats within a date window
+    GET /boats/availability/?start_date=YYYY-MM-DD&end_date=YYYY-MM-DD
+    Window defaults to the next 90 days; the response is streamed per boat
+    """
+    try:
+        from bookings.occupancy import load_occupancies
+        
+        start_date_str = request.GET.get('start_date')
+        end_date_str = request.GET.get('end_date')
+        
+        try:
+            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date() if start_date_str else date.today()
+            end_date = (
+                datetime.strptime(end_date_str, '%Y-%m-%d').date() if end_date_str
+                else start_date + timedelta(days=AVAILABILITY_WINDOW_DAYS)
+            )
+        except ValueError:
+            return JsonResponse({
+                'error': 'Invalid date format. Use YYYY-MM-DD'
+            }, status=400)
+        
+        if start_date > end_date:
+            return JsonResponse({
+                'error': 'start_date must be before or equal to end_date'
+            }, status=400)
+        
+        if (end_date - start_date).days > MAX_AVAILABILITY_WINDOW_DAYS:
+            return JsonResponse({
+                'error': f'Date window cannot exceed {MAX_AVAILABILITY_WINDOW_DAYS} days'
+            }, status=400)
+        
+        # One grouped fetch for every boat's bookings and blocked periods in the window
+        occupancies = AVAILABILITY_FLIGHT.do(
+            (start_date, end_date), lambda: load_occupancies(start_date=start_date, end_date=end_date)
+        )
+        boats = Boat.objects.only(
+            'id', 'name', 'model', 'location', 'daily_rate', 'is_active'
+        ).iterator(chunk_size=500)
+        
+        return StreamingHttpResponse(
+            _stream_boats_availability(boats, occupancies, start_date, end_date),
+            content_type='application/json',
+        )
+        
     except Exception as e:
         logger.error(f"Error fetching all boats availability: {e}")
         return JsonResponse({
             'error': 'Failed to fetch boats availability'
-        }, status=500)
\ No newline at end of file
+        }, status=500)
+
+def _stream_boats_availability(boats, occupancies, start_date, end_date):
+    """Yield the fleet availability JSON document one boat at a time"""
+    window = json.dumps({'start_date': start_date.isoformat(), 'end_date': end_date.isoformat()})
+    yield f'{{"window": {window}, "boats_availability": ['
+    
+    total_boats = 0
+    available_boats = 0
+    for boat in boats:
+        boat_occupancies = occupancies.get(boat.id, [])
+        boat_data = {
+            'boat_id': boat.id,
+            'name': boat.name,
+            'model': boat.model,
+            'location': boat.location,
+            'daily_rate': str(boat.daily_rate) if boat.daily_rate else None,
+            'availability_status': 'available' if boat.is_active else 'maintenance',
+            'upcoming_bookings': [
+                {
+                    'booking_id': o.id,
+                    'start_date': o.start_date.isoformat(),
+                    'end_date': o.end_date.isoformat(),
+                    'status': o.status,
+                    'booking_type': o.booking_type,
+                } for o in boat_occupancies if o.source == 'booking'
+            ],
+            'blocked_periods': [
+                {
+                    'event_id': o.id,
+                    'start_date': o.start_date.isoformat(),
+                    'end_date': o.end_date.isoformat(),
+                    'event_type': o.status,
+                    'title': o.title,
+                } for o in boat_occupancies if o.source == 'event'
+            ],
+        }
+        if boat_data['availability_status'] == 'available':
+            available_boats += 1
+        
+        yield (',' if total_boats else '') + json.dumps(boat_data)
+        total_boats += 1
+    
+    yield f'], "total_boats": {total_boats}, "available_boats": {available_boats}}}'
@@ -0,0 +1,59 @@
+"""
+Rental Holds
+Pending rentals block their dates only until the hold expires
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from yachtak_api.caching import invalidate_tags
+from .models import Booking
+from .occupancy import invalidate_occupancy
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def hold_expiry(now=None):
+    """Expiry timestamp for a hold placed now"""
+    return (now or timezone.now()) + timedelta(minutes=settings.RENTAL_HOLD_MINUTES)
+
+
+def expired_holds(now=None):
+    """
+    Pending bookings whose hold has lapsed
+    The filter matches the partial booking_pending_hold_idx index exactly,
+    so the lookup only touches live holds.
+    """
+    return Booking.objects.filter(
+        status='pending',
+        hold_expires_at__isnull=False,
+        hold_expires_at__lte=now or timezone.now(),
+    )
+
+
+def release_expired_holds(now=None):
+    """
+    Cancel every expired hold with a single UPDATE
+    A queryset update sends no post_save, so the swept boats' occupancy
+    indexes and boat:{id} cache tags are invalidated here, again once the
+    transaction commits. ETags move with the bumped updated_at.
+    Returns: number of bookings released
+    """
+    now = now or timezone.now()
+    holds = expired_holds(now)
+    boat_ids = set(holds.order_by().values_list('boat_id', flat=True).distinct())
+    if not boat_ids:
+        return 0
+    released = holds.update(status='cancelled', updated_at=now)
+    if released:
+        _invalidate_boats(boat_ids)
+        transaction.on_commit(lambda: _invalidate_boats(boat_ids))
+        logger.info(f"Released {released} expired rental hold(s) on {len(boat_ids)} boat(s)")
+    return released
+
+
+def _invalidate_boats(boat_ids):
+    for boat_id in boat_ids:
+        invalidate_occupancy(boat_id)
+    invalidate_tags(*(f'boat:{boat_id}' for boat_id in boat_ids))
@@ -0,0 +1,14 @@
+"""
+Release expired rental holds
+Run from cron or a scheduler every few minutes
+"""
+from django.core.management.base import BaseCommand
+from bookings.holds import release_expired_holds
+
+
+class Command(BaseCommand):
+    help = 'Cancel pending rental bookings whose payment hold has expired'
+
+    def handle(self, *args, **options):
+        released = release_expired_holds()
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired hold(s)'))
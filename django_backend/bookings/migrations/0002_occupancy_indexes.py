@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['boat', 'start_date'], name='bookings_bo_boat_id_65b791_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['boat', 'updated_at'], name='bookings_bo_boat_id_2afdb3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='calendarevent',
+            index=models.Index(fields=['boat', 'start_date'], name='bookings_ca_boat_id_1ecb54_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='calendarevent',
+            index=models.Index(fields=['boat', 'updated_at'], name='bookings_ca_boat_id_8736f5_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_occupancy_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['boat', 'end_date'], name='bookings_bo_boat_id_a82bd3_idx'),
+        ),
+    ]
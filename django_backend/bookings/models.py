@@ -44,6 +44,9 @@ class Booking(models.Model):
     guest_count = models.PositiveIntegerField(default=1, help_text="Number of guests")
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     
+    # Pending rentals hold the dates only until payment is due
+    hold_expires_at = models.DateTimeField(null=True, blank=True, help_text="Pending hold is released after this time")
+    
     # Additional information
     notes = models.TextField(blank=True, help_text="Booking notes or special requests")
     
@@ -56,6 +59,21 @@ class Booking(models.Model):
         ordering = ['-start_date', '-start_time']
         verbose_name = 'Booking'
         verbose_name_plural = 'Bookings'
+        indexes = [
+            models.Index(fields=['boat', 'start_date']),
+            models.Index(fields=['boat', 'end_date']),
+            models.Index(fields=['boat', 'updated_at']),
+            # Keyset pagination orders
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['user', 'start_date', 'id']),
+            # Partial index: only live pending holds, so the expiry sweep stays
+            # small however many bookings accumulate
+            models.Index(
+                fields=['hold_expires_at'],
+                name='booking_pending_hold_idx',
+                condition=models.Q(status='pending', hold_expires_at__isnull=False),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.boat.model} - {self.user.phone} ({self.start_date})"
@@ -101,6 +119,10 @@ class CalendarEvent(models.Model):
         ordering = ['start_date', 'start_time']
         verbose_name = 'Calendar Event'
         verbose_name_plural = 'Calendar Events'
+        indexes = [
+            models.Index(fields=['boat', 'start_date']),
+            models.Index(fields=['boat', 'updated_at']),
+        ]
     
     def __str__(self):
         return f"{self.boat.model} - {self.title} ({self.start_date})"
\ No newline at end of file
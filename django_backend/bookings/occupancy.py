@@ -0,0 +1,324 @@
+"""
+Booking Occupancy Index
+Per-boat interval index shared by every booking conflict check
+"""
+import time
+from datetime import date
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, namedtuple
+from heapq import merge
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Booking, CalendarEvent
+from .slots import FULL_DAY_MASK, mask_for_times
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Booking statuses that hold inventory
+BLOCKING_BOOKING_STATUSES = ('confirmed', 'pending')
+
+# Calendar event types that make a boat unavailable
+BLOCKING_EVENT_TYPES = ('maintenance', 'blocked')
+
+# Seconds a cached index may serve reads before it is rebuilt. Signals keep
+# the index exact within a process; the TTL bounds staleness across workers.
+INDEX_TTL_SECONDS = 30
+
+Occupancy = namedtuple('Occupancy', [
+    'start_date', 'end_date', 'source', 'id', 'status',
+    'booking_type', 'user_id', 'guest_count', 'title', 'hold_expires_at', 'hours',
+])
+
+
+def _sort_key(occupancy):
+    return (occupancy.start_date, occupancy.end_date)
+
+
+class OccupancyIndex:
+    """
+    Sorted interval index for a single boat
+    Intervals are closed: [start_date, end_date] with both days occupied.
+    Rental holds that expire are kept in a short side list and checked
+    against the clock on every lookup, so a hold stops blocking the moment
+    it lapses without waiting for a rebuild.
+    """
+
+    def __init__(self, boat_id, occupancies, token=None):
+        self.boat_id = boat_id
+        self.token = token
+        self.built_at = time.monotonic()
+
+        self._holds = sorted((o for o in occupancies if o.hold_expires_at is not None), key=_sort_key)
+        self._items = sorted((o for o in occupancies if o.hold_expires_at is None), key=_sort_key)
+        self._starts = [o.start_date.toordinal() for o in self._items]
+
+        # Prefix maximum of end dates answers "any overlap?" with one bisect
+        self._max_end = []
+        running = None
+        max_length = 0
+        for item in self._items:
+            end = item.end_date.toordinal()
+            running = end if running is None else max(running, end)
+            self._max_end.append(running)
+            max_length = max(max_length, end - item.start_date.toordinal())
+        self._max_length = max_length
+
+    def __len__(self):
+        return len(self._items) + len(self._holds)
+
+    def _live_holds(self, start_date=None, end_date=None, exclude_user_id=None):
+        """Unexpired holds, optionally only those overlapping [start_date, end_date]"""
+        if not self._holds:
+            return []
+        now = timezone.now()
+        return [
+            hold for hold in self._holds
+            if hold.hold_expires_at > now
+            and (start_date is None or (hold.start_date <= end_date and hold.end_date >= start_date))
+            and (exclude_user_id is None or hold.user_id != exclude_user_id)
+        ]
+
+    def is_free(self, start_date, end_date, exclude_user_id=None):
+        """Check whether [start_date, end_date] is free in O(log n)"""
+        if self._live_holds(start_date, end_date, exclude_user_id):
+            return False
+        upper = bisect_right(self._starts, end_date.toordinal())
+        if upper == 0 or self._max_end[upper - 1] < start_date.toordinal():
+            return True
+        if exclude_user_id is None:
+            return False
+        return not self.conflicts(start_date, end_date, exclude_user_id=exclude_user_id)
+
+    def conflicts(self, start_date, end_date, exclude_user_id=None):
+        """
+        Return occupancies overlapping [start_date, end_date]
+        Only intervals starting within the longest stored interval of the
+        requested start can overlap, so the scan is bounded by bisect.
+        """
+        holds = self._live_holds(start_date, end_date, exclude_user_id)
+        start = start_date.toordinal()
+        upper = bisect_right(self._starts, end_date.toordinal())
+        if upper == 0 or self._max_end[upper - 1] < start:
+            return holds
+
+        lower = bisect_left(self._starts, start - self._max_length)
+        found = [
+            item for item in self._items[lower:upper]
+            if item.end_date.toordinal() >= start
+            and (exclude_user_id is None or item.user_id != exclude_user_id)
+        ]
+        return list(merge(found, holds, key=_sort_key)) if holds else found
+
+    def day_mask(self, day, exclude_user_id=None):
+        """
+        Hour slots taken on one day as a bitmask
+        Same-day bookings with times set only their hours; anything else
+        covering the day takes all of them.
+        """
+        mask = 0
+        for item in self.conflicts(day, day, exclude_user_id=exclude_user_id):
+            if item.hours is None:
+                return FULL_DAY_MASK
+            mask |= item.hours
+        return mask
+
+    def slots_free(self, day, mask, exclude_user_id=None):
+        """Check whether every hour in mask is free on day"""
+        return not self.day_mask(day, exclude_user_id=exclude_user_id) & mask
+
+    def free_windows(self, after, length_days, count):
+        """
+        Earliest free windows of length_days starting on or after `after`
+        Walks the sorted intervals once, carrying the end of the merged
+        occupied run as a cursor; each gap, and the open-ended tail, is cut
+        into back-to-back windows until count are found.
+        Returns: up to count (window_start, gap_end) pairs; gap_end is the
+        last free day of the window's gap, None after the last occupancy
+        """
+        cursor = after.toordinal()
+        windows = []
+        lower = bisect_left(self._starts, cursor - self._max_length)
+        for item in merge(self._items[lower:], self._live_holds(), key=_sort_key):
+            start = item.start_date.toordinal()
+            end = item.end_date.toordinal()
+            if end < cursor:
+                continue
+            gap_end = date.fromordinal(start - 1)
+            for window_start in range(cursor, start - length_days + 1, length_days):
+                windows.append((date.fromordinal(window_start), gap_end))
+                if len(windows) == count:
+                    return windows
+            cursor = max(cursor, end + 1)
+
+        while len(windows) < count:
+            windows.append((date.fromordinal(cursor), None))
+            cursor += length_days
+        return windows
+
+    def occupancies(self):
+        """All blocking occupancies sorted by start date"""
+        return list(merge(self._items, self._live_holds(), key=_sort_key))
+
+
+def _occupancy_token(boat_id):
+    """
+    Cheap fingerprint of a boat's bookings and calendar events
+    auto_now stamps every insert and update (bulk_create included), and the
+    (boat, updated_at) indexes keep each latest-row lookup to one index seek. Deletes
+    only make a stale index more conservative and are bounded by the TTL.
+    """
+    return tuple(
+        model.objects.filter(boat_id=boat_id)
+        .order_by('-updated_at')
+        .values_list('updated_at', flat=True)
+        .first()
+        for model in (Booking, CalendarEvent)
+    )
+
+
+def load_occupancies(boat_ids=None, start_date=None, end_date=None):
+    """
+    Load blocking bookings and calendar events grouped by boat
+    boat_ids=None loads the whole fleet without an IN list; holds that have
+    already expired are left out
+    Returns: {boat_id: [Occupancy, ...]} built from two queries
+    """
+    bookings = Booking.objects.filter(status__in=BLOCKING_BOOKING_STATUSES).exclude(
+        hold_expires_at__lte=timezone.now()
+    )
+    events = CalendarEvent.objects.filter(event_type__in=BLOCKING_EVENT_TYPES)
+    if boat_ids is None:
+        grouped = defaultdict(list)
+    else:
+        boat_ids = list(boat_ids)
+        bookings = bookings.filter(boat_id__in=boat_ids)
+        events = events.filter(boat_id__in=boat_ids)
+        grouped = {boat_id: [] for boat_id in boat_ids}
+    if start_date is not None:
+        bookings = bookings.filter(end_date__gte=start_date)
+        events = events.filter(end_date__gte=start_date)
+    if end_date is not None:
+        bookings = bookings.filter(start_date__lte=end_date)
+        events = events.filter(start_date__lte=end_date)
+
+    for row in bookings.order_by('start_date').values_list(
+        'boat_id', 'id', 'start_date', 'end_date', 'status',
+        'booking_type', 'user_id', 'guest_count', 'hold_expires_at',
+        'start_time', 'end_time',
+    ):
+        (boat_id, booking_id, start, end, status, booking_type,
+         user_id, guests, expires, start_time, end_time) = row
+        grouped[boat_id].append(Occupancy(
+            start, end, 'booking', booking_id, status,
+            booking_type, user_id, guests, '', expires,
+            mask_for_times(start, end, start_time, end_time),
+        ))
+    for row in events.order_by('start_date').values_list(
+        'boat_id', 'id', 'start_date', 'end_date', 'event_type', 'title',
+    ):
+        boat_id, event_id, start, end, event_type, title = row
+        grouped[boat_id].append(Occupancy(
+            start, end, 'event', event_id, event_type,
+            None, None, None, title, None, None,
+        ))
+    return grouped
+
+
+def build_index(boat_id):
+    """Build a fresh occupancy index for one boat"""
+    token = _occupancy_token(boat_id)
+    occupancies = load_occupancies([boat_id])[boat_id]
+    return OccupancyIndex(boat_id, occupancies, token=token)
+
+
+_index_cache = {}
+
+
+def get_occupancy_index(boat_id, verify=False):
+    """
+    Get the cached occupancy index for a boat
+    verify=True compares a DB fingerprint first; write paths use it so a
+    booking made by another worker is never missed.
+    """
+    index = _index_cache.get(boat_id)
+    if index is not None and time.monotonic() - index.built_at < INDEX_TTL_SECONDS:
+        if not verify or index.token == _occupancy_token(boat_id):
+            return index
+
+    index = build_index(boat_id)
+    _index_cache[boat_id] = index
+    logger.debug(f"Occupancy index built for boat {boat_id}: {len(index)} intervals")
+    return index
+
+
+def get_occupancy_indexes(boat_ids):
+    """
+    Get cached occupancy indexes for several boats
+    Missing or expired indexes are built together from one bulk load.
+    They carry no token, so a later verify=True lookup rebuilds them.
+    Returns: {boat_id: OccupancyIndex}
+    """
+    result = {}
+    missing = []
+    now = time.monotonic()
+    for boat_id in set(boat_ids):
+        index = _index_cache.get(boat_id)
+        if index is not None and now - index.built_at < INDEX_TTL_SECONDS:
+            result[boat_id] = index
+        else:
+            missing.append(boat_id)
+
+    if missing:
+        grouped = load_occupancies(missing)
+        for boat_id in missing:
+            index = OccupancyIndex(boat_id, grouped[boat_id])
+            _index_cache[boat_id] = index
+            result[boat_id] = index
+        logger.debug(f"Occupancy indexes built for {len(missing)} boat(s)")
+    return result
+
+
+def invalidate_occupancy(boat_id=None):
+    """Drop the cached index for a boat, or for all boats"""
+    if boat_id is None:
+        _index_cache.clear()
+    else:
+        _index_cache.pop(boat_id, None)
+
+
+def conflict_summary(occupancy):
+    """Serialize an occupancy for conflict responses"""
+    if occupancy.source == 'booking':
+        return {
+            'id': occupancy.id,
+            'type': 'booking',
+            'start_date': occupancy.start_date.isoformat(),
+            'end_date': occupancy.end_date.isoformat(),
+            'status': occupancy.status,
+            'booking_type': occupancy.booking_type,
+            'guest_count': occupancy.guest_count,
+        }
+    return {
+        'id': occupancy.id,
+        'type': 'event',
+        'start_date': occupancy.start_date.isoformat(),
+        'end_date': occupancy.end_date.isoformat(),
+        'event_type': occupancy.status,
+        'title': occupancy.title,
+    }
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+@receiver(post_save, sender=CalendarEvent)
+@receiver(post_delete, sender=CalendarEvent)
+def _invalidate_on_change(sender, instance, **kwargs):
+    """Keep the index in step with booking and calendar writes"""
+    boat_id = instance.boat_id
+    invalidate_occupancy(boat_id)
+    # Invalidate again after commit so a rebuild racing the open
+    # transaction cannot cache a snapshot without this row
+    transaction.on_commit(lambda: invalidate_occupancy(boat_id))
@@ -0,0 +1,56 @@
+"""
+Hourly Slots
+Bitmask helpers for packing short charters onto one boat-day
+"""
+from datetime import time
+
+HOURS_PER_DAY = 24
+
+# Bit h set means the hour h:00-(h+1):00 is taken
+FULL_DAY_MASK = (1 << HOURS_PER_DAY) - 1
+
+# A charter of this many hours costs the same as a full day
+CHARTER_DAY_HOURS = 8
+
+
+def hour_mask(start_hour, end_hour):
+    """Mask with the hours [start_hour, end_hour) set"""
+    return ((1 << end_hour) - 1) ^ ((1 << start_hour) - 1)
+
+
+def mask_for_times(start_date, end_date, start_time, end_time):
+    """
+    Slot mask for a same-day booking with departure and return times
+    Partial hours round outwards. Returns None for anything that is not a
+    same-day booking, which occupies the whole day.
+    """
+    if start_date != end_date or start_time is None or end_time is None:
+        return None
+    end_hour = end_time.hour + (1 if end_time.minute or end_time.second else 0)
+    if end_hour <= start_time.hour:
+        return None
+    return hour_mask(start_time.hour, end_hour)
+
+
+def hour_time(hour):
+    """Time value stored for a slot boundary; hour 24 is end of day"""
+    return time(hour) if hour < HOURS_PER_DAY else time(23, 59)
+
+
+def free_ranges(mask):
+    """
+    Free hour ranges in a day mask
+    Returns: list of [start_hour, end_hour] pairs, end exclusive
+    """
+    ranges = []
+    start = None
+    for hour in range(HOURS_PER_DAY):
+        if mask >> hour & 1:
+            if start is not None:
+                ranges.append([start, hour])
+                start = None
+        elif start is None:
+            start = hour
+    if start is not None:
+        ranges.append([start, HOURS_PER_DAY])
+    return ranges
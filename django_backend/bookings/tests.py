@@ -1,3 +1,551 @@
-from django.test import TestCase
+import json
+import threading
+import tracemalloc
+from datetime import date, time, timedelta
+from unittest import mock
+from decimal import Decimal
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from boats.models import Boat
+from .models import Booking, CalendarEvent
+from .holds import expired_holds, release_expired_holds
+from .occupancy import get_occupancy_index, invalidate_occupancy
+from .slots import FULL_DAY_MASK, free_ranges, hour_mask, mask_for_times
+from yachtak_api.pagination import MAX_PAGE_SIZE
 
-# Create your tests here.
+User = get_user_model()
+
+
+class OccupancyIndexTests(TestCase):
+    """Occupancy index shared by every booking conflict check"""
+
+    def setUp(self):
+        invalidate_occupancy()
+        self.boat = Boat.objects.create(
+            name='Test Yacht', model='D42', capacity=10,
+            length=Decimal('12.80'), location='Hurghada', daily_rate=Decimal('1000.00'),
+        )
+        self.user = User.objects.create(phone='+201000000001')
+        self.other = User.objects.create(phone='+201000000002')
+        self.day = date.today() + timedelta(days=30)
+
+    def book(self, start_offset, end_offset, user=None, status='confirmed'):
+        return Booking.objects.create(
+            boat=self.boat, user=user or self.user, status=status,
+            start_date=self.day + timedelta(days=start_offset),
+            end_date=self.day + timedelta(days=end_offset),
+        )
+
+    def test_closed_interval_bounds(self):
+        self.book(0, 2)
+        index = get_occupancy_index(self.boat.id)
+        self.assertFalse(index.is_free(self.day + timedelta(days=2), self.day + timedelta(days=4)))
+        self.assertFalse(index.is_free(self.day - timedelta(days=3), self.day))
+        self.assertTrue(index.is_free(self.day + timedelta(days=3), self.day + timedelta(days=5)))
+        self.assertTrue(index.is_free(self.day - timedelta(days=3), self.day - timedelta(days=1)))
+
+    def test_blocking_calendar_events(self):
+        CalendarEvent.objects.create(
+            boat=self.boat, event_type='maintenance', title='Engine service',
+            start_date=self.day, end_date=self.day + timedelta(days=1),
+        )
+        CalendarEvent.objects.create(
+            boat=self.boat, event_type='available', title='Open',
+            start_date=self.day + timedelta(days=5), end_date=self.day + timedelta(days=6),
+        )
+        index = get_occupancy_index(self.boat.id)
+        conflicts = index.conflicts(self.day, self.day + timedelta(days=10))
+        self.assertEqual([c.status for c in conflicts], ['maintenance'])
+
+    def test_cancelled_bookings_release_dates(self):
+        booking = self.book(0, 2)
+        self.assertFalse(get_occupancy_index(self.boat.id).is_free(self.day, self.day))
+        booking.status = 'cancelled'
+        booking.save()
+        self.assertTrue(get_occupancy_index(self.boat.id).is_free(self.day, self.day))
+
+    def test_delete_invalidates_index(self):
+        booking = self.book(0, 0)
+        self.assertFalse(get_occupancy_index(self.boat.id).is_free(self.day, self.day))
+        booking.delete()
+        self.assertTrue(get_occupancy_index(self.boat.id).is_free(self.day, self.day))
+
+    def test_exclude_user(self):
+        self.book(0, 2, user=self.user)
+        index = get_occupancy_index(self.boat.id)
+        self.assertTrue(index.is_free(self.day, self.day, exclude_user_id=self.user.id))
+        self.assertFalse(index.is_free(self.day, self.day, exclude_user_id=self.other.id))
+
+    def test_long_interval_found_behind_short_ones(self):
+        CalendarEvent.objects.create(
+            boat=self.boat, event_type='blocked', title='Winter storage',
+            start_date=self.day, end_date=self.day + timedelta(days=90),
+        )
+        for offset in range(0, 60, 3):
+            self.book(offset, offset + 1)
+        index = get_occupancy_index(self.boat.id)
+        probe = self.day + timedelta(days=80)
+        self.assertEqual(len(index.conflicts(probe, probe)), 1)
+
+    def test_verify_detects_writes_without_signals(self):
+        index = get_occupancy_index(self.boat.id)
+        Booking.objects.bulk_create([Booking(
+            boat=self.boat, user=self.user, status='pending',
+            start_date=self.day, end_date=self.day,
+        )])
+        self.assertIs(get_occupancy_index(self.boat.id), index)
+        self.assertFalse(get_occupancy_index(self.boat.id, verify=True).is_free(self.day, self.day))
+
+    def test_boat_availability_reports_blocked_periods(self):
+        CalendarEvent.objects.create(
+            boat=self.boat, event_type='maintenance', title='Hull cleaning',
+            start_date=self.day, end_date=self.day,
+        )
+        response = self.client.get(f'/boats/{self.boat.id}/availability/', {
+            'start_date': self.day.isoformat(),
+            'end_date': (self.day + timedelta(days=1)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertFalse(data['available'])
+        self.assertEqual(data['conflicting_bookings'], [])
+        self.assertEqual(len(data['blocked_periods']), 1)
+        self.assertEqual(data['alternatives'][0]['start_date'], (self.day + timedelta(days=1)).isoformat())
+
+    def test_free_windows_walk_gaps_in_order(self):
+        self.book(0, 2)
+        self.book(4, 4)
+        CalendarEvent.objects.create(
+            boat=self.boat, event_type='blocked', title='Regatta',
+            start_date=self.day + timedelta(days=3), end_date=self.day + timedelta(days=10),
+        )
+        self.book(13, 14)
+        index = get_occupancy_index(self.boat.id)
+
+        windows = index.free_windows(self.day, 2, 3)
+        self.assertEqual(windows, [
+            (self.day + timedelta(days=11), self.day + timedelta(days=12)),
+            (self.day + timedelta(days=15), None),
+            (self.day + timedelta(days=17), None),
+        ])
+        self.assertEqual(index.free_windows(self.day, 3, 1), [(self.day + timedelta(days=15), None)])
+        # A long gap holds several back-to-back windows
+        gap_end = self.day - timedelta(days=1)
+        self.assertEqual(index.free_windows(self.day - timedelta(days=5), 2, 3), [
+            (self.day - timedelta(days=5), gap_end),
+            (self.day - timedelta(days=3), gap_end),
+            (self.day + timedelta(days=11), self.day + timedelta(days=12)),
+        ])
+
+
+class BatchRentalQuoteTests(TestCase):
+    """Batch rental quotes served from bulk loads"""
+
+    def setUp(self):
+        from ownership.models import BookingRule
+        from ownership.rules import invalidate_rules
+        invalidate_occupancy()
+        invalidate_rules()
+        self.user = User.objects.create(phone='+201000000001')
+        self.day = date.today() + timedelta(days=30)
+        self.boats = [
+            Boat.objects.create(
+                name=f'Yacht {i}', model='D42', capacity=10,
+                length=Decimal('12.80'), location='Hurghada', daily_rate=Decimal('1000.00'),
+            ) for i in range(3)
+        ]
+        Booking.objects.create(
+            boat=self.boats[1], user=self.user, status='confirmed',
+            start_date=self.day, end_date=self.day + timedelta(days=1),
+        )
+        BookingRule.objects.create(
+            boat=self.boats[2], rule_type='seasonal_multiplier', rule_name='Peak',
+            start_date=self.day, end_date=self.day, multiplier_value=Decimal('2.00'),
+        )
+
+    def item(self, boat, start_offset=0, end_offset=1, guest_count=4):
+        return {
+            'boat_id': boat.id,
+            'start_date': (self.day + timedelta(days=start_offset)).isoformat(),
+            'end_date': (self.day + timedelta(days=end_offset)).isoformat(),
+            'guest_count': guest_count,
+        }
+
+    def quote(self, items):
+        response = self.client.post(
+            '/boats/rental-quotes/', json.dumps({'items': items}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_constant_queries_for_many_items(self):
+        items = [self.item(boat, offset, offset + 2) for offset in range(60) for boat in self.boats]
+        with self.assertNumQueries(4):
+            results = self.quote(items)
+        self.assertEqual(len(results), 180)
+
+    def test_results_match_single_quote(self):
+        items = [self.item(boat) for boat in self.boats] + [self.item(self.boats[0], guest_count=20)]
+        results = self.quote(items)
+        for item, result in zip(items[:3], results):
+            single = self.client.get(f"/boats/{item['boat_id']}/rental-quote/", item).json()
+            self.assertEqual({k: v for k, v in result.items() if k != 'request'}, single)
+        self.assertFalse(results[1]['available'])
+        self.assertEqual(results[2]['quote']['total_amount'], '3000.0000')
+        self.assertFalse(results[3]['available'])
+
+    def test_bad_items_do_not_fail_batch(self):
+        results = self.quote([
+            {'boat_id': self.boats[0].id, 'start_date': 'soon'},
+            self.item(self.boats[0], 2, 1),
+            {'boat_id': 999999, 'start_date': '2030-01-01', 'end_date': '2030-01-02'},
+            self.item(self.boats[0]),
+        ])
+        self.assertEqual([('error' in r) for r in results], [True, True, True, False])
+        self.assertTrue(results[3]['available'])
+
+    def test_rejects_oversized_batch(self):
+        response = self.client.post(
+            '/boats/rental-quotes/',
+            json.dumps({'items': [self.item(self.boats[0])] * 501}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """Per-boat locking keeps concurrent booking requests from double-booking"""
+
+    THREADS = 8
+
+    def setUp(self):
+        invalidate_occupancy()
+        self.boats = [
+            Boat.objects.create(
+                name=f'Yacht {i}', model='D42', capacity=10,
+                length=Decimal('12.80'), location='Hurghada', daily_rate=Decimal('1000.00'),
+            ) for i in range(2)
+        ]
+        self.day = date.today() + timedelta(days=30)
+
+    def hammer(self, payloads):
+        """POST every payload from its own thread, all released at once"""
+        barrier = threading.Barrier(len(payloads))
+        statuses = []
+
+        def worker(payload):
+            try:
+                client = Client()
+                barrier.wait()
+                response = client.post('/bookings/rental/', json.dumps(payload), content_type='application/json')
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(p,)) for p in payloads]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return statuses
+
+    def payload(self, boat, offset, phone):
+        return {
+            'boat_id': boat.id, 'contact_phone': phone, 'guest_count': 2,
+            'start_date': (self.day + timedelta(days=offset)).isoformat(),
+            'end_date': (self.day + timedelta(days=offset + 1)).isoformat(),
+        }
+
+    def test_same_dates_booked_once(self):
+        statuses = self.hammer([
+            self.payload(self.boats[0], i % 2, f'+20100000{i:04d}') for i in range(self.THREADS)
+        ])
+        self.assertEqual(statuses.count(201), 1)
+        self.assertEqual(statuses.count(400), self.THREADS - 1)
+        self.assertEqual(Booking.objects.filter(boat=self.boats[0]).count(), 1)
+
+    def test_different_boats_both_booked(self):
+        statuses = self.hammer([
+            self.payload(self.boats[i % 2], 0, f'+20100000{i:04d}') for i in range(self.THREADS)
+        ])
+        self.assertEqual(statuses.count(201), 2)
+        for boat in self.boats:
+            self.assertEqual(Booking.objects.filter(boat=boat).count(), 1)
+
+
+class RentalHoldTests(TestCase):
+    """Pending rental holds expire and are swept in bulk"""
+
+    def setUp(self):
+        invalidate_occupancy()
+        self.boat = Boat.objects.create(
+            name='Test Yacht', model='D42', capacity=10,
+            length=Decimal('12.80'), location='Hurghada', daily_rate=Decimal('1000.00'),
+        )
+        self.user = User.objects.create(phone='+201000000001')
+        self.day = date.today() + timedelta(days=30)
+
+    def hold(self, expires_in_minutes, status='pending'):
+        return Booking.objects.create(
+            boat=self.boat, user=self.user, status=status, start_date=self.day, end_date=self.day,
+            hold_expires_at=timezone.now() + timedelta(minutes=expires_in_minutes),
+        )
+
+    def test_rental_places_hold(self):
+        response = self.client.post('/bookings/rental/', json.dumps({
+            'boat_id': self.boat.id, 'contact_phone': '+201000000002',
+            'start_date': self.day.isoformat(), 'end_date': self.day.isoformat(),
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        booking = Booking.objects.get(id=response.json()['booking']['id'])
+        self.assertGreater(booking.hold_expires_at, timezone.now())
+
+    def test_hold_stops_blocking_when_it_lapses(self):
+        self.hold(10)
+        index = get_occupancy_index(self.boat.id)
+        self.assertFalse(index.is_free(self.day, self.day))
+        later = timezone.now() + timedelta(minutes=11)
+        with mock.patch('bookings.occupancy.timezone.now', return_value=later):
+            self.assertTrue(index.is_free(self.day, self.day))
+            self.assertEqual(index.conflicts(self.day, self.day), [])
+            self.assertEqual(index.free_windows(self.day, 1, 1), [(self.day, None)])
+
+    def test_expired_holds_not_loaded(self):
+        self.hold(-5)
+        self.assertTrue(get_occupancy_index(self.boat.id).is_free(self.day, self.day))
+        response = self.client.get('/boats/search/', {
+            'start_date': self.day.isoformat(), 'end_date': self.day.isoformat(),
+        })
+        self.assertEqual(response.json()['count'], 1)
+
+    def test_sweeper_releases_expired_holds_in_one_update(self):
+        expired = self.hold(-5)
+        live = self.hold(5)
+        paid = self.hold(-5, status='confirmed')
+        # Affected boats, then the update
+        with self.assertNumQueries(2):
+            self.assertEqual(release_expired_holds(), 1)
+        expired.refresh_from_db()
+        live.refresh_from_db()
+        paid.refresh_from_db()
+        self.assertEqual((expired.status, live.status, paid.status), ('cancelled', 'pending', 'confirmed'))
+
+    def test_sweep_invalidates_swept_boats(self):
+        self.hold(-5)
+        index = get_occupancy_index(self.boat.id)
+        with mock.patch('bookings.holds.invalidate_tags') as invalidate:
+            with self.captureOnCommitCallbacks(execute=True):
+                release_expired_holds()
+        invalidate.assert_called_with(f'boat:{self.boat.id}')
+        self.assertEqual(invalidate.call_count, 2)
+        self.assertIsNot(get_occupancy_index(self.boat.id), index)
+
+    def test_sweep_with_nothing_expired_invalidates_nothing(self):
+        self.hold(5)
+        with mock.patch('bookings.holds.invalidate_tags') as invalidate, self.assertNumQueries(1):
+            self.assertEqual(release_expired_holds(), 0)
+        invalidate.assert_not_called()
+
+    def test_sweep_uses_partial_index(self):
+        self.assertIn('booking_pending_hold_idx', expired_holds().explain())
+
+
+class HourlySlotTests(TestCase):
+    """Hourly charters packed onto one boat-day with slot bitmasks"""
+
+    def setUp(self):
+        invalidate_occupancy()
+        self.boat = Boat.objects.create(
+            name='Test Yacht', model='D42', capacity=10,
+            length=Decimal('12.80'), location='Hurghada', daily_rate=Decimal('800.00'),
+        )
+        self.day = date.today() + timedelta(days=30)
+
+    def charter(self, start_hour, end_hour):
+        return self.client.post('/bookings/charter/', json.dumps({
+            'boat_id': self.boat.id, 'contact_phone': '+201000000002', 'date': self.day.isoformat(),
+            'start_hour': start_hour, 'end_hour': end_hour, 'guest_count': 4,
+        }), content_type='application/json')
+
+    def test_mask_helpers(self):
+        self.assertEqual(hour_mask(0, 24), FULL_DAY_MASK)
+        self.assertEqual(mask_for_times(self.day, self.day, time(14, 30), time(17, 30)), hour_mask(14, 18))
+        self.assertIsNone(mask_for_times(self.day, self.day + timedelta(days=1), time(9), time(17)))
+        self.assertIsNone(mask_for_times(self.day, self.day, time(22), time(2)))
+        self.assertEqual(free_ranges(hour_mask(9, 12) | hour_mask(18, 24)), [[0, 9], [12, 18]])
+
+    def test_charters_pack_onto_one_day(self):
+        response = self.charter(9, 12)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['booking']['total_amount'], '300.00')
+        self.assertEqual(self.charter(12, 15).status_code, 201)
+        self.assertEqual(self.charter(21, 24).status_code, 201)
+
+        clash = self.charter(14, 17)
+        self.assertEqual(clash.status_code, 400)
+        self.assertEqual(clash.json()['free_hours'], [[0, 9], [15, 21]])
+
+        slots = self.client.get(f'/boats/{self.boat.id}/slots/', {'date': self.day.isoformat(), 'days': 2}).json()['slots']
+        self.assertEqual(slots[0]['mask'], hour_mask(9, 15) | hour_mask(21, 24))
+        self.assertEqual(slots[1]['free_hours'], [[0, 24]])
+
+    def test_charter_blocks_full_day_booking_and_vice_versa(self):
+        self.assertEqual(self.charter(18, 21).status_code, 201)
+        self.assertFalse(get_occupancy_index(self.boat.id).is_free(self.day, self.day))
+
+        other_day = self.day + timedelta(days=1)
+        Booking.objects.create(
+            boat=self.boat, user=User.objects.create(phone='+201000000001'), status='confirmed',
+            start_date=other_day, end_date=other_day + timedelta(days=2),
+        )
+        self.assertEqual(get_occupancy_index(self.boat.id).day_mask(other_day), FULL_DAY_MASK)
+
+    def test_rejects_bad_hours(self):
+        self.assertEqual(self.charter(12, 12).status_code, 400)
+        self.assertEqual(self.charter(20, 25).status_code, 400)
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor paging over the booking list endpoints"""
+
+    def setUp(self):
+        self.boat = Boat.objects.create(
+            name='Test Yacht', model='D42', capacity=10,
+            length=Decimal('12.80'), location='Hurghada', daily_rate=Decimal('800.00'),
+        )
+        self.user = User.objects.create(phone='+201000000001')
+        start = date.today() + timedelta(days=10)
+        Booking.objects.bulk_create([
+            Booking(
+                boat=self.boat, user=self.user, status='confirmed',
+                start_date=start + timedelta(days=i * 3), end_date=start + timedelta(days=i * 3 + 1),
+            )
+            for i in range(23)
+        ])
+        # Identical sort keys must still page without skipping rows
+        Booking.objects.update(created_at=timezone.now())
+
+    def walk(self, url, params):
+        ids = []
+        cursor = None
+        while True:
+            query = dict(params, **({'cursor': cursor} if cursor else {}))
+            body = self.client.get(url, query).json()
+            ids.extend(booking['id'] for booking in body['bookings'])
+            cursor = body['pagination']['next_cursor']
+            if not cursor:
+                self.assertFalse(body['pagination']['has_more'])
+                return ids
+
+    def test_walk_visits_every_booking_once(self):
+        ids = self.walk('/bookings/list/', {'limit': 5})
+        self.assertEqual(ids, list(Booking.objects.order_by('-id').values_list('id', flat=True)))
+
+    def test_user_bookings_pages_by_start_date(self):
+        ids = self.walk('/bookings/', {'user_phone': self.user.phone, 'limit': 4})
+        self.assertEqual(ids, list(Booking.objects.order_by('-start_date', '-id').values_list('id', flat=True)))
+
+    def test_rejects_bad_cursor_and_caps_limit(self):
+        self.assertEqual(self.client.get('/bookings/list/', {'cursor': 'not-a-cursor'}).status_code, 400)
+        self.assertEqual(self.client.get('/bookings/list/', {'limit': 0}).status_code, 400)
+        response = self.client.get('/bookings/list/', {'limit': 10000})
+        self.assertEqual(response.json()['pagination']['limit'], MAX_PAGE_SIZE)
+
+
+class StreamingExportTests(TestCase):
+    """Booking exports stream in constant memory"""
+
+    def setUp(self):
+        self.boat = Boat.objects.create(
+            name='Test Yacht', model='D42', capacity=10,
+            length=Decimal('12.80'), location='Hurghada', daily_rate=Decimal('800.00'),
+        )
+        self.user = User.objects.create(phone='+201000000001')
+
+    def add_bookings(self, count):
+        start = date.today() + timedelta(days=10)
+        Booking.objects.bulk_create([
+            Booking(
+                boat=self.boat, user=self.user, status='confirmed', notes='x' * 200,
+                start_date=start + timedelta(days=i), end_date=start + timedelta(days=i),
+            )
+            for i in range(count)
+        ], batch_size=500)
+
+    def peak_export_allocation(self, params):
+        # The first run of a query warms caches that later runs reuse
+        b''.join(self.client.get('/bookings/export/', params).streaming_content)
+        response = self.client.get('/bookings/export/', params)
+        tracemalloc.start()
+        try:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+            return size, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_json_export_is_a_complete_document(self):
+        self.add_bookings(3)
+        response = self.client.get('/bookings/export/', {'status': 'confirmed'})
+        body = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(body['filters']['status'], 'confirmed')
+        self.assertEqual(len(body['bookings']), 3)
+        self.assertEqual(body['bookings'][0]['boat']['name'], 'Test Yacht')
+
+        empty = json.loads(b''.join(self.client.get('/bookings/export/', {'status': 'pending'}).streaming_content))
+        self.assertEqual(empty['bookings'], [])
+
+    def test_ndjson_export_writes_one_booking_per_line(self):
+        self.add_bookings(4)
+        response = self.client.get('/bookings/export/', {'format': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines],
+                         list(Booking.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+        self.assertEqual(self.client.get('/bookings/export/', {'format': 'xml'}).status_code, 400)
+
+    def test_peak_allocation_stays_flat_as_rows_grow(self):
+        with mock.patch('yachtak_api.streaming.STREAM_CHUNK_SIZE', 50), \
+                mock.patch('yachtak_api.streaming.STREAM_BUFFER_SIZE', 16 * 1024):
+            self.add_bookings(60)
+            small_size, small_peak = self.peak_export_allocation({'format': 'ndjson'})
+            self.add_bookings(5940)
+            large_size, large_peak = self.peak_export_allocation({'format': 'ndjson'})
+
+        self.assertGreater(large_size, small_size * 90)
+        self.assertLess(large_peak, small_peak * 3)
+
+
+class SparseFieldsTests(TestCase):
+    """?fields= on booking lists and detail"""
+
+    def setUp(self):
+        self.boat = Boat.objects.create(
+            name='Test Yacht', model='D42', capacity=10,
+            length=Decimal('12.80'), location='Hurghada', daily_rate=Decimal('800.00'),
+        )
+        self.user = User.objects.create(phone='+201000000001')
+        start = date.today() + timedelta(days=10)
+        self.booking = Booking.objects.create(
+            boat=self.boat, user=self.user, status='confirmed', start_date=start, end_date=start + timedelta(days=2),
+        )
+        self.day_trip = Booking.objects.create(
+            boat=self.boat, user=self.user, status='pending',
+            start_date=start + timedelta(days=5), end_date=start + timedelta(days=5),
+        )
+
+    def test_list_nests_selected_sub_fields(self):
+        first = self.client.get('/bookings/list/', {'fields': 'id,boat.name,duration_days', 'limit': 1}).json()
+        self.assertEqual(first['bookings'], [{'id': self.day_trip.id, 'boat': {'name': 'Test Yacht'}, 'duration_days': 1}])
+
+        rest = self.client.get('/bookings/list/', {
+            'fields': 'id,boat.name,duration_days', 'limit': 1, 'cursor': first['pagination']['next_cursor'],
+        }).json()
+        self.assertEqual(rest['bookings'], [{'id': self.booking.id, 'boat': {'name': 'Test Yacht'}, 'duration_days': 3}])
+
+    def test_detail_reads_only_requested_columns(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/bookings/{self.booking.id}/', {'fields': 'status,user.phone'})
+        self.assertEqual(response.json(), {'status': 'confirmed', 'user': {'phone': '+201000000001'}})
+        self.assertEqual(self.client.get(f'/bookings/{self.booking.id}/', {'fields': 'status.x'}).status_code, 400)
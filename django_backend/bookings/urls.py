@@ -13,6 +13,7 @@ urlpatterns = [
     
     # Specific booking endpoints (must come before generic /bookings/)
     path('bookings/list/', views_task3.list_bookings, name='list-bookings'),
+    path('bookings/export/', views_task3.export_bookings, name='export-bookings'),
     path('bookings/<int:booking_id>/status/', views_task3.update_booking_status, name='update-booking-status'),
     path('bookings/<int:booking_id>/cancel/', views_task3.cancel_booking, name='cancel-booking'),
     path('bookings/<int:booking_id>/', views_task3.get_booking_detail, name='booking-detail'),
@@ -25,6 +26,9 @@ urlpatterns = [
     # Task 5 - Visitor Rental Booking endpoints
     path('bookings/rental/', views_task5.create_visitor_rental, name='create-visitor-rental'),
     path('boats/<int:boat_id>/rental-quote/', views_task5.get_rental_quote, name='get-rental-quote'),
+    path('boats/rental-quotes/', views_task5.batch_rental_quotes, name='batch-rental-quotes'),
+    path('bookings/charter/', views_task5.create_charter_booking, name='create-charter-booking'),
+    path('boats/<int:boat_id>/slots/', views_task5.boat_slot_availability, name='boat-slot-availability'),
     
     # Task 11 - Enhanced Owner Booking with Fuel Threshold endpoints
     path('bookings/owner-enhanced/', views_task11.create_owner_booking_with_fuel_check, name='create-owner-booking-enhanced'),
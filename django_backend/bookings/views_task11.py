@@ -10,8 +10,12 @@ from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import get_user_model
 from decimal import Decimal
 from .models import Booking
+from .occupancy import get_occupancy_index
+from .locking import boat_booking_lock
 from boats.models import Boat
-from ownership.models import FractionalOwnership, BookingRule, FuelWallet
+from yachtak_api.serializers import BOOKING
+from ownership.models import FractionalOwnership, FuelWallet
+from ownership.rules import get_boat_rules
 from payment_system.models import FuelTransaction
 import logging
 
@@ -179,84 +183,75 @@ def create_owner_booking_with_fuel_check(request):
         
         # Continue with existing owner booking validations from Task 4
         
-        # Rule 1: Check for conflicting bookings
-        conflicting_bookings = Booking.objects.filter(
-            boat=boat,
-            start_date__lte=end_date,
-            end_date__gte=start_date,
-            status__in=['confirmed', 'pending']
-        )
-        
-        if conflicting_bookings.exists():
-            conflicting = conflicting_bookings.first()
-            return JsonResponse({
-                'success': False,
-                'message': f'Boat is already booked during this period',
-                'rule_violation': 'booking_conflict',
-                'conflicting_booking': {
-                    'id': conflicting.id,
-                    'dates': f'{conflicting.start_date} to {conflicting.end_date}',
-                    'type': conflicting.booking_type
-                }
-            }, status=400)
-        
-        # Rule 2: Check capacity
-        if guest_count > boat.capacity:
-            return JsonResponse({
-                'success': False,
-                'message': f'Guest count ({guest_count}) exceeds boat capacity ({boat.capacity})',
-                'rule_violation': 'capacity_exceeded'
-            }, status=400)
-        
-        # Rule 3: Check annual day usage limit (48 days default per share)
-        current_year = start_date.year
-        year_start = date(current_year, 1, 1)
-        year_end = date(current_year, 12, 31)
-        
-        existing_bookings_this_year = Booking.objects.filter(
-            boat=boat,
-            user=user,
-            booking_type='owner',
-            status__in=['confirmed', 'pending'],
-            start_date__gte=year_start,
-            end_date__lte=year_end
-        ).exclude(start_date__gte=start_date, end_date__lte=end_date)
-        
-        total_days_used = sum(
-            (booking.end_date - booking.start_date).days + 1 
-            for booking in existing_bookings_this_year
-        )
-        
-        max_days_allowed = ownership.annual_day_limit
-        days_after_booking = total_days_used + duration_days
-        
-        if days_after_booking > max_days_allowed:
-            return JsonResponse({
-                'success': False,
-                'message': f'Booking would exceed annual usage limit',
-                'rule_violation': 'usage_limit_exceeded',
-                'usage_analysis': {
-                    'share_percentage': ownership.share_percentage,
-                    'max_days_allowed': max_days_allowed,
-                    'days_used_this_year': total_days_used,
-                    'requested_days': duration_days,
-                    'total_after_booking': days_after_booking,
-                    'days_over_limit': days_after_booking - max_days_allowed
-                }
-            }, status=400)
-        
-        # Rule 4: Apply booking rules for owners
-        active_rules = BookingRule.objects.filter(
-            boat=boat,
-            is_active=True,
-            start_date__lte=end_date,
-            end_date__gte=start_date
-        )
-        
-        # Check advance booking requirements
-        days_in_advance = (start_date - date.today()).days
-        for rule in active_rules.filter(rule_type='advance_booking'):
-            if rule.days_requirement and days_in_advance < rule.days_requirement:
+        with boat_booking_lock(boat.id):
+            # Rule 1: Check for conflicting bookings and blocked dates
+            conflicts = get_occupancy_index(boat.id, verify=True).conflicts(start_date, end_date)
+            
+            if conflicts:
+                conflicting = conflicts[0]
+                return JsonResponse({
+                    'success': False,
+                    'message': f'Boat is already booked during this period',
+                    'rule_violation': 'booking_conflict',
+                    'conflicting_booking': {
+                        'id': conflicting.id,
+                        'dates': f'{conflicting.start_date} to {conflicting.end_date}',
+                        'type': conflicting.booking_type or conflicting.status
+                    }
+                }, status=400)
+            
+            # Rule 2: Check capacity
+            if guest_count > boat.capacity:
+                return JsonResponse({
+                    'success': False,
+                    'message': f'Guest count ({guest_count}) exceeds boat capacity ({boat.capacity})',
+                    'rule_violation': 'capacity_exceeded'
+                }, status=400)
+            
+            # Rule 3: Check annual day usage limit (48 days default per share)
+            current_year = start_date.year
+            year_start = date(current_year, 1, 1)
+            year_end = date(current_year, 12, 31)
+            
+            existing_bookings_this_year = Booking.objects.filter(
+                boat=boat,
+                user=user,
+                booking_type='owner',
+                status__in=['confirmed', 'pending'],
+                start_date__gte=year_start,
+                end_date__lte=year_end
+            ).exclude(start_date__gte=start_date, end_date__lte=end_date)
+            
+            total_days_used = sum(
+                (booking.end_date - booking.start_date).days + 1 
+                for booking in existing_bookings_this_year
+            )
+            
+            max_days_allowed = ownership.annual_day_limit
+            days_after_booking = total_days_used + duration_days
+            
+            if days_after_booking > max_days_allowed:
+                return JsonResponse({
+                    'success': False,
+                    'message': f'Booking would exceed annual usage limit',
+                    'rule_violation': 'usage_limit_exceeded',
+                    'usage_analysis': {
+                        'share_percentage': ownership.share_percentage,
+                        'max_days_allowed': max_days_allowed,
+                        'days_used_this_year': total_days_used,
+                        'requested_days': duration_days,
+                        'total_after_booking': days_after_booking,
+                        'days_over_limit': days_after_booking - max_days_allowed
+                    }
+                }, status=400)
+            
+            # Rule 4: Apply booking rules for owners
+            rule_set = get_boat_rules(boat.id)
+            
+            # Check advance booking requirements
+            days_in_advance = (start_date - date.today()).days
+            rule = rule_set.advance_booking_violation(start_date, end_date, date.today())
+            if rule:
                 return JsonResponse({
                     'success': False,
                     'message': f'Advance booking requirement: {rule.days_requirement} days minimum',
@@ -264,56 +259,39 @@ def create_owner_booking_with_fuel_check(request):
                     'days_in_advance': days_in_advance,
                     'required_days': rule.days_requirement
                 }, status=400)
-        
-        # Check minimum stay requirements
-        for rule in active_rules.filter(rule_type='minimum_stay'):
-            if rule.days_requirement and duration_days < rule.days_requirement:
+            
+            # Check minimum stay requirements
+            violations = rule_set.minimum_stay_violations(start_date, end_date)
+            if violations:
                 return JsonResponse({
                     'success': False,
-                    'message': f'Minimum stay requirement: {rule.days_requirement} days',
+                    'message': f'Minimum stay requirement: {violations[0].days_requirement} days',
                     'rule_violation': 'minimum_stay_required',
                     'requested_days': duration_days,
-                    'required_days': rule.days_requirement
+                    'required_days': violations[0].days_requirement
                 }, status=400)
-        
-        # Create the owner booking - Task 11 success path
-        booking = Booking.objects.create(
-            boat=boat,
-            user=user,
-            booking_type='owner',
-            status='confirmed',  # Owner bookings are automatically confirmed
-            start_date=start_date,
-            end_date=end_date,
-            guest_count=guest_count,
-            total_amount=Decimal('0.00'),  # No payment required for owners
-            notes=notes
-        )
+            
+            # Create the owner booking - Task 11 success path
+            booking = Booking.objects.create(
+                boat=boat,
+                user=user,
+                booking_type='owner',
+                status='confirmed',  # Owner bookings are automatically confirmed
+                start_date=start_date,
+                end_date=end_date,
+                guest_count=guest_count,
+                total_amount=Decimal('0.00'),  # No payment required for owners
+                notes=notes
+            )
         
         logger.info(f"Enhanced owner booking created with fuel check: {booking.id} for {user_phone}")
         
         return JsonResponse({
             'success': True,
-            'booking': {
-                'id': booking.id,
-                'boat': {
-                    'id': boat.id,
-                    'name': boat.name,
-                    'model': boat.model,
-                    'location': boat.location,
-                },
-                'ownership': {
-                    'share_percentage': ownership.share_percentage,
-                    'annual_day_limit': ownership.annual_day_limit,
-                },
-                'booking_type': booking.booking_type,
-                'status': booking.status,
-                'start_date': booking.start_date.isoformat(),
-                'end_date': booking.end_date.isoformat(),
-                'guest_count': booking.guest_count,
-                'duration_days': booking.duration_days,
-                'notes': booking.notes,
-                'created_at': booking.created_at.isoformat(),
-            },
+            'booking': dict(BOOKING.serialize(booking), ownership={
+                'share_percentage': ownership.share_percentage,
+                'annual_day_limit': ownership.annual_day_limit,
+            }),
             'fuel_analysis': {
                 'current_balance': str(fuel_check_result['current_balance']),
                 'estimated_fuel_cost': str(fuel_check_result['estimated_fuel_cost']),
@@ -416,13 +394,7 @@ def check_owner_booking_eligibility(request, boat_id):
         })
         
         # Booking conflicts
-        conflicts = Booking.objects.filter(
-            boat=boat,
-            start_date__lte=end_date,
-            end_date__gte=start_date,
-            status__in=['confirmed', 'pending']
-        )
-        no_conflicts = not conflicts.exists()
+        no_conflicts = get_occupancy_index(boat.id).is_free(start_date, end_date)
         eligibility_checks.append({
             'check': 'booking_conflicts',
             'passed': no_conflicts,
@@ -9,13 +9,32 @@ from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import get_user_model
 from .models import Booking, CalendarEvent
+from .occupancy import get_occupancy_index, conflict_summary
+from .locking import boat_booking_lock
+from boats.caching import BOAT_CALENDAR_CACHE
 from boats.models import Boat
+from yachtak_api.caching import cached
+from yachtak_api.conditional import conditional_on
+from yachtak_api.pagination import InvalidCursor, paginate
+from yachtak_api.serializers import (
+    BOOKING_DETAIL, BOOKING_LIST, USER_BOOKING, InvalidFields, json_response, sparse,
+)
+from yachtak_api.streaming import stream_rows, streaming_export
 import logging
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+def _calendar_scope(request, boat_id):
+    return [
+        Boat.objects.filter(id=boat_id),
+        Booking.objects.filter(boat_id=boat_id),
+        CalendarEvent.objects.filter(boat_id=boat_id),
+    ]
+
 @require_http_methods(["GET"])
+@conditional_on(_calendar_scope)
+@cached(BOAT_CALENDAR_CACHE)
 def boat_calendar(request, boat_id):
     """
     Task 3 - Get calendar for specific boat
@@ -134,7 +153,8 @@ def boat_calendar(request, boat_id):
 def user_bookings(request):
     """
     Handle bookings for authenticated user
-    GET /bookings/ - Get user bookings with optional filtering
+    GET /bookings/ - Get user bookings with optional filtering, paged by ?limit=&cursor=,
+    trimmed by ?fields=
     POST /bookings/ - Create new booking
     """
     if request.method == "POST":
@@ -157,121 +177,112 @@ def user_bookings(request):
         status = request.GET.get('status')
         boat_id = request.GET.get('boat_id')
         
-        bookings_query = Booking.objects.filter(user=user).select_related('boat')
+        bookings_query = Booking.objects.filter(user=user)
         
         if status:
             bookings_query = bookings_query.filter(status=status)
         if boat_id:
             bookings_query = bookings_query.filter(boat_id=boat_id)
         
-        bookings = bookings_query.order_by('-start_date')
+        plan, _ = sparse(USER_BOOKING, request)
+        bookings_query = plan.values(bookings_query, 'start_date', 'id')
+        bookings, page = paginate(bookings_query, request, ('-start_date', '-id'))
+        bookings_data = [plan.from_values(row) for row in bookings]
         
-        bookings_data = []
-        for booking in bookings:
-            bookings_data.append({
-                'id': booking.id,
-                'boat': {
-                    'id': booking.boat.id,
-                    'name': booking.boat.name,
-                    'model': booking.boat.model,
-                    'location': booking.boat.location,
-                },
-                'booking_type': booking.booking_type,
-                'status': booking.status,
-                'start_date': booking.start_date.isoformat(),
-                'end_date': booking.end_date.isoformat(),
-                'start_time': booking.start_time.isoformat() if booking.start_time else None,
-                'end_time': booking.end_time.isoformat() if booking.end_time else None,
-                'guest_count': booking.guest_count,
-                'total_amount': str(booking.total_amount) if booking.total_amount else None,
-                'notes': booking.notes,
-                'duration_days': booking.duration_days,
-                'created_at': booking.created_at.isoformat(),
-            })
-        
-        return JsonResponse({
+        return json_response({
             'bookings': bookings_data,
             'total_count': len(bookings_data),
             'user_phone': user_phone,
+            'pagination': page,
         })
         
+    except (InvalidCursor, InvalidFields) as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
     except Exception as e:
         logger.error(f"Error fetching user bookings: {e}")
         return JsonResponse({
             'error': 'Failed to fetch bookings'
         }, status=500)
 
+def _booking_list_filters(request):
+    """Filters shared by the booking list and export"""
+    return {
+        'status': request.GET.get('status'),
+        'boat_id': request.GET.get('boat_id'),
+        'user_phone': request.GET.get('user_phone'),
+    }
+
+def _filtered_bookings(filters):
+    bookings_query = Booking.objects.all()
+    if filters['status']:
+        bookings_query = bookings_query.filter(status=filters['status'])
+    if filters['boat_id']:
+        bookings_query = bookings_query.filter(boat_id=filters['boat_id'])
+    if filters['user_phone']:
+        bookings_query = bookings_query.filter(user__phone=filters['user_phone'])
+    return bookings_query
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def list_bookings(request):
     """
     List all bookings with optional filtering
-    GET /bookings/list/?status=confirmed&boat_id=1
-    Returns: Array of all bookings with filtering options
+    GET /bookings/list/?status=confirmed&boat_id=1&limit=50&cursor=...&fields=id,status,boat.name
+    Returns: One page of bookings, newest first; pass pagination.next_cursor for the next page
     """
     try:
-        # Get query parameters for filtering
-        status = request.GET.get('status')
-        boat_id = request.GET.get('boat_id')
-        user_phone = request.GET.get('user_phone')
-        
-        # Base query
-        bookings_query = Booking.objects.all().select_related('boat', 'user')
-        
-        # Apply filters
-        if status:
-            bookings_query = bookings_query.filter(status=status)
-        if boat_id:
-            bookings_query = bookings_query.filter(boat_id=boat_id)
-        if user_phone:
-            bookings_query = bookings_query.filter(user__phone=user_phone)
-        
-        bookings = bookings_query.order_by('-created_at')
-        
-        bookings_data = []
-        for booking in bookings:
-            bookings_data.append({
-                'id': booking.id,
-                'boat': {
-                    'id': booking.boat.id,
-                    'name': booking.boat.name,
-                    'model': booking.boat.model,
-                    'location': booking.boat.location,
-                },
-                'user': {
-                    'phone': booking.user.phone,
-                    'first_name': booking.user.first_name,
-                    'last_name': booking.user.last_name,
-                },
-                'booking_type': booking.booking_type,
-                'status': booking.status,
-                'start_date': booking.start_date.isoformat(),
-                'end_date': booking.end_date.isoformat(),
-                'start_time': booking.start_time.isoformat() if booking.start_time else None,
-                'end_time': booking.end_time.isoformat() if booking.end_time else None,
-                'guest_count': booking.guest_count,
-                'total_amount': str(booking.total_amount) if booking.total_amount else None,
-                'duration_days': booking.duration_days,
-                'notes': booking.notes,
-                'created_at': booking.created_at.isoformat(),
-            })
+        filters = _booking_list_filters(request)
+        plan, _ = sparse(BOOKING_LIST, request)
+        bookings_query = plan.values(_filtered_bookings(filters), 'created_at', 'id')
+        bookings, page = paginate(bookings_query, request, ('-created_at', '-id'))
+        bookings_data = [plan.from_values(row) for row in bookings]
         
-        return JsonResponse({
+        return json_response({
             'bookings': bookings_data,
             'total_count': len(bookings_data),
-            'filters': {
-                'status': status,
-                'boat_id': boat_id,
-                'user_phone': user_phone,
-            }
+            'filters': filters,
+            'pagination': page,
         })
         
+    except (InvalidCursor, InvalidFields) as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
     except Exception as e:
         logger.error(f"Error listing bookings: {e}")
         return JsonResponse({
             'error': 'Failed to list bookings'
         }, status=500)
 
+@require_http_methods(["GET"])
+def export_bookings(request):
+    """
+    Export every booking matching the list filters in one streamed response
+    GET /bookings/export/?status=confirmed&boat_id=1&format=json|ndjson&fields=...
+    Rows are read and written a chunk at a time, so memory stays flat
+    however many bookings match.
+    """
+    try:
+        filters = _booking_list_filters(request)
+        plan, _ = sparse(BOOKING_LIST, request)
+        bookings_query = plan.values(_filtered_bookings(filters)).order_by('-created_at', '-id')
+        return streaming_export(
+            request, 'bookings', stream_rows(bookings_query, plan.from_values),
+            meta={'filters': filters}, filename='bookings',
+        )
+        
+    except ValueError as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
+    except Exception as e:
+        logger.error(f"Error exporting bookings: {e}")
+        return JsonResponse({
+            'error': 'Failed to export bookings'
+        }, status=500)
+
 def create_booking(request):
     """
     Create a new booking
@@ -331,44 +342,33 @@ def create_booking(request):
                 'message': 'Boat not found'
             }, status=404)
         
-        # Check for conflicts
-        conflicting_bookings = Booking.objects.filter(
-            boat=boat,
-            status__in=['confirmed', 'pending'],
-            start_date__lt=end_date,
-            end_date__gt=start_date
-        )
-        
-        if conflicting_bookings.exists():
-            return JsonResponse({
-                'success': False,
-                'message': 'Boat is not available for the selected dates',
-                'conflicting_bookings': [
-                    {
-                        'id': b.id,
-                        'start_date': b.start_date.isoformat(),
-                        'end_date': b.end_date.isoformat(),
-                        'status': b.status
-                    } for b in conflicting_bookings
-                ]
-            }, status=400)
-        
-        # Calculate duration and amount
-        duration_days = (end_date - start_date).days
-        total_amount = boat.daily_rate * duration_days if boat.daily_rate else None
-        
-        # Create booking
-        booking = Booking.objects.create(
-            boat=boat,
-            user=user,
-            booking_type=booking_type,
-            start_date=start_date,
-            end_date=end_date,
-            guest_count=guest_count,
-            status='pending',
-            total_amount=total_amount,
-            notes=notes
-        )
+        with boat_booking_lock(boat.id):
+            # Check for conflicts
+            conflicts = get_occupancy_index(boat.id, verify=True).conflicts(start_date, end_date)
+            
+            if conflicts:
+                return JsonResponse({
+                    'success': False,
+                    'message': 'Boat is not available for the selected dates',
+                    'conflicting_bookings': [conflict_summary(o) for o in conflicts]
+                }, status=400)
+            
+            # Calculate duration and amount
+            duration_days = (end_date - start_date).days
+            total_amount = boat.daily_rate * duration_days if boat.daily_rate else None
+            
+            # Create booking
+            booking = Booking.objects.create(
+                boat=boat,
+                user=user,
+                booking_type=booking_type,
+                start_date=start_date,
+                end_date=end_date,
+                guest_count=guest_count,
+                status='pending',
+                total_amount=total_amount,
+                notes=notes
+            )
         
         logger.info(f"Booking created: {booking.id} for boat {boat_id} by {user_phone}")
         
@@ -412,40 +412,18 @@ def create_booking(request):
 def get_booking_detail(request, booking_id):
     """
     Get detailed information for a specific booking
-    GET /bookings/{id}/
+    GET /bookings/{id}/?fields=... (optional)
     """
     try:
-        booking = Booking.objects.select_related('boat', 'user').get(id=booking_id)
+        plan, _ = sparse(BOOKING_DETAIL, request)
+        booking = plan.load(Booking.objects.all()).get(id=booking_id)
         
-        return JsonResponse({
-            'id': booking.id,
-            'boat': {
-                'id': booking.boat.id,
-                'name': booking.boat.name,
-                'model': booking.boat.model,
-                'location': booking.boat.location,
-                'daily_rate': str(booking.boat.daily_rate) if booking.boat.daily_rate else None,
-            },
-            'user': {
-                'phone': booking.user.phone,
-                'first_name': booking.user.first_name,
-                'last_name': booking.user.last_name,
-                'email': booking.user.email,
-            },
-            'booking_type': booking.booking_type,
-            'status': booking.status,
-            'start_date': booking.start_date.isoformat(),
-            'end_date': booking.end_date.isoformat(),
-            'start_time': booking.start_time.isoformat() if booking.start_time else None,
-            'end_time': booking.end_time.isoformat() if booking.end_time else None,
-            'guest_count': booking.guest_count,
-            'total_amount': str(booking.total_amount) if booking.total_amount else None,
-            'duration_days': booking.duration_days,
-            'notes': booking.notes,
-            'created_at': booking.created_at.isoformat(),
-            'updated_at': booking.updated_at.isoformat(),
-        })
+        return JsonResponse(plan.serialize(booking))
         
+    except InvalidFields as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
     except Booking.DoesNotExist:
         return JsonResponse({
             'error': 'Booking not found'
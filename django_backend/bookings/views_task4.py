@@ -10,8 +10,12 @@ from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import get_user_model
 from decimal import Decimal
 from .models import Booking
+from .occupancy import get_occupancy_index
+from .locking import boat_booking_lock
 from boats.models import Boat
-from ownership.models import FractionalOwnership, BookingRule, FuelWallet
+from yachtak_api.serializers import BOOKING
+from ownership.models import FractionalOwnership, FuelWallet
+from ownership.rules import get_boat_rules
 import logging
 
 logger = logging.getLogger(__name__)
@@ -83,138 +87,105 @@ def create_owner_booking(request):
                 'message': 'User not found'
             }, status=404)
         
-        # Check ownership - Task 4 requirement
-        try:
-            ownership = FractionalOwnership.objects.get(boat=boat, owner=user, is_active=True)
-        except FractionalOwnership.DoesNotExist:
-            return JsonResponse({
-                'success': False,
-                'message': 'You do not own shares in this yacht'
-            }, status=403)
-        
-        # Calculate booking duration
-        duration_days = (end_date - start_date).days + 1
-        
-        # Rules validation - Task 4 Rules v1
-        
-        # Rule 1: Check annual day limit (48 days per share)
-        if ownership.current_year_days_used + duration_days > ownership.annual_day_limit:
-            return JsonResponse({
-                'success': False,
-                'message': f'Booking exceeds annual day limit. Used: {ownership.current_year_days_used}/{ownership.annual_day_limit} days',
-                'rule_violation': 'annual_day_limit'
-            }, status=400)
-        
-        # Rule 2: Check for conflicting bookings
-        conflicting_bookings = Booking.objects.filter(
-            boat=boat,
-            start_date__lte=end_date,
-            end_date__gte=start_date,
-            status__in=['confirmed', 'pending']
-        ).exclude(user=user)
-        
-        if conflicting_bookings.exists():
-            return JsonResponse({
-                'success': False,
-                'message': f'Boat is already booked during this period',
-                'rule_violation': 'booking_conflict'
-            }, status=400)
-        
-        # Rule 3: Check guest capacity
-        if guest_count > boat.capacity:
-            return JsonResponse({
-                'success': False,
-                'message': f'Guest count ({guest_count}) exceeds boat capacity ({boat.capacity})',
-                'rule_violation': 'capacity_exceeded'
-            }, status=400)
-        
-        # Rule 4: Apply booking rules (seasonal multipliers, advance booking, etc.)
-        active_rules = BookingRule.objects.filter(
-            boat=boat,
-            is_active=True,
-            start_date__lte=end_date,
-            end_date__gte=start_date
-        )
-        
-        # Check advance booking requirements
-        for rule in active_rules.filter(rule_type='advance_booking'):
-            if rule.days_requirement:
-                required_advance_days = rule.days_requirement
-                advance_days = (start_date - date.today()).days
-                if advance_days < required_advance_days:
-                    return JsonResponse({
-                        'success': False,
-                        'message': f'Booking requires {required_advance_days} days advance notice',
-                        'rule_violation': 'advance_booking_required'
-                    }, status=400)
-        
-        # Check minimum stay requirements
-        for rule in active_rules.filter(rule_type='minimum_stay'):
-            if rule.days_requirement and duration_days < rule.days_requirement:
+        with boat_booking_lock(boat.id):
+            # Check ownership - Task 4 requirement
+            try:
+                ownership = FractionalOwnership.objects.get(boat=boat, owner=user, is_active=True)
+            except FractionalOwnership.DoesNotExist:
                 return JsonResponse({
                     'success': False,
-                    'message': f'Minimum stay requirement: {rule.days_requirement} days',
+                    'message': 'You do not own shares in this yacht'
+                }, status=403)
+            
+            # Calculate booking duration
+            duration_days = (end_date - start_date).days + 1
+            
+            # Rules validation - Task 4 Rules v1
+            
+            # Rule 1: Check annual day limit (48 days per share)
+            if ownership.current_year_days_used + duration_days > ownership.annual_day_limit:
+                return JsonResponse({
+                    'success': False,
+                    'message': f'Booking exceeds annual day limit. Used: {ownership.current_year_days_used}/{ownership.annual_day_limit} days',
+                    'rule_violation': 'annual_day_limit'
+                }, status=400)
+            
+            # Rule 2: Check for conflicting bookings and blocked dates
+            occupancy = get_occupancy_index(boat.id, verify=True)
+            
+            if not occupancy.is_free(start_date, end_date, exclude_user_id=user.id):
+                return JsonResponse({
+                    'success': False,
+                    'message': f'Boat is already booked during this period',
+                    'rule_violation': 'booking_conflict'
+                }, status=400)
+            
+            # Rule 3: Check guest capacity
+            if guest_count > boat.capacity:
+                return JsonResponse({
+                    'success': False,
+                    'message': f'Guest count ({guest_count}) exceeds boat capacity ({boat.capacity})',
+                    'rule_violation': 'capacity_exceeded'
+                }, status=400)
+            
+            # Rule 4: Apply booking rules (seasonal multipliers, advance booking, etc.)
+            rule_set = get_boat_rules(boat.id)
+            
+            # Check advance booking requirements
+            rule = rule_set.advance_booking_violation(start_date, end_date, date.today())
+            if rule:
+                return JsonResponse({
+                    'success': False,
+                    'message': f'Booking requires {rule.days_requirement} days advance notice',
+                    'rule_violation': 'advance_booking_required'
+                }, status=400)
+            
+            # Check minimum stay requirements
+            violations = rule_set.minimum_stay_violations(start_date, end_date)
+            if violations:
+                return JsonResponse({
+                    'success': False,
+                    'message': f'Minimum stay requirement: {violations[0].days_requirement} days',
                     'rule_violation': 'minimum_stay_required'
                 }, status=400)
-        
-        # Check fuel wallet balance (Task 4 prep for later tasks)
-        fuel_wallet, created = FuelWallet.objects.get_or_create(
-            owner=user,
-            defaults={'current_balance': Decimal('1000.00')}  # Demo balance
-        )
-        
-        if fuel_wallet.is_low_balance:
-            logger.warning(f"Low fuel balance for user {user.phone}: ${fuel_wallet.current_balance}")
-        
-        # Calculate total amount with seasonal multipliers
-        daily_rate = boat.daily_rate
-        total_amount = daily_rate * duration_days
-        
-        # Apply seasonal multipliers
-        for rule in active_rules.filter(rule_type='seasonal_multiplier'):
-            if rule.multiplier_value:
-                total_amount = total_amount * rule.multiplier_value
-                logger.info(f"Applied seasonal multiplier {rule.multiplier_value} for rule: {rule.rule_name}")
-        
-        # Create the booking
-        booking = Booking.objects.create(
-            boat=boat,
-            user=user,
-            booking_type='owner',
-            status='confirmed',  # Owner bookings are auto-confirmed
-            start_date=start_date,
-            end_date=end_date,
-            guest_count=guest_count,
-            total_amount=total_amount,
-            notes=notes
-        )
-        
-        # Update ownership usage
-        ownership.current_year_days_used += duration_days
-        ownership.save()
+            
+            # Check fuel wallet balance (Task 4 prep for later tasks)
+            fuel_wallet, created = FuelWallet.objects.get_or_create(
+                owner=user,
+                defaults={'current_balance': Decimal('1000.00')}  # Demo balance
+            )
+            
+            if fuel_wallet.is_low_balance:
+                logger.warning(f"Low fuel balance for user {user.phone}: ${fuel_wallet.current_balance}")
+            
+            # Calculate total amount with seasonal multipliers applied per day
+            quote = rule_set.price(boat.daily_rate, start_date, end_date)
+            total_amount = quote.total_amount
+            for applied in quote.applied_multipliers:
+                logger.info(f"Applied seasonal multiplier {applied['multiplier']} for {applied['days']} day(s), rule: {applied['rule_name']}")
+            
+            # Create the booking
+            booking = Booking.objects.create(
+                boat=boat,
+                user=user,
+                booking_type='owner',
+                status='confirmed',  # Owner bookings are auto-confirmed
+                start_date=start_date,
+                end_date=end_date,
+                guest_count=guest_count,
+                total_amount=total_amount,
+                notes=notes
+            )
+            
+            # Update ownership usage
+            ownership.current_year_days_used += duration_days
+            ownership.save()
         
         logger.info(f"Owner booking created: {booking.id} for {user.phone}")
         
         return JsonResponse({
             'success': True,
-            'booking': {
-                'id': booking.id,
-                'boat': {
-                    'id': boat.id,
-                    'name': boat.name,
-                    'model': boat.model,
-                    'location': boat.location,
-                },
-                'booking_type': booking.booking_type,
-                'status': booking.status,
-                'start_date': booking.start_date.isoformat(),
-                'end_date': booking.end_date.isoformat(),
-                'guest_count': booking.guest_count,
-                'total_amount': str(booking.total_amount),
-                'duration_days': booking.duration_days,
-                'notes': booking.notes,
-                'created_at': booking.created_at.isoformat(),
-            },
+            'booking': BOOKING.serialize(booking),
             'ownership_usage': {
                 'days_used': ownership.current_year_days_used,
                 'days_limit': ownership.annual_day_limit,
@@ -287,14 +258,9 @@ def check_booking_rules(request, boat_id):
             })
         
         # Check conflicts
-        conflicts = Booking.objects.filter(
-            boat=boat,
-            start_date__lte=end_date,
-            end_date__gte=start_date,
-            status__in=['confirmed', 'pending']
-        ).exclude(user=user)
+        occupancy = get_occupancy_index(boat.id)
         
-        if conflicts.exists():
+        if not occupancy.is_free(start_date, end_date, exclude_user_id=user.id):
             rules_check['can_book'] = False
             rules_check['violations'].append({
                 'rule': 'booking_conflict',
@@ -302,18 +268,11 @@ def check_booking_rules(request, boat_id):
             })
         
         # Check active booking rules
-        active_rules = BookingRule.objects.filter(
-            boat=boat,
-            is_active=True,
-            start_date__lte=end_date,
-            end_date__gte=start_date
-        )
-        
-        for rule in active_rules:
+        for rule in get_boat_rules(boat.id).overlapping(start_date, end_date):
             rules_check['rules_applied'].append({
                 'rule_type': rule.rule_type,
                 'rule_name': rule.rule_name,
-                'description': rule.rule_description,
+                'description': rule.description,
             })
         
         # Check fuel wallet
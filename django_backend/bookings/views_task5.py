@@ -10,8 +10,15 @@ from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import get_user_model
 from decimal import Decimal
 from .models import Booking
+from .occupancy import get_occupancy_index, get_occupancy_indexes
+from .locking import boat_booking_lock
+from .holds import hold_expiry
+from .slots import CHARTER_DAY_HOURS, HOURS_PER_DAY, free_ranges, hour_mask, hour_time
+from boats.caching import RENTAL_QUOTE_CACHE
 from boats.models import Boat
-from ownership.models import BookingRule
+from yachtak_api.caching import cached
+from yachtak_api.serializers import RENTAL_BOOKING
+from ownership.rules import get_boat_rules, get_rules_for_boats
 import logging
 
 logger = logging.getLogger(__name__)
@@ -88,98 +95,62 @@ def create_visitor_rental(request):
         
         # Rental booking validations - Task 5
         
-        # Rule 1: Check for conflicting bookings (both owner and rental)
-        conflicting_bookings = Booking.objects.filter(
-            boat=boat,
-            start_date__lte=end_date,
-            end_date__gte=start_date,
-            status__in=['confirmed', 'pending']
-        )
-        
-        if conflicting_bookings.exists():
-            return JsonResponse({
-                'success': False,
-                'message': f'Boat is already booked during this period',
-                'rule_violation': 'booking_conflict'
-            }, status=400)
-        
-        # Rule 2: Check guest capacity
-        if guest_count > boat.capacity:
-            return JsonResponse({
-                'success': False,
-                'message': f'Guest count ({guest_count}) exceeds boat capacity ({boat.capacity})',
-                'rule_violation': 'capacity_exceeded'
-            }, status=400)
-        
-        # Rule 3: Apply booking rules for rentals
-        active_rules = BookingRule.objects.filter(
-            boat=boat,
-            is_active=True,
-            start_date__lte=end_date,
-            end_date__gte=start_date
-        )
-        
-        # Check minimum stay requirements
-        for rule in active_rules.filter(rule_type='minimum_stay'):
-            if rule.days_requirement and duration_days < rule.days_requirement:
+        with boat_booking_lock(boat.id):
+            # Rule 1: Check for conflicting bookings (both owner and rental) and blocked dates
+            if not get_occupancy_index(boat.id, verify=True).is_free(start_date, end_date):
+                return JsonResponse({
+                    'success': False,
+                    'message': f'Boat is already booked during this period',
+                    'rule_violation': 'booking_conflict'
+                }, status=400)
+            
+            # Rule 2: Check guest capacity
+            if guest_count > boat.capacity:
+                return JsonResponse({
+                    'success': False,
+                    'message': f'Guest count ({guest_count}) exceeds boat capacity ({boat.capacity})',
+                    'rule_violation': 'capacity_exceeded'
+                }, status=400)
+            
+            # Rule 3: Apply booking rules for rentals
+            rule_set = get_boat_rules(boat.id)
+            
+            # Check minimum stay requirements
+            violations = rule_set.minimum_stay_violations(start_date, end_date)
+            if violations:
                 return JsonResponse({
                     'success': False,
-                    'message': f'Minimum stay requirement: {rule.days_requirement} days',
+                    'message': f'Minimum stay requirement: {violations[0].days_requirement} days',
                     'rule_violation': 'minimum_stay_required'
                 }, status=400)
-        
-        # Calculate total amount with seasonal multipliers
-        daily_rate = boat.daily_rate
-        total_amount = daily_rate * duration_days
-        
-        # Apply seasonal multipliers
-        applied_multipliers = []
-        for rule in active_rules.filter(rule_type='seasonal_multiplier'):
-            if rule.multiplier_value:
-                total_amount = total_amount * rule.multiplier_value
-                applied_multipliers.append({
-                    'rule_name': rule.rule_name,
-                    'multiplier': float(rule.multiplier_value)
-                })
-                logger.info(f"Applied seasonal multiplier {rule.multiplier_value} for rule: {rule.rule_name}")
-        
-        # Create the rental booking (pending payment)
-        booking = Booking.objects.create(
-            boat=boat,
-            user=visitor_user,
-            booking_type='rental',
-            status='pending',  # Pending until payment confirmation (Task 7)
-            start_date=start_date,
-            end_date=end_date,
-            guest_count=guest_count,
-            total_amount=total_amount,
-            notes=notes
-        )
+            
+            # Calculate total amount with seasonal multipliers applied per day
+            daily_rate = boat.daily_rate
+            quote = rule_set.price(daily_rate, start_date, end_date)
+            total_amount = quote.total_amount
+            applied_multipliers = quote.applied_multipliers
+            for applied in applied_multipliers:
+                logger.info(f"Applied seasonal multiplier {applied['multiplier']} for {applied['days']} day(s), rule: {applied['rule_name']}")
+            
+            # Create the rental booking (pending payment)
+            booking = Booking.objects.create(
+                boat=boat,
+                user=visitor_user,
+                booking_type='rental',
+                status='pending',  # Pending until payment confirmation (Task 7)
+                start_date=start_date,
+                end_date=end_date,
+                guest_count=guest_count,
+                total_amount=total_amount,
+                notes=notes,
+                hold_expires_at=hold_expiry()
+            )
         
         logger.info(f"Visitor rental booking created: {booking.id} for {contact_phone}")
         
         return JsonResponse({
             'success': True,
-            'booking': {
-                'id': booking.id,
-                'boat': {
-                    'id': boat.id,
-                    'name': boat.name,
-                    'model': boat.model,
-                    'location': boat.location,
-                    'daily_rate': str(boat.daily_rate),
-                },
-                'booking_type': booking.booking_type,
-                'status': booking.status,
-                'start_date': booking.start_date.isoformat(),
-                'end_date': booking.end_date.isoformat(),
-                'guest_count': booking.guest_count,
-                'total_amount': str(booking.total_amount),
-                'duration_days': booking.duration_days,
-                'notes': booking.notes,
-                'created_at': booking.created_at.isoformat(),
-                'contact_phone': visitor_user.phone,
-            },
+            'booking': dict(RENTAL_BOOKING.serialize(booking), contact_phone=visitor_user.phone),
             'pricing_breakdown': {
                 'daily_rate': str(daily_rate),
                 'duration_days': duration_days,
@@ -188,7 +159,7 @@ def create_visitor_rental(request):
                 'final_amount': str(total_amount),
             },
             'next_step': 'payment_required',
-            'payment_message': f'Booking created successfully. Payment of ${total_amount} required to confirm reservation.'
+            'payment_message': f'Booking created successfully. Payment of ${total_amount} required by {booking.hold_expires_at.isoformat()} to confirm reservation.'
         }, status=201)
         
     except json.JSONDecodeError:
@@ -203,7 +174,57 @@ def create_visitor_rental(request):
             'message': 'Failed to create rental booking'
         }, status=500)
 
+def _rental_quote(boat, rule_set, occupancy, start_date, end_date, guest_count):
+    """Quote payload for one boat and stay, shared by the single and batch endpoints"""
+    duration_days = (end_date - start_date).days + 1
+    
+    # Check availability
+    if not occupancy.is_free(start_date, end_date):
+        return {
+            'available': False,
+            'message': 'Boat not available during requested dates'
+        }
+    
+    # Check capacity
+    if guest_count > boat.capacity:
+        return {
+            'available': False,
+            'message': f'Guest count exceeds boat capacity ({boat.capacity})'
+        }
+    
+    # Calculate pricing with rules
+    daily_rate = boat.daily_rate
+    quote = rule_set.price(daily_rate, start_date, end_date)
+    
+    # Check minimum stay requirements
+    minimum_stay_violations = [
+        {'rule_name': rule.rule_name, 'required_days': rule.days_requirement}
+        for rule in rule_set.minimum_stay_violations(start_date, end_date)
+    ]
+    
+    return {
+        'available': len(minimum_stay_violations) == 0,
+        'boat': {
+            'id': boat.id,
+            'name': boat.name,
+            'model': boat.model,
+            'location': boat.location,
+            'capacity': boat.capacity,
+        },
+        'quote': {
+            'daily_rate': str(daily_rate),
+            'duration_days': duration_days,
+            'base_amount': str(quote.base_amount),
+            'applied_multipliers': quote.applied_multipliers,
+            'total_amount': str(quote.total_amount),
+        },
+        'booking_requirements': {
+            'minimum_stay_violations': minimum_stay_violations,
+        }
+    }
+
 @require_http_methods(["GET"])
+@cached(RENTAL_QUOTE_CACHE)
 def get_rental_quote(request, boat_id):
     """
     Get rental quote for visitor booking
@@ -223,85 +244,280 @@ def get_rental_quote(request, boat_id):
         
         start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
         end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-        duration_days = (end_date - start_date).days + 1
         
-        # Check availability
-        conflicts = Booking.objects.filter(
-            boat=boat,
-            start_date__lte=end_date,
-            end_date__gte=start_date,
-            status__in=['confirmed', 'pending']
-        )
+        return JsonResponse(_rental_quote(
+            boat, get_boat_rules(boat.id), get_occupancy_index(boat.id),
+            start_date, end_date, guest_count,
+        ))
         
-        if conflicts.exists():
+    except Boat.DoesNotExist:
+        return JsonResponse({'error': 'Boat not found'}, status=404)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date format or guest count'}, status=400)
+    except Exception as e:
+        logger.error(f"Error getting rental quote: {e}")
+        return JsonResponse({'error': 'Failed to get quote'}, status=500)
+
+MAX_BATCH_QUOTE_ITEMS = 500
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def batch_rental_quotes(request):
+    """
+    Quote many boat/date/guest combinations in one request
+    POST /boats/rental-quotes/
+    Body: {"items": [{"boat_id": 1, "start_date": "2025-09-20", "end_date": "2025-09-21", "guest_count": 8}, ...]}
+    Returns: one result per item, in request order; a bad item gets an error, not a failed batch
+    """
+    try:
+        data = json.loads(request.body)
+        items = data.get('items') if isinstance(data, dict) else None
+        
+        if not isinstance(items, list) or not items:
             return JsonResponse({
-                'available': False,
-                'message': 'Boat not available during requested dates'
-            })
+                'error': 'items must be a non-empty list'
+            }, status=400)
+        
+        if len(items) > MAX_BATCH_QUOTE_ITEMS:
+            return JsonResponse({
+                'error': f'At most {MAX_BATCH_QUOTE_ITEMS} items per batch'
+            }, status=400)
+        
+        # Parse every item first so boats, rules and occupancy load in bulk
+        parsed = []
+        for item in items:
+            try:
+                parsed.append((
+                    int(item['boat_id']),
+                    datetime.strptime(item['start_date'], '%Y-%m-%d').date(),
+                    datetime.strptime(item['end_date'], '%Y-%m-%d').date(),
+                    int(item.get('guest_count', 1)),
+                ))
+            except (KeyError, TypeError, ValueError, AttributeError):
+                parsed.append(None)
+        
+        boat_ids = {entry[0] for entry in parsed if entry}
+        boats = Boat.objects.filter(
+            id__in=boat_ids, is_active=True, allow_public_rental=True
+        ).in_bulk()
+        rule_sets = get_rules_for_boats(boats.keys())
+        occupancy = get_occupancy_indexes(boats.keys())
+        
+        results = []
+        for item, entry in zip(items, parsed):
+            if entry is None:
+                results.append({
+                    'request': item,
+                    'error': 'boat_id, start_date and end_date (YYYY-MM-DD) are required'
+                })
+                continue
+            boat_id, start_date, end_date, guest_count = entry
+            result = {'request': item}
+            if boat_id not in boats:
+                result['error'] = 'Boat not found'
+            elif start_date > end_date:
+                result['error'] = 'Start date must be before or equal to end date'
+            else:
+                result.update(_rental_quote(
+                    boats[boat_id], rule_sets[boat_id], occupancy[boat_id],
+                    start_date, end_date, guest_count,
+                ))
+            results.append(result)
+        
+        return JsonResponse({
+            'results': results,
+            'count': len(results),
+            'available_count': sum(1 for r in results if r.get('available')),
+        })
+        
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    except Exception as e:
+        logger.error(f"Error getting batch rental quotes: {e}")
+        return JsonResponse({'error': 'Failed to get quotes'}, status=500)
+
+MAX_SLOT_DAYS = 31
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def create_charter_booking(request):
+    """
+    Book hourly slots on one day (pending payment)
+    POST /bookings/charter/
+    Body: {"boat_id": 1, "date": "2025-09-20", "start_hour": 17, "end_hour": 20, "guest_count": 6, "contact_phone": "+1234567890"}
+    end_hour is exclusive; 24 runs to the end of the day
+    """
+    try:
+        data = json.loads(request.body)
+        
+        boat_id = data.get('boat_id')
+        contact_phone = data.get('contact_phone')
+        date_str = data.get('date')
+        notes = data.get('notes', '')
+        
+        if not all([boat_id, contact_phone, date_str]) or 'start_hour' not in data or 'end_hour' not in data:
+            return JsonResponse({
+                'success': False,
+                'message': 'boat_id, contact_phone, date, start_hour and end_hour are required'
+            }, status=400)
+        
+        try:
+            charter_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            start_hour = int(data['start_hour'])
+            end_hour = int(data['end_hour'])
+            guest_count = int(data.get('guest_count', 1))
+        except (TypeError, ValueError):
+            return JsonResponse({
+                'success': False,
+                'message': 'Invalid date or hours. Use YYYY-MM-DD and whole hours'
+            }, status=400)
+        
+        if not 0 <= start_hour < end_hour <= HOURS_PER_DAY:
+            return JsonResponse({
+                'success': False,
+                'message': f'Hours must satisfy 0 <= start_hour < end_hour <= {HOURS_PER_DAY}'
+            }, status=400)
+        
+        if charter_date < date.today():
+            return JsonResponse({
+                'success': False,
+                'message': 'Cannot book dates in the past'
+            }, status=400)
+        
+        try:
+            boat = Boat.objects.get(id=boat_id, is_active=True, allow_public_rental=True)
+        except Boat.DoesNotExist:
+            return JsonResponse({
+                'success': False,
+                'message': 'Boat not found or not available for public rental'
+            }, status=404)
         
-        # Check capacity
         if guest_count > boat.capacity:
             return JsonResponse({
-                'available': False,
-                'message': f'Guest count exceeds boat capacity ({boat.capacity})'
-            })
+                'success': False,
+                'message': f'Guest count ({guest_count}) exceeds boat capacity ({boat.capacity})',
+                'rule_violation': 'capacity_exceeded'
+            }, status=400)
         
-        # Calculate pricing with rules
-        daily_rate = boat.daily_rate
-        base_amount = daily_rate * duration_days
-        total_amount = base_amount
+        rule_set = get_boat_rules(boat.id)
+        violations = rule_set.minimum_stay_violations(charter_date, charter_date)
+        if violations:
+            return JsonResponse({
+                'success': False,
+                'message': f'Minimum stay requirement: {violations[0].days_requirement} days',
+                'rule_violation': 'minimum_stay_required'
+            }, status=400)
         
-        active_rules = BookingRule.objects.filter(
-            boat=boat,
-            is_active=True,
-            start_date__lte=end_date,
-            end_date__gte=start_date
+        visitor_user, created = User.objects.get_or_create(
+            phone=contact_phone,
+            defaults={
+                'is_phone_verified': False,
+            }
         )
         
-        applied_multipliers = []
-        for rule in active_rules.filter(rule_type='seasonal_multiplier'):
-            if rule.multiplier_value:
-                total_amount = total_amount * rule.multiplier_value
-                applied_multipliers.append({
-                    'rule_name': rule.rule_name,
-                    'description': rule.rule_description,
-                    'multiplier': float(rule.multiplier_value)
-                })
+        # Hourly price follows the day's seasonal rate
+        hours = end_hour - start_hour
+        day_total = rule_set.price(boat.daily_rate, charter_date, charter_date).total_amount
+        total_amount = (day_total * hours / CHARTER_DAY_HOURS).quantize(Decimal('0.01'))
         
-        # Check minimum stay requirements
-        minimum_stay_violations = []
-        for rule in active_rules.filter(rule_type='minimum_stay'):
-            if rule.days_requirement and duration_days < rule.days_requirement:
-                minimum_stay_violations.append({
-                    'rule_name': rule.rule_name,
-                    'required_days': rule.days_requirement
-                })
+        requested = hour_mask(start_hour, end_hour)
+        with boat_booking_lock(boat.id):
+            taken = get_occupancy_index(boat.id, verify=True).day_mask(charter_date)
+            if taken & requested:
+                return JsonResponse({
+                    'success': False,
+                    'message': 'Requested hours are not available',
+                    'rule_violation': 'booking_conflict',
+                    'free_hours': free_ranges(taken),
+                }, status=400)
+            
+            booking = Booking.objects.create(
+                boat=boat,
+                user=visitor_user,
+                booking_type='rental',
+                status='pending',
+                start_date=charter_date,
+                end_date=charter_date,
+                start_time=hour_time(start_hour),
+                end_time=hour_time(end_hour),
+                guest_count=guest_count,
+                total_amount=total_amount,
+                notes=notes,
+                hold_expires_at=hold_expiry()
+            )
+        
+        logger.info(f"Charter booking created: {booking.id} for boat {boat.id} {charter_date} {start_hour}:00-{end_hour}:00")
         
         return JsonResponse({
-            'available': len(minimum_stay_violations) == 0,
-            'boat': {
-                'id': boat.id,
-                'name': boat.name,
-                'model': boat.model,
-                'location': boat.location,
-                'capacity': boat.capacity,
-            },
-            'quote': {
-                'daily_rate': str(daily_rate),
-                'duration_days': duration_days,
-                'base_amount': str(base_amount),
-                'applied_multipliers': applied_multipliers,
-                'total_amount': str(total_amount),
+            'success': True,
+            'booking': {
+                'id': booking.id,
+                'boat': {
+                    'id': boat.id,
+                    'name': boat.name,
+                },
+                'status': booking.status,
+                'date': charter_date.isoformat(),
+                'start_hour': start_hour,
+                'end_hour': end_hour,
+                'guest_count': booking.guest_count,
+                'total_amount': str(booking.total_amount),
+                'hold_expires_at': booking.hold_expires_at.isoformat(),
             },
-            'booking_requirements': {
-                'minimum_stay_violations': minimum_stay_violations,
-            }
+            'next_step': 'payment_required',
+        }, status=201)
+        
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'message': 'Invalid JSON'
+        }, status=400)
+    except Exception as e:
+        logger.error(f"Error creating charter booking: {e}")
+        return JsonResponse({
+            'success': False,
+            'message': 'Failed to create charter booking'
+        }, status=500)
+
+@require_http_methods(["GET"])
+def boat_slot_availability(request, boat_id):
+    """
+    Hourly slot availability for a boat
+    GET /boats/{boat_id}/slots/?date=2025-09-20&days=7
+    Returns: per day the taken-hours bitmask (bit h = h:00-h+1:00) and free hour ranges
+    """
+    try:
+        boat = Boat.objects.get(id=boat_id, is_active=True)
+        
+        try:
+            date_str = request.GET.get('date')
+            first_day = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else date.today()
+            days = int(request.GET.get('days', 1))
+        except ValueError:
+            return JsonResponse({'error': 'Invalid date or days'}, status=400)
+        
+        if not 1 <= days <= MAX_SLOT_DAYS:
+            return JsonResponse({'error': f'days must be between 1 and {MAX_SLOT_DAYS}'}, status=400)
+        
+        occupancy = get_occupancy_index(boat.id)
+        slots = []
+        for offset in range(days):
+            day = first_day + timedelta(days=offset)
+            mask = occupancy.day_mask(day)
+            slots.append({
+                'date': day.isoformat(),
+                'mask': mask,
+                'free_hours': free_ranges(mask),
+            })
+        
+        return JsonResponse({
+            'boat_id': boat.id,
+            'boat_name': boat.name,
+            'slots': slots,
         })
         
     except Boat.DoesNotExist:
         return JsonResponse({'error': 'Boat not found'}, status=404)
-    except ValueError:
-        return JsonResponse({'error': 'Invalid date format or guest count'}, status=400)
     except Exception as e:
-        logger.error(f"Error getting rental quote: {e}")
-        return JsonResponse({'error': 'Failed to get quote'}, status=500)
\ No newline at end of file
+        logger.error(f"Error getting slot availability for boat {boat_id}: {e}")
+        return JsonResponse({'error': 'Failed to get slot availability'}, status=500)
@@ -99,6 +99,9 @@ class Inquiry(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Inquiry'
         verbose_name_plural = 'Inquiries'
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.first_name} {self.last_name} - {self.inquiry_type} ({self.status})"
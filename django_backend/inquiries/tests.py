@@ -1,3 +1,25 @@
+import json
 from django.test import TestCase
+from .models import Inquiry
 
-# Create your tests here.
+
+class InquiryExportTests(TestCase):
+    """Streamed inquiry export"""
+
+    def setUp(self):
+        Inquiry.objects.bulk_create([
+            Inquiry(first_name='Lead', last_name=str(i), email=f'lead{i}@example.com', is_qualified=i % 2 == 0)
+            for i in range(5)
+        ])
+
+    def test_export_streams_filtered_inquiries(self):
+        response = self.client.get('/inquiries/export/', {'qualified_only': 'true'})
+        body = json.loads(b''.join(response.streaming_content))
+        self.assertTrue(body['success'])
+        self.assertEqual(len(body['inquiries']), 3)
+        self.assertIsNone(body['inquiries'][0]['boat'])
+        self.assertEqual(body['inquiries'][0]['full_name'], 'Lead 4')
+        self.assertEqual(body['inquiries'][0]['budget_display'], 'Not specified')
+
+        ndjson = self.client.get('/inquiries/export/', {'format': 'ndjson'})
+        self.assertEqual(len(b''.join(ndjson.streaming_content).splitlines()), 5)
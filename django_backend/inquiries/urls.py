@@ -11,5 +11,6 @@ urlpatterns = [
     # Task 12 - Inquiries (Lead Capture) endpoints
     path('inquiries/', views_task12.create_inquiry, name='create-inquiry'),
     path('inquiries/list/', views_task12.list_inquiries, name='list-inquiries'),
+    path('inquiries/export/', views_task12.export_inquiries, name='export-inquiries'),
     path('inquiries/<int:inquiry_id>/', views_task12.get_inquiry_details, name='get-inquiry-details'),
 ]
\ No newline at end of file
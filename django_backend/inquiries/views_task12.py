@@ -12,6 +12,9 @@ from django.db.models import Q, Count, Avg
 from decimal import Decimal
 from .models import Inquiry, InquiryFollowUp, LeadSource
 from boats.models import Boat
+from yachtak_api.pagination import InvalidCursor, paginate
+from yachtak_api.serializers import INQUIRY
+from yachtak_api.streaming import stream_rows, streaming_export
 import logging
 
 logger = logging.getLogger(__name__)
@@ -153,63 +156,44 @@ def create_inquiry(request):
             'message': 'Failed to create inquiry'
         }, status=500)
 
+def _inquiry_list_filters(request):
+    """Filters shared by the inquiry list and export"""
+    return {
+        'status': request.GET.get('status'),
+        'inquiry_type': request.GET.get('inquiry_type'),
+        'priority': request.GET.get('priority'),
+        'source': request.GET.get('source'),
+        'qualified_only': request.GET.get('qualified_only') == 'true',
+    }
+
+def _filtered_inquiries(filters):
+    inquiries_query = Inquiry.objects.all()
+    
+    if filters['status']:
+        inquiries_query = inquiries_query.filter(status=filters['status'])
+    if filters['inquiry_type']:
+        inquiries_query = inquiries_query.filter(inquiry_type=filters['inquiry_type'])
+    if filters['priority']:
+        inquiries_query = inquiries_query.filter(priority=filters['priority'])
+    if filters['source']:
+        inquiries_query = inquiries_query.filter(source=filters['source'])
+    if filters['qualified_only']:
+        inquiries_query = inquiries_query.filter(is_qualified=True)
+    return inquiries_query
+
 @require_http_methods(["GET"])
 def list_inquiries(request):
     """
     List inquiries with filtering and sorting
-    GET /inquiries/?status=new&inquiry_type=fractional&limit=20
+    GET /inquiries/?status=new&inquiry_type=fractional&limit=20&cursor=...
     """
     try:
-        # Get query parameters
-        status = request.GET.get('status')
-        inquiry_type = request.GET.get('inquiry_type')
-        priority = request.GET.get('priority')
-        source = request.GET.get('source')
-        qualified_only = request.GET.get('qualified_only') == 'true'
-        limit = int(request.GET.get('limit', 50))
-        
-        # Build query
-        inquiries_query = Inquiry.objects.all()
-        
-        if status:
-            inquiries_query = inquiries_query.filter(status=status)
-        if inquiry_type:
-            inquiries_query = inquiries_query.filter(inquiry_type=inquiry_type)
-        if priority:
-            inquiries_query = inquiries_query.filter(priority=priority)
-        if source:
-            inquiries_query = inquiries_query.filter(source=source)
-        if qualified_only:
-            inquiries_query = inquiries_query.filter(is_qualified=True)
+        filters = _inquiry_list_filters(request)
+        inquiries_query = _filtered_inquiries(filters)
         
-        # Apply limit and get data
-        inquiries = inquiries_query.order_by('-created_at')[:limit]
-        
-        inquiries_data = []
-        for inquiry in inquiries:
-            inquiries_data.append({
-                'id': inquiry.id,
-                'full_name': inquiry.full_name,
-                'email': inquiry.email,
-                'phone': inquiry.phone,
-                'company': inquiry.company,
-                'inquiry_type': inquiry.inquiry_type,
-                'boat': {
-                    'id': inquiry.boat.id,
-                    'name': inquiry.boat.name,
-                    'model': inquiry.boat.model,
-                } if inquiry.boat else None,
-                'status': inquiry.status,
-                'priority': inquiry.priority,
-                'source': inquiry.source,
-                'budget_display': inquiry.budget_display,
-                'timeline': inquiry.timeline,
-                'lead_score': inquiry.lead_score,
-                'is_qualified': inquiry.is_qualified,
-                'last_contact_date': inquiry.last_contact_date.isoformat() if inquiry.last_contact_date else None,
-                'next_follow_up_date': inquiry.next_follow_up_date.isoformat() if inquiry.next_follow_up_date else None,
-                'created_at': inquiry.created_at.isoformat(),
-            })
+        # One keyset page, newest first
+        inquiries, page = paginate(INQUIRY.values(inquiries_query), request, ('-created_at', '-id'))
+        inquiries_data = [INQUIRY.from_values(row) for row in inquiries]
         
         # Get summary statistics
         stats = {
@@ -224,19 +208,14 @@ def list_inquiries(request):
             'inquiries': inquiries_data,
             'count': len(inquiries_data),
             'statistics': stats,
-            'filters_applied': {
-                'status': status,
-                'inquiry_type': inquiry_type,
-                'priority': priority,
-                'source': source,
-                'qualified_only': qualified_only,
-            }
+            'filters_applied': filters,
+            'pagination': page,
         })
         
-    except ValueError:
+    except InvalidCursor as e:
         return JsonResponse({
             'success': False,
-            'message': 'Invalid limit parameter'
+            'message': str(e)
         }, status=400)
     except Exception as e:
         logger.error(f"Error listing inquiries: {e}")
@@ -245,6 +224,32 @@ def list_inquiries(request):
             'message': 'Failed to list inquiries'
         }, status=500)
 
+@require_http_methods(["GET"])
+def export_inquiries(request):
+    """
+    Export every inquiry matching the list filters in one streamed response
+    GET /inquiries/export/?status=new&format=json|ndjson
+    """
+    try:
+        filters = _inquiry_list_filters(request)
+        inquiries_query = INQUIRY.values(_filtered_inquiries(filters)).order_by('-created_at', '-id')
+        return streaming_export(
+            request, 'inquiries', stream_rows(inquiries_query, INQUIRY.from_values),
+            meta={'success': True, 'filters_applied': filters}, filename='inquiries',
+        )
+        
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=400)
+    except Exception as e:
+        logger.error(f"Error exporting inquiries: {e}")
+        return JsonResponse({
+            'success': False,
+            'message': 'Failed to export inquiries'
+        }, status=500)
+
 @require_http_methods(["GET"])
 def get_inquiry_details(request, inquiry_id):
     """
@@ -100,7 +100,7 @@ class Notification(models.Model):
         if not self.is_read:
             self.is_read = True
             self.read_at = timezone.now()
-            self.save(update_fields=['is_read', 'read_at'])
+            self.save(update_fields=['is_read', 'read_at', 'updated_at'])
     
     @property
     def is_expired(self):
@@ -121,7 +121,7 @@ class NotificationService:
             if not notification.is_read:
                 notification.is_read = True
                 notification.read_at = timezone.now()
-                notification.save(update_fields=['is_read', 'read_at'])
+                notification.save(update_fields=['is_read', 'read_at', 'updated_at'])
                 
                 logger.info(f"Notification {notification_id} marked as read by {user.phone}")
                 return True
@@ -133,20 +133,23 @@ class NotificationService:
         return False
 
     @staticmethod
-    def get_user_notifications(user, unread_only=False, limit=50):
-        """Get notifications for a user"""
+    def user_notifications(user, unread_only=False):
+        """Unexpired notifications for a user, unordered for the caller to page"""
         queryset = Notification.objects.filter(user=user)
         
         if unread_only:
             queryset = queryset.filter(is_read=False)
         
         # Exclude expired notifications
-        queryset = queryset.exclude(
+        return queryset.exclude(
             expires_at__isnull=False,
             expires_at__lt=timezone.now()
         )
-        
-        return queryset.order_by('-created_at')[:limit]
+
+    @staticmethod
+    def get_user_notifications(user, unread_only=False, limit=50):
+        """Get notifications for a user"""
+        return NotificationService.user_notifications(user, unread_only).order_by('-created_at')[:limit]
 
     @staticmethod
     def get_notification_count(user, unread_only=True):
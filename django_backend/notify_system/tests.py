@@ -0,0 +1,44 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from notify_system.services import NotificationService
+
+User = get_user_model()
+
+
+class NotificationFeedTests(TestCase):
+    """Paged, sparse notification feed"""
+
+    def setUp(self):
+        self.user = User.objects.create(phone='+201000000001')
+        for i in range(3):
+            NotificationService.create_notification(
+                user=self.user, notification_type='system', title=f'Notice {i}', message='Hello',
+            )
+
+    def test_fields_trim_feed_entries(self):
+        body = self.client.get('/notifications/', {
+            'user_phone': self.user.phone, 'fields': 'title,is_read', 'limit': 2,
+        }).json()
+        self.assertEqual(body['notifications'], [
+            {'title': 'Notice 2', 'is_read': False},
+            {'title': 'Notice 1', 'is_read': False},
+        ])
+        self.assertTrue(body['has_more'])
+
+    def test_related_object_info_is_included_by_default(self):
+        body = self.client.get('/notifications/', {'user_phone': self.user.phone}).json()
+        self.assertEqual(body['count'], 3)
+        self.assertIsNone(body['notifications'][0]['related_object_info'])
+        self.assertEqual(body['notifications'][0]['type'], 'system')
+
+    def test_reading_a_notification_changes_the_etag(self):
+        response = self.client.get('/notifications/', {'user_phone': self.user.phone})
+        headers = {'HTTP_IF_NONE_MATCH': response['ETag']}
+        self.assertEqual(
+            self.client.get('/notifications/', {'user_phone': self.user.phone}, **headers).status_code, 304
+        )
+        notification = self.user.notifications.first()
+        NotificationService.mark_notification_read(notification.id, self.user)
+        self.assertEqual(
+            self.client.get('/notifications/', {'user_phone': self.user.phone}, **headers).status_code, 200
+        )
@@ -13,21 +13,33 @@ from .models import Notification, NotificationPreference, NotificationTemplate
 from .services import NotificationService
 from boats.models import Boat
 from bookings.models import Booking
+from yachtak_api.conditional import conditional_on
+from yachtak_api.pagination import InvalidCursor, paginate
+from yachtak_api.serializers import NOTIFICATION, InvalidFields, sparse
 import logging
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+def _feed_scope(request):
+    user_phone = request.GET.get('user_phone', '+201234567890')
+    # Counting only unexpired rows changes the ETag as notifications expire
+    return [
+        Notification.objects.filter(user__phone=user_phone).exclude(
+            expires_at__isnull=False, expires_at__lt=timezone.now()
+        )
+    ]
+
 @require_http_methods(["GET"])
+@conditional_on(_feed_scope)
 def get_user_notifications(request):
     """
     Get user's notification feed
-    GET /notifications/?user_phone=+201234567890&unread_only=true&limit=20
+    GET /notifications/?user_phone=+201234567890&unread_only=true&limit=20&cursor=...&fields=id,title,is_read
     """
     try:
         user_phone = request.GET.get('user_phone', '+201234567890')
         unread_only = request.GET.get('unread_only', 'false').lower() == 'true'
-        limit = int(request.GET.get('limit', 20))
         
         # Get user
         try:
@@ -38,32 +50,27 @@ def get_user_notifications(request):
                 'message': 'User not found'
             }, status=404)
         
-        # Get notifications
-        notifications = NotificationService.get_user_notifications(
-            user=user,
-            unread_only=unread_only,
-            limit=limit
+        plan, extras = sparse(NOTIFICATION, request, extra=('related_object_info',))
+        notifications_query = NotificationService.user_notifications(user=user, unread_only=unread_only)
+        if 'related_object_info' in extras:
+            notifications_query = plan.load(
+                notifications_query, 'created_at', 'content_type', 'object_id'
+            ).prefetch_related('related_object')
+        else:
+            notifications_query = plan.load(notifications_query, 'created_at')
+        
+        # Get one keyset page of notifications, newest first
+        notifications, page = paginate(
+            notifications_query, request, ('-created_at', '-id'), default_limit=20,
         )
         
         # Format notifications
         notifications_data = []
         for notification in notifications:
-            notifications_data.append({
-                'id': notification.id,
-                'type': notification.notification_type,
-                'title': notification.title,
-                'message': notification.message,
-                'priority': notification.priority,
-                'action_url': notification.action_url,
-                'action_text': notification.action_text,
-                'is_read': notification.is_read,
-                'is_archived': notification.is_archived,
-                'related_object_info': _get_related_object_info(notification),
-                'read_at': notification.read_at.isoformat() if notification.read_at else None,
-                'created_at': notification.created_at.isoformat(),
-                'expires_at': notification.expires_at.isoformat() if notification.expires_at else None,
-                'metadata': notification.metadata,
-            })
+            notification_data = plan.serialize(notification)
+            if 'related_object_info' in extras:
+                notification_data['related_object_info'] = _get_related_object_info(notification)
+            notifications_data.append(notification_data)
         
         # Get notification counts
         total_count = NotificationService.get_notification_count(user, unread_only=False)
@@ -75,13 +82,14 @@ def get_user_notifications(request):
             'count': len(notifications_data),
             'total_count': total_count,
             'unread_count': unread_count,
-            'has_more': len(notifications_data) == limit and total_count > limit,
+            'has_more': page['has_more'],
+            'next_cursor': page['next_cursor'],
         })
         
-    except ValueError:
+    except (InvalidCursor, InvalidFields) as e:
         return JsonResponse({
             'success': False,
-            'message': 'Invalid limit parameter'
+            'message': str(e)
         }, status=400)
     except Exception as e:
         logger.error(f"Error getting user notifications: {e}")
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class OwnershipConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ownership'
+
+    def ready(self):
+        # Register compiled booking rule invalidation signals
+        from . import rules  # noqa: F401
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ownership', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fractionalownership',
+            index=models.Index(fields=['created_at', 'id'], name='ownership_f_created_1bc67e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fuelwallet',
+            index=models.Index(fields=['created_at', 'id'], name='ownership_f_created_012376_idx'),
+        ),
+    ]
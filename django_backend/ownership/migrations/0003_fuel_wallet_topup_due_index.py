@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ownership', '0002_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fuelwallet',
+            index=models.Index(condition=models.Q(('auto_topup_enabled', True), ('current_balance__lt', models.F('low_balance_threshold'))), fields=['id'], name='fuel_wallet_topup_due_idx'),
+        ),
+    ]
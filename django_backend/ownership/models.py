@@ -51,6 +51,9 @@ class FractionalOwnership(models.Model):
         unique_together = ['boat', 'owner']
         verbose_name = 'Fractional Ownership'
         verbose_name_plural = 'Fractional Ownerships'
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.owner.phone} - {self.boat.model} ({self.share_percentage})"
@@ -135,6 +138,16 @@ class FuelWallet(models.Model):
         db_table = 'ownership_fuel_wallet'
         verbose_name = 'Fuel Wallet'
         verbose_name_plural = 'Fuel Wallets'
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            # Holds only wallets due an automatic top-up, so the scheduler's
+            # scan costs the number of due wallets rather than all wallets
+            models.Index(
+                fields=['id'],
+                condition=models.Q(auto_topup_enabled=True, current_balance__lt=models.F('low_balance_threshold')),
+                name='fuel_wallet_topup_due_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"Fuel Wallet - {self.owner.phone} (${self.current_balance})"
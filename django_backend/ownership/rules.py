@@ -0,0 +1,192 @@
+"""
+Compiled Booking Rules
+Per-boat BookingRule sets held in memory for rule checks and pricing
+"""
+import time
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import BookingRule
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Seconds a compiled rule set may be served before it is recompiled.
+# Signals keep it exact within a process; the TTL bounds cross-worker staleness.
+RULES_TTL_SECONDS = 60
+
+CompiledRule = namedtuple('CompiledRule', [
+    'id', 'rule_type', 'rule_name', 'description',
+    'start_date', 'end_date', 'multiplier', 'days_requirement',
+])
+
+Quote = namedtuple('Quote', ['base_amount', 'total_amount', 'applied_multipliers'])
+
+
+class BoatRuleSet:
+    """
+    Active booking rules for one boat, grouped by rule type
+    Rules without both dates never apply, matching the date-range filter
+    the views used before.
+    """
+
+    def __init__(self, boat_id, rules):
+        self.boat_id = boat_id
+        self.compiled_at = time.monotonic()
+        self._by_type = {}
+        for rule in sorted(rules, key=lambda r: r.id):
+            if rule.start_date is None or rule.end_date is None:
+                continue
+            self._by_type.setdefault(rule.rule_type, []).append(rule)
+
+    def overlapping(self, start_date, end_date, rule_type=None):
+        """Rules whose period overlaps [start_date, end_date]"""
+        if rule_type is None:
+            rules = sorted(
+                (r for group in self._by_type.values() for r in group), key=lambda r: r.id
+            )
+        else:
+            rules = self._by_type.get(rule_type, [])
+        return [r for r in rules if r.start_date <= end_date and r.end_date >= start_date]
+
+    def advance_booking_violation(self, start_date, end_date, today):
+        """First advance-booking rule the stay breaks, or None"""
+        advance_days = (start_date - today).days
+        for rule in self.overlapping(start_date, end_date, 'advance_booking'):
+            if rule.days_requirement and advance_days < rule.days_requirement:
+                return rule
+        return None
+
+    def minimum_stay_violations(self, start_date, end_date):
+        """Minimum-stay rules the stay breaks"""
+        duration_days = (end_date - start_date).days + 1
+        return [
+            rule for rule in self.overlapping(start_date, end_date, 'minimum_stay')
+            if rule.days_requirement and duration_days < rule.days_requirement
+        ]
+
+    def seasonal_segments(self, start_date, end_date):
+        """
+        Split [start_date, end_date] into runs with a constant multiplier
+        Sweeps the seasonal rule boundaries, so cost depends on the number
+        of rules, not the length of the stay.
+        Returns: list of (segment_start, days, multiplier, rules)
+        """
+        seasonal = [
+            r for r in self.overlapping(start_date, end_date, 'seasonal_multiplier')
+            if r.multiplier
+        ]
+        cuts = {start_date, end_date + timedelta(days=1)}
+        for rule in seasonal:
+            cuts.add(max(rule.start_date, start_date))
+            cuts.add(min(rule.end_date, end_date) + timedelta(days=1))
+        cuts = sorted(cuts)
+
+        segments = []
+        for segment_start, segment_end in zip(cuts, cuts[1:]):
+            active = [r for r in seasonal if r.start_date <= segment_start <= r.end_date]
+            multiplier = Decimal('1')
+            for rule in active:
+                multiplier *= rule.multiplier
+            segments.append((segment_start, (segment_end - segment_start).days, multiplier, active))
+        return segments
+
+    def price(self, daily_rate, start_date, end_date):
+        """
+        Price a stay with seasonal multipliers applied only to the days
+        each season covers
+        """
+        duration_days = (end_date - start_date).days + 1
+        base_amount = daily_rate * duration_days
+        total_amount = Decimal('0')
+        applied = {}
+        for _, days, multiplier, active in self.seasonal_segments(start_date, end_date):
+            if active:
+                total_amount += daily_rate * days * multiplier
+            else:
+                total_amount += daily_rate * days
+            for rule in active:
+                applied[rule.id] = applied.get(rule.id, 0) + days
+
+        applied_multipliers = []
+        for rule in self.overlapping(start_date, end_date, 'seasonal_multiplier'):
+            if rule.id in applied:
+                applied_multipliers.append({
+                    'rule_name': rule.rule_name,
+                    'description': rule.description,
+                    'multiplier': float(rule.multiplier),
+                    'days': applied[rule.id],
+                })
+        if not applied_multipliers:
+            total_amount = base_amount
+        return Quote(base_amount, total_amount, applied_multipliers)
+
+
+def _compile(rules_by_boat):
+    return {boat_id: BoatRuleSet(boat_id, rules) for boat_id, rules in rules_by_boat.items()}
+
+
+def _load_rules(boat_ids):
+    """Load active rules for the given boats in one query"""
+    grouped = {boat_id: [] for boat_id in boat_ids}
+    for row in BookingRule.objects.filter(boat_id__in=boat_ids, is_active=True).values_list(
+        'boat_id', 'id', 'rule_type', 'rule_name', 'rule_description',
+        'start_date', 'end_date', 'multiplier_value', 'days_requirement',
+    ):
+        grouped[row[0]].append(CompiledRule(*row[1:]))
+    return grouped
+
+
+_rules_cache = {}
+
+
+def _is_fresh(rule_set):
+    return rule_set is not None and time.monotonic() - rule_set.compiled_at < RULES_TTL_SECONDS
+
+
+def get_rules_for_boats(boat_ids):
+    """
+    Compiled rule sets for several boats
+    Missing or expired sets are compiled together from a single query
+    Returns: {boat_id: BoatRuleSet}
+    """
+    result = {}
+    missing = []
+    for boat_id in set(boat_ids):
+        rule_set = _rules_cache.get(boat_id)
+        if _is_fresh(rule_set):
+            result[boat_id] = rule_set
+        else:
+            missing.append(boat_id)
+
+    if missing:
+        compiled = _compile(_load_rules(missing))
+        _rules_cache.update(compiled)
+        result.update(compiled)
+        logger.debug(f"Compiled booking rules for {len(missing)} boat(s)")
+    return result
+
+
+def get_boat_rules(boat_id):
+    """Compiled rule set for one boat"""
+    return get_rules_for_boats([boat_id])[boat_id]
+
+
+def invalidate_rules(boat_id=None):
+    """Drop the compiled rules for a boat, or for all boats"""
+    if boat_id is None:
+        _rules_cache.clear()
+    else:
+        _rules_cache.pop(boat_id, None)
+
+
+@receiver(post_save, sender=BookingRule)
+@receiver(post_delete, sender=BookingRule)
+def _invalidate_on_change(sender, instance, **kwargs):
+    """Recompile a boat's rules after any rule write"""
+    boat_id = instance.boat_id
+    invalidate_rules(boat_id)
+    transaction.on_commit(lambda: invalidate_rules(boat_id))
@@ -1,3 +1,135 @@
+from datetime import date, timedelta
+from decimal import Decimal
 from django.test import TestCase
+from django.contrib.auth import get_user_model
+from boats.models import Boat
+from yachtak_api.serializers import OWNERSHIP
+from .models import BookingRule, FractionalOwnership, FuelWallet
+from .rules import get_boat_rules, get_rules_for_boats, invalidate_rules
 
-# Create your tests here.
+User = get_user_model()
+
+
+class CompiledRulesTests(TestCase):
+    """Compiled per-boat booking rules"""
+
+    def setUp(self):
+        invalidate_rules()
+        self.boat = Boat.objects.create(
+            name='Test Yacht', model='D42', capacity=10,
+            length=Decimal('12.80'), location='Hurghada', daily_rate=Decimal('1000.00'),
+        )
+        self.day = date.today() + timedelta(days=30)
+
+    def rule(self, rule_type, start_offset, end_offset, **fields):
+        return BookingRule.objects.create(
+            boat=self.boat, rule_type=rule_type, rule_name=f'{rule_type} {start_offset}',
+            start_date=self.day + timedelta(days=start_offset),
+            end_date=self.day + timedelta(days=end_offset),
+            **fields
+        )
+
+    def test_seasonal_multiplier_applies_per_day(self):
+        self.rule('seasonal_multiplier', 2, 10, multiplier_value=Decimal('1.5'))
+        quote = get_boat_rules(self.boat.id).price(
+            self.boat.daily_rate, self.day, self.day + timedelta(days=3)
+        )
+        self.assertEqual(quote.base_amount, Decimal('4000'))
+        self.assertEqual(quote.total_amount, Decimal('5000'))
+        self.assertEqual(quote.applied_multipliers[0]['days'], 2)
+
+    def test_overlapping_seasons_compound_on_shared_days(self):
+        self.rule('seasonal_multiplier', 0, 1, multiplier_value=Decimal('2'))
+        self.rule('seasonal_multiplier', 1, 2, multiplier_value=Decimal('1.5'))
+        quote = get_boat_rules(self.boat.id).price(
+            self.boat.daily_rate, self.day, self.day + timedelta(days=2)
+        )
+        # 2.0 + 3.0 + 1.5 days' worth of the daily rate
+        self.assertEqual(quote.total_amount, Decimal('6500'))
+
+    def test_checks_answered_without_queries_and_invalidated_on_save(self):
+        rule = self.rule('minimum_stay', 0, 30, days_requirement=3)
+        rule_set = get_boat_rules(self.boat.id)
+        with self.assertNumQueries(0):
+            rule_set = get_boat_rules(self.boat.id)
+            self.assertEqual(len(rule_set.minimum_stay_violations(self.day, self.day)), 1)
+            self.assertIsNone(rule_set.advance_booking_violation(self.day, self.day, date.today()))
+
+        rule.is_active = False
+        rule.save()
+        self.assertEqual(get_boat_rules(self.boat.id).minimum_stay_violations(self.day, self.day), [])
+
+    def test_undated_rules_never_apply(self):
+        BookingRule.objects.create(
+            boat=self.boat, rule_type='advance_booking', rule_name='Always', days_requirement=90,
+        )
+        rule_set = get_boat_rules(self.boat.id)
+        self.assertIsNone(rule_set.advance_booking_violation(self.day, self.day, date.today()))
+        self.assertEqual(rule_set.overlapping(self.day, self.day), [])
+
+    def test_bulk_compile_single_query(self):
+        other = Boat.objects.create(
+            name='Other', model='D28', capacity=6,
+            length=Decimal('8.50'), location='Hurghada', daily_rate=Decimal('500.00'),
+        )
+        self.rule('advance_booking', 0, 5, days_requirement=60)
+        with self.assertNumQueries(1):
+            rule_sets = get_rules_for_boats([self.boat.id, other.id])
+        self.assertIsNotNone(
+            rule_sets[self.boat.id].advance_booking_violation(self.day, self.day, date.today())
+        )
+        self.assertEqual(rule_sets[other.id].overlapping(self.day, self.day), [])
+
+    def test_rental_quote_uses_per_day_pricing(self):
+        self.rule('seasonal_multiplier', 1, 1, multiplier_value=Decimal('2.0'))
+        response = self.client.get(f'/boats/{self.boat.id}/rental-quote/', {
+            'start_date': self.day.isoformat(),
+            'end_date': (self.day + timedelta(days=2)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        quote = response.json()['quote']
+        self.assertEqual(Decimal(quote['total_amount']), Decimal('4000'))
+        self.assertEqual(quote['applied_multipliers'][0]['days'], 1)
+
+
+class OwnershipSerializationTests(TestCase):
+    """Ownership and wallet responses built from the shared field plans"""
+
+    def setUp(self):
+        self.boat = Boat.objects.create(
+            name='Test Yacht', model='D42', capacity=10,
+            length=Decimal('12.80'), location='Hurghada', daily_rate=Decimal('1000.00'),
+        )
+        self.owner = User.objects.create(phone='+201000000001', first_name='Nour')
+        self.ownership = FractionalOwnership.objects.create(
+            boat=self.boat, owner=self.owner, share_percentage='1/4',
+            purchase_date=date.today(), purchase_price=Decimal('250000.00'),
+            current_year_days_used=10, current_year_hours_used=Decimal('12.50'),
+        )
+
+    def test_values_path_matches_model_path(self):
+        from_model = OWNERSHIP.serialize(FractionalOwnership.objects.select_related(*OWNERSHIP.related).get())
+        from_values = OWNERSHIP.serialize_queryset(FractionalOwnership.objects.all())
+        self.assertEqual(from_values, [from_model])
+        self.assertEqual(from_model['remaining_days'], 38)
+        self.assertEqual(from_model['remaining_hours'], '37.50')
+        self.assertEqual(from_model['owner']['first_name'], 'Nour')
+
+    def test_user_ownership_lists_owned_boats(self):
+        response = self.client.get(f'/ownership/user/{self.owner.phone}/')
+        self.assertEqual(response.status_code, 200)
+        ownership = response.json()['ownerships'][0]
+        self.assertEqual(ownership['boat']['name'], 'Test Yacht')
+        self.assertEqual(ownership['purchase_price'], '250000.00')
+        self.assertNotIn('owner', ownership)
+
+    def test_wallet_endpoints_share_one_shape(self):
+        wallet = FuelWallet.objects.create(owner=self.owner, current_balance=Decimal('50.00'))
+        listed = self.client.get('/fuel-wallet/').json()['fuel_wallets'][0]
+        by_user = self.client.get(f'/fuel-wallet/user/{self.owner.phone}/').json()
+        self.assertEqual(listed, by_user)
+        self.assertTrue(listed['is_low_balance'])
+
+        detail = self.client.get(f'/fuel-wallet/{wallet.id}/').json()
+        self.assertEqual(detail['current_balance'], '50.00')
+        self.assertIn('email', detail['owner'])
@@ -11,6 +11,14 @@ from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import get_user_model
 from .models import FractionalOwnership, FuelWallet, BookingRule
 from boats.models import Boat
+from bookings.models import Booking
+from payment_system.ledger import IdempotencyConflict, InsufficientFunds, post_entry
+from yachtak_api.conditional import conditional_on
+from yachtak_api.pagination import InvalidCursor, paginate
+from yachtak_api.serializers import (
+    FUEL_TRANSACTION, FUEL_WALLET, FUEL_WALLET_DETAIL, OWNER_OWNERSHIP, OWNERSHIP, OWNERSHIP_DETAIL,
+    InvalidFields, json_response, sparse,
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,7 +32,7 @@ def list_ownerships(request):
     """
     List all fractional ownerships
     GET /ownership/
-    Query params: boat_id, user_phone, status (optional)
+    Query params: boat_id, user_phone, status, limit, cursor, fields (optional)
     """
     try:
         # Get query parameters
@@ -33,7 +41,7 @@ def list_ownerships(request):
         status = request.GET.get('status')
         
         # Base query
-        ownerships_query = FractionalOwnership.objects.all().select_related('boat', 'owner')
+        ownerships_query = FractionalOwnership.objects.all()
         
         # Apply filters
         if boat_id:
@@ -43,45 +51,26 @@ def list_ownerships(request):
         if status:
             ownerships_query = ownerships_query.filter(is_active=(status == 'active'))
         
-        ownerships = ownerships_query.order_by('-created_at')
-        
-        ownerships_data = []
-        for ownership in ownerships:
-            ownerships_data.append({
-                'id': ownership.id,
-                'boat': {
-                    'id': ownership.boat.id,
-                    'name': ownership.boat.name,
-                    'model': ownership.boat.model,
-                    'location': ownership.boat.location,
-                },
-                'owner': {
-                    'phone': ownership.owner.phone,
-                    'first_name': ownership.owner.first_name,
-                    'last_name': ownership.owner.last_name,
-                },
-                'share_percentage': ownership.share_percentage,
-                'is_active': ownership.is_active,
-                'annual_day_limit': ownership.annual_day_limit,
-                'annual_hour_limit': ownership.annual_hour_limit,
-                'current_year_days_used': ownership.current_year_days_used,
-                'current_year_hours_used': str(ownership.current_year_hours_used),
-                'remaining_days': ownership.remaining_days,
-                'remaining_hours': str(ownership.remaining_hours),
-                'purchase_price': str(ownership.purchase_price) if ownership.purchase_price else None,
-                'created_at': ownership.created_at.isoformat(),
-            })
+        plan, _ = sparse(OWNERSHIP, request)
+        ownerships_query = plan.values(ownerships_query, 'created_at', 'id')
+        ownerships, page = paginate(ownerships_query, request, ('-created_at', '-id'))
+        ownerships_data = [plan.from_values(row) for row in ownerships]
         
-        return JsonResponse({
+        return json_response({
             'ownerships': ownerships_data,
             'total_count': len(ownerships_data),
             'filters': {
                 'boat_id': boat_id,
                 'user_phone': user_phone,
                 'status': status,
-            }
+            },
+            'pagination': page,
         })
         
+    except (InvalidCursor, InvalidFields) as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
     except Exception as e:
         logger.error(f"Error listing ownerships: {e}")
         return JsonResponse({
@@ -97,7 +86,7 @@ def user_ownership(request, user_phone):
     """
     try:
         user = User.objects.get(phone=user_phone)
-        ownerships = FractionalOwnership.objects.filter(owner=user).select_related('boat')
+        ownerships = FractionalOwnership.objects.filter(owner=user)
         
         if not ownerships.exists():
             return JsonResponse({
@@ -107,24 +96,7 @@ def user_ownership(request, user_phone):
                 'message': 'No ownership found for this user'
             })
         
-        ownerships_data = []
-        for ownership in ownerships:
-            ownerships_data.append({
-                'id': ownership.id,
-                'boat': {
-                    'id': ownership.boat.id,
-                    'name': ownership.boat.name,
-                    'model': ownership.boat.model,
-                    'location': ownership.boat.location,
-                },
-                'share_percentage': ownership.share_percentage,
-                'status': ownership.status,
-                'annual_usage_limit': ownership.annual_usage_limit,
-                'current_usage_days': ownership.current_usage_days,
-                'remaining_days': ownership.annual_usage_limit - ownership.current_usage_days if ownership.annual_usage_limit else None,
-                'purchase_price': str(ownership.purchase_price) if ownership.purchase_price else None,
-                'created_at': ownership.created_at.isoformat(),
-            })
+        ownerships_data = OWNER_OWNERSHIP.serialize_queryset(ownerships)
         
         return JsonResponse({
             'owner': {
@@ -151,39 +123,18 @@ def user_ownership(request, user_phone):
 def ownership_detail(request, ownership_id):
     """
     Get detailed information for a specific ownership
-    GET /ownership/{id}/
+    GET /ownership/{id}/?fields=... (optional)
     """
     try:
-        ownership = FractionalOwnership.objects.select_related('boat', 'owner').get(id=ownership_id)
+        plan, _ = sparse(OWNERSHIP_DETAIL, request)
+        ownership = plan.load(FractionalOwnership.objects.all()).get(id=ownership_id)
         
-        return JsonResponse({
-            'id': ownership.id,
-            'boat': {
-                'id': ownership.boat.id,
-                'name': ownership.boat.name,
-                'model': ownership.boat.model,
-                'location': ownership.boat.location,
-                'daily_rate': str(ownership.boat.daily_rate) if ownership.boat.daily_rate else None,
-            },
-            'owner': {
-                'phone': ownership.owner.phone,
-                'first_name': ownership.owner.first_name,
-                'last_name': ownership.owner.last_name,
-                'email': ownership.owner.email,
-            },
-            'share_percentage': ownership.share_percentage,
-            'is_active': ownership.is_active,
-            'annual_day_limit': ownership.annual_day_limit,
-            'annual_hour_limit': ownership.annual_hour_limit,
-            'current_year_days_used': ownership.current_year_days_used,
-            'current_year_hours_used': str(ownership.current_year_hours_used),
-            'remaining_days': ownership.remaining_days,
-            'remaining_hours': str(ownership.remaining_hours),
-            'purchase_price': str(ownership.purchase_price) if ownership.purchase_price else None,
-            'created_at': ownership.created_at.isoformat(),
-            'updated_at': ownership.updated_at.isoformat(),
-        })
+        return JsonResponse(plan.serialize(ownership))
         
+    except InvalidFields as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
     except FractionalOwnership.DoesNotExist:
         return JsonResponse({
             'error': 'Ownership not found'
@@ -202,7 +153,7 @@ def list_fuel_wallets(request):
     """
     List all fuel wallets
     GET /fuel-wallet/
-    Query params: user_phone, status (optional)
+    Query params: user_phone, status, limit, cursor, fields (optional)
     """
     try:
         # Get query parameters
@@ -210,50 +161,45 @@ def list_fuel_wallets(request):
         status = request.GET.get('status')
         
         # Base query
-        wallets_query = FuelWallet.objects.all().select_related('owner')
+        wallets_query = FuelWallet.objects.all()
         
         # Apply filters
         if user_phone:
             wallets_query = wallets_query.filter(owner__phone=user_phone)
         
-        wallets = wallets_query.order_by('-created_at')
-        
-        wallets_data = []
-        for wallet in wallets:
-            wallets_data.append({
-                'id': wallet.id,
-                'owner': {
-                    'phone': wallet.owner.phone,
-                    'first_name': wallet.owner.first_name,
-                    'last_name': wallet.owner.last_name,
-                },
-                'current_balance': str(wallet.current_balance),
-                'total_purchased': str(wallet.total_purchased),
-                'total_consumed': str(wallet.total_consumed),
-                'low_balance_threshold': str(wallet.low_balance_threshold),
-                'auto_topup_enabled': wallet.auto_topup_enabled,
-                'auto_topup_amount': str(wallet.auto_topup_amount),
-                'is_low_balance': wallet.is_low_balance,
-                'created_at': wallet.created_at.isoformat(),
-                'last_transaction': wallet.updated_at.isoformat(),
-            })
+        plan, _ = sparse(FUEL_WALLET, request)
+        wallets_query = plan.values(wallets_query, 'created_at', 'id')
+        wallets, page = paginate(wallets_query, request, ('-created_at', '-id'))
+        wallets_data = [plan.from_values(row) for row in wallets]
         
-        return JsonResponse({
+        return json_response({
             'fuel_wallets': wallets_data,
             'total_count': len(wallets_data),
             'filters': {
                 'user_phone': user_phone,
-            }
+            },
+            'pagination': page,
         })
         
+    except (InvalidCursor, InvalidFields) as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
     except Exception as e:
         logger.error(f"Error listing fuel wallets: {e}")
         return JsonResponse({
             'error': 'Failed to list fuel wallets'
         }, status=500)
 
+def _user_wallet_scope(request, user_phone):
+    return [FuelWallet.objects.filter(owner__phone=user_phone), User.objects.filter(phone=user_phone)]
+
+def _wallet_scope(request, wallet_id):
+    return [FuelWallet.objects.filter(id=wallet_id), User.objects.filter(fuel_wallet__id=wallet_id)]
+
 @csrf_exempt
 @require_http_methods(["GET"])
+@conditional_on(_user_wallet_scope)
 def user_fuel_wallet(request, user_phone):
     """
     Get fuel wallet for a specific user
@@ -261,25 +207,9 @@ def user_fuel_wallet(request, user_phone):
     """
     try:
         user = User.objects.get(phone=user_phone)
-        wallet = FuelWallet.objects.get(owner=user)
+        wallet = FuelWallet.objects.select_related(*FUEL_WALLET.related).get(owner=user)
         
-        return JsonResponse({
-            'id': wallet.id,
-            'owner': {
-                'phone': user.phone,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-            },
-            'current_balance': str(wallet.current_balance),
-            'total_purchased': str(wallet.total_purchased),
-            'total_consumed': str(wallet.total_consumed),
-            'low_balance_threshold': str(wallet.low_balance_threshold),
-            'auto_topup_enabled': wallet.auto_topup_enabled,
-            'auto_topup_amount': str(wallet.auto_topup_amount),
-            'is_low_balance': wallet.is_low_balance,
-            'created_at': wallet.created_at.isoformat(),
-            'last_transaction': wallet.updated_at.isoformat(),
-        })
+        return JsonResponse(FUEL_WALLET.serialize(wallet))
         
     except User.DoesNotExist:
         return JsonResponse({
@@ -297,32 +227,16 @@ def user_fuel_wallet(request, user_phone):
 
 @csrf_exempt
 @require_http_methods(["GET"])
+@conditional_on(_wallet_scope)
 def fuel_wallet_detail(request, wallet_id):
     """
     Get detailed information for a specific fuel wallet
     GET /fuel-wallet/{id}/
     """
     try:
-        wallet = FuelWallet.objects.select_related('owner').get(id=wallet_id)
+        wallet = FuelWallet.objects.select_related(*FUEL_WALLET_DETAIL.related).get(id=wallet_id)
         
-        return JsonResponse({
-            'id': wallet.id,
-            'owner': {
-                'phone': wallet.owner.phone,
-                'first_name': wallet.owner.first_name,
-                'last_name': wallet.owner.last_name,
-                'email': wallet.owner.email,
-            },
-            'current_balance': str(wallet.current_balance),
-            'total_purchased': str(wallet.total_purchased),
-            'total_consumed': str(wallet.total_consumed),
-            'low_balance_threshold': str(wallet.low_balance_threshold),
-            'auto_topup_enabled': wallet.auto_topup_enabled,
-            'auto_topup_amount': str(wallet.auto_topup_amount),
-            'is_low_balance': wallet.is_low_balance,
-            'created_at': wallet.created_at.isoformat(),
-            'updated_at': wallet.updated_at.isoformat(),
-        })
+        return JsonResponse(FUEL_WALLET_DETAIL.serialize(wallet))
         
     except FuelWallet.DoesNotExist:
         return JsonResponse({
@@ -339,40 +253,32 @@ def fuel_wallet_detail(request, wallet_id):
 def fuel_transactions(request, wallet_id):
     """
     Get transaction history for a fuel wallet
-    GET /fuel-wallet/{id}/transactions/
+    GET /fuel-wallet/{id}/transactions/?limit=50&cursor=...&fields=...
+    Returns: One page of ledger entries, newest first
     """
     try:
-        wallet = FuelWallet.objects.get(id=wallet_id)
+        wallet = FuelWallet.objects.select_related('owner').get(id=wallet_id)
         
-        # For now, return basic wallet info
-        # In a full implementation, you'd have a FuelTransaction model
-        return JsonResponse({
+        plan, _ = sparse(FUEL_TRANSACTION, request)
+        transactions_query = plan.values(wallet.transactions.all(), 'created_at', 'id')
+        transactions, page = paginate(transactions_query, request, ('-created_at', '-id'))
+        
+        return json_response({
             'wallet_id': wallet.id,
             'user_phone': wallet.owner.phone,
             'current_balance': str(wallet.current_balance),
-            'transactions': [
-                {
-                    'id': 'demo_1',
-                    'type': 'credit',
-                    'amount': '500.00',
-                    'description': 'Initial wallet setup',
-                    'timestamp': wallet.created_at.isoformat(),
-                },
-                {
-                    'id': 'demo_2',
-                    'type': 'debit',
-                    'amount': '75.00',
-                    'description': 'Fuel usage - Booking #123',
-                    'timestamp': wallet.updated_at.isoformat(),
-                }
-            ],
-            'message': 'Demo transaction data - implement FuelTransaction model for full functionality'
+            'transactions': [plan.from_values(row) for row in transactions],
+            'pagination': page,
         })
         
     except FuelWallet.DoesNotExist:
         return JsonResponse({
             'error': 'Fuel wallet not found'
         }, status=404)
+    except (InvalidCursor, InvalidFields) as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
     except Exception as e:
         logger.error(f"Error fetching fuel transactions: {e}")
         return JsonResponse({
@@ -400,12 +306,15 @@ def add_fuel_funds(request, wallet_id):
             }, status=400)
         
         wallet = FuelWallet.objects.select_related('owner').get(id=wallet_id)
-        old_balance = wallet.current_balance
-        wallet.current_balance += amount
-        wallet.total_purchased += amount
-        wallet.save()
+        entry = post_entry(
+            wallet,
+            'purchase',
+            amount,
+            idempotency_key=data.get('idempotency_key') or request.headers.get('Idempotency-Key'),
+            description=notes or f'Wallet top-up via {payment_method}'
+        )
         
-        logger.info(f"Fuel wallet {wallet_id} credited with {amount}. New balance: {wallet.current_balance}")
+        logger.info(f"Fuel wallet {wallet_id} credited with {amount}. New balance: {entry.balance_after}")
         
         return JsonResponse({
             'success': True,
@@ -413,12 +322,13 @@ def add_fuel_funds(request, wallet_id):
             'wallet': {
                 'id': wallet.id,
                 'user_phone': wallet.owner.phone,
-                'old_balance': str(old_balance),
-                'amount_added': str(amount),
-                'new_balance': str(wallet.current_balance),
+                'transaction_id': entry.id,
+                'old_balance': str(entry.balance_before),
+                'amount_added': str(entry.amount),
+                'new_balance': str(entry.balance_after),
                 'payment_method': payment_method,
                 'notes': notes,
-                'timestamp': wallet.updated_at.isoformat(),
+                'timestamp': entry.created_at.isoformat(),
             }
         })
         
@@ -427,6 +337,11 @@ def add_fuel_funds(request, wallet_id):
             'success': False,
             'message': 'Fuel wallet not found'
         }, status=404)
+    except IdempotencyConflict as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=409)
     except (ValueError, TypeError):
         return JsonResponse({
             'success': False,
@@ -466,18 +381,22 @@ def deduct_fuel(request, wallet_id):
         
         wallet = FuelWallet.objects.select_related('owner').get(id=wallet_id)
         
-        if wallet.current_balance < amount:
+        try:
+            entry = post_entry(
+                wallet,
+                'consumption',
+                amount,
+                idempotency_key=data.get('idempotency_key') or request.headers.get('Idempotency-Key'),
+                booking=Booking.objects.filter(id=booking_id).first() if booking_id else None,
+                description=description
+            )
+        except InsufficientFunds as e:
             return JsonResponse({
                 'success': False,
-                'message': f'Insufficient fuel balance. Available: {wallet.current_balance}, Required: {amount}'
+                'message': str(e)
             }, status=400)
         
-        old_balance = wallet.current_balance
-        wallet.current_balance -= amount
-        wallet.total_consumed += amount
-        wallet.save()
-        
-        logger.info(f"Fuel wallet {wallet_id} debited {amount} for booking {booking_id}. New balance: {wallet.current_balance}")
+        logger.info(f"Fuel wallet {wallet_id} debited {amount} for booking {booking_id}. New balance: {entry.balance_after}")
         
         return JsonResponse({
             'success': True,
@@ -485,12 +404,13 @@ def deduct_fuel(request, wallet_id):
             'wallet': {
                 'id': wallet.id,
                 'user_phone': wallet.owner.phone,
-                'old_balance': str(old_balance),
-                'amount_deducted': str(amount),
-                'new_balance': str(wallet.current_balance),
+                'transaction_id': entry.id,
+                'old_balance': str(entry.balance_before),
+                'amount_deducted': str(entry.amount),
+                'new_balance': str(entry.balance_after),
                 'booking_id': booking_id,
                 'description': description,
-                'timestamp': wallet.updated_at.isoformat(),
+                'timestamp': entry.created_at.isoformat(),
             }
         })
         
@@ -499,6 +419,11 @@ def deduct_fuel(request, wallet_id):
             'success': False,
             'message': 'Fuel wallet not found'
         }, status=404)
+    except IdempotencyConflict as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=409)
     except (ValueError, TypeError):
         return JsonResponse({
             'success': False,
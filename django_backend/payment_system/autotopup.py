@@ -0,0 +1,156 @@
+"""
+Automatic Fuel Top-Ups
+Batch scheduler creating PaymentIntents for every wallet below its auto top-up threshold
+"""
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+from ownership.models import FuelWallet
+from .models import PaymentIntent
+from .stripe_service import stripe_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Wallets read and sent to Stripe per batch
+TOPUP_BATCH_SIZE = 200
+
+# Concurrent Stripe requests within a batch
+TOPUP_CONCURRENCY = 8
+
+# A top-up intent still awaiting payment holds off another one for its
+# wallet for this long; after that the owner is asked again
+IN_FLIGHT_WINDOW = timedelta(hours=24)
+
+IN_FLIGHT_STATUSES = (
+    'requires_payment_method', 'requires_confirmation', 'requires_action', 'processing', 'requires_capture',
+)
+
+TopupReport = namedtuple('TopupReport', ['due', 'in_flight', 'created', 'duplicates', 'failed', 'seconds'])
+
+
+def in_flight_topups(now=None):
+    """Auto top-up intents created recently and not yet paid or canceled"""
+    return PaymentIntent.objects.filter(
+        payment_type='fuel_topup',
+        metadata__auto_topup='true',
+        status__in=IN_FLIGHT_STATUSES,
+        created_at__gte=(now or timezone.now()) - IN_FLIGHT_WINDOW,
+    )
+
+
+def due_wallets():
+    """
+    Wallets with auto top-up on and a balance under their threshold
+    Matches the condition of the fuel_wallet_topup_due_idx partial index
+    exactly, so the database reads that index instead of every wallet.
+    """
+    return FuelWallet.objects.filter(auto_topup_enabled=True, current_balance__lt=F('low_balance_threshold'))
+
+
+def _request_intent(wallet):
+    """
+    Create the Stripe PaymentIntent for one wallet row
+    The idempotency key names the wallet state that triggered the top-up, so
+    overlapping scheduler runs get the same intent back from Stripe.
+    """
+    amount = wallet['auto_topup_amount']
+    phone = wallet['owner__phone']
+    description = f"Automatic fuel wallet top-up: ${amount} for {phone}"
+    metadata = {
+        'user_phone': phone,
+        'fuel_wallet_id': str(wallet['id']),
+        'topup_amount': str(amount),
+        'current_balance': str(wallet['current_balance']),
+        'auto_topup': 'true',
+    }
+    success, payment_intent_data, error = stripe_service.create_payment_intent(
+        amount=float(amount),
+        currency='usd',
+        description=description,
+        metadata=metadata,
+        idempotency_key=f"auto-topup:{wallet['id']}:{wallet['updated_at'].isoformat()}",
+    )
+    if not success:
+        raise RuntimeError(error)
+    return PaymentIntent(
+        stripe_payment_intent_id=payment_intent_data['id'],
+        stripe_client_secret=payment_intent_data['client_secret'],
+        user_id=wallet['owner_id'],
+        payment_type='fuel_topup',
+        amount=amount,
+        currency='USD',
+        status=payment_intent_data['status'],
+        fuel_wallet_id=wallet['id'],
+        description=description,
+        metadata=metadata,
+    )
+
+
+def _submit(executor, wallets):
+    """Send a batch to Stripe concurrently; (records, failures) in batch order"""
+    records = []
+    failed = 0
+    futures = [(wallet, executor.submit(_request_intent, wallet)) for wallet in wallets]
+    for wallet, future in futures:
+        try:
+            records.append(future.result())
+        except Exception as e:
+            failed += 1
+            logger.error(f"Auto top-up for fuel wallet {wallet['id']} failed: {e}")
+    return records, failed
+
+
+def _save(records):
+    """Store new intents, skipping ones another run already stored; returns the number stored"""
+    ids = [record.stripe_payment_intent_id for record in records]
+    existing = set(PaymentIntent.objects.filter(stripe_payment_intent_id__in=ids).values_list(
+        'stripe_payment_intent_id', flat=True
+    ))
+    fresh = [record for record in records if record.stripe_payment_intent_id not in existing]
+    PaymentIntent.objects.bulk_create(fresh, ignore_conflicts=True)
+    return len(fresh)
+
+
+def run_auto_topups(batch_size=TOPUP_BATCH_SIZE, concurrency=TOPUP_CONCURRENCY):
+    """
+    Create top-up PaymentIntents for every due wallet
+    Due wallets are read in id order one batch at a time; each batch goes to
+    Stripe on at most `concurrency` threads, then is saved in one insert.
+    Wallets with an intent in flight are counted but skipped. Only the
+    calling thread touches the database.
+    Returns: TopupReport
+    """
+    started = time.perf_counter()
+    in_flight = in_flight_topups().filter(fuel_wallet=OuterRef('pk'))
+    wallets = due_wallets().annotate(in_flight=Exists(in_flight)).order_by('id').values(
+        'id', 'owner_id', 'owner__phone', 'current_balance', 'auto_topup_amount', 'updated_at', 'in_flight',
+    )
+
+    due = skipped = created = duplicates = failed = 0
+    last_id = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while True:
+            batch = list(wallets.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1]['id']
+            due += len(batch)
+            pending = [wallet for wallet in batch if not wallet['in_flight']]
+            skipped += len(batch) - len(pending)
+
+            records, batch_failed = _submit(executor, pending)
+            saved = _save(records)
+            created += saved
+            duplicates += len(records) - saved
+            failed += batch_failed
+
+    report = TopupReport(due, skipped, created, duplicates, failed, time.perf_counter() - started)
+    logger.info(
+        f"Auto top-up run: {report.created} intent(s) created for {report.due} due wallet(s), "
+        f"{report.in_flight} in flight, {report.failed} failed, in {report.seconds:.2f} s"
+    )
+    return report
@@ -0,0 +1,188 @@
+"""
+Fuel Wallet Ledger
+Append-only fuel transactions with atomic wallet balance updates
+"""
+from collections import namedtuple
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from ownership.models import FuelWallet
+from .models import FuelTransaction
+from .rollups import apply_entry
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Entry types that take from the balance; every other type adds to it, and
+# adjustments carry their own sign in amount
+DEBIT_TYPES = ('consumption',)
+
+# Wallet running totals moved alongside the balance
+TOTAL_FIELDS = {'purchase': 'total_purchased', 'consumption': 'total_consumed'}
+
+# Wallets recomputed per query by verify_balances
+VERIFY_BATCH_SIZE = 2000
+
+Discrepancy = namedtuple('Discrepancy', ['wallet_id', 'recorded', 'expected'])
+
+
+class InsufficientFunds(Exception):
+    """The wallet balance does not cover a debit"""
+
+    def __init__(self, wallet_id, balance, amount):
+        super().__init__(f"Insufficient fuel balance. Available: {balance}, Required: {amount}")
+        self.wallet_id = wallet_id
+        self.balance = balance
+        self.amount = amount
+
+
+class IdempotencyConflict(Exception):
+    """An idempotency key was already used on the wallet for a different entry"""
+
+    def __init__(self, idempotency_key, entry):
+        super().__init__(
+            f"Idempotency key {idempotency_key} was already used for a {entry.transaction_type} of {entry.amount}"
+        )
+        self.idempotency_key = idempotency_key
+        self.entry = entry
+
+
+class _Replayed(Exception):
+    """Rolls back a balance update whose idempotency key was already posted"""
+
+    def __init__(self, entry):
+        self.entry = entry
+
+
+def signed_amount(transaction_type, amount):
+    """Change to the wallet balance made by an entry"""
+    if transaction_type in DEBIT_TYPES:
+        return -amount
+    return amount
+
+
+def _refresh(wallet):
+    """Copy the committed balance and totals onto a wallet instance"""
+    fields = ('current_balance', 'total_purchased', 'total_consumed', 'updated_at')
+    for name, value in FuelWallet.objects.filter(pk=wallet.pk).values(*fields).get().items():
+        setattr(wallet, name, value)
+
+
+def _replay(wallet, idempotency_key, transaction_type, amount):
+    """
+    Entry already posted to wallet under idempotency_key, or None
+    Raises: IdempotencyConflict if it records a different type or amount
+    """
+    entry = FuelTransaction.objects.filter(fuel_wallet_id=wallet.pk, idempotency_key=idempotency_key).first()
+    if entry is not None and (entry.transaction_type != transaction_type or entry.amount != amount):
+        raise IdempotencyConflict(idempotency_key, entry)
+    return entry
+
+
+def post_entry(wallet, transaction_type, amount, idempotency_key=None, booking=None,
+               payment_intent=None, description='', engine_hours=None):
+    """
+    Record a ledger entry and move the wallet balance in one transaction
+    The balance moves by a single UPDATE with F() expressions, so concurrent
+    entries never overwrite each other, and debits carry a balance >= amount
+    guard in the same statement, so a wallet is never overdrawn. The UPDATE
+    also write-locks the wallet row (the whole database on SQLite) before
+    anything is read, which makes balance_before exact and serializes
+    entries carrying the same idempotency key.
+
+    The wallet's rollups are updated in the same transaction. Keys are
+    scoped to the wallet: a repeated idempotency_key returns the entry
+    first posted with it to this wallet and leaves the balance alone, and
+    one reused for a different type or amount is refused. wallet is
+    refreshed with the new balance.
+    Raises: InsufficientFunds, IdempotencyConflict, FuelWallet.DoesNotExist
+    """
+    amount = Decimal(amount)
+    if transaction_type not in dict(FuelTransaction.TRANSACTION_TYPE_CHOICES):
+        raise ValueError(f"Unknown fuel transaction type: {transaction_type}")
+    if amount <= 0 and transaction_type != 'adjustment':
+        raise ValueError("Amount must be greater than 0")
+
+    delta = signed_amount(transaction_type, amount)
+    updates = {'current_balance': F('current_balance') + delta, 'updated_at': timezone.now()}
+    if transaction_type in TOTAL_FIELDS:
+        field = TOTAL_FIELDS[transaction_type]
+        updates[field] = F(field) + amount
+
+    try:
+        with transaction.atomic():
+            wallets = FuelWallet.objects.filter(pk=wallet.pk)
+            if delta < 0:
+                wallets = wallets.filter(current_balance__gte=-delta)
+            updated = wallets.update(**updates)
+
+            if idempotency_key:
+                existing = _replay(wallet, idempotency_key, transaction_type, amount)
+                if existing is not None:
+                    raise _Replayed(existing)
+
+            if not updated:
+                balance = FuelWallet.objects.values_list('current_balance', flat=True).get(pk=wallet.pk)
+                raise InsufficientFunds(wallet.pk, balance, -delta)
+
+            balance_after = FuelWallet.objects.values_list('current_balance', flat=True).get(pk=wallet.pk)
+            entry = FuelTransaction.objects.create(
+                fuel_wallet_id=wallet.pk,
+                booking=booking,
+                payment_intent=payment_intent,
+                transaction_type=transaction_type,
+                amount=amount,
+                balance_before=balance_after - delta,
+                balance_after=balance_after,
+                engine_hours=engine_hours,
+                description=description,
+                idempotency_key=idempotency_key or None,
+            )
+            apply_entry(entry)
+    except _Replayed as replayed:
+        entry = replayed.entry
+        logger.debug(f"Fuel ledger entry {idempotency_key} already posted as transaction {entry.id}")
+    except IntegrityError:
+        # The same key posted concurrently to this wallet
+        entry = _replay(wallet, idempotency_key, transaction_type, amount) if idempotency_key else None
+        if entry is None:
+            raise
+
+    _refresh(wallet)
+    return entry
+
+
+def verify_balances(wallet_ids=None):
+    """
+    Recompute wallet balances from the ledger and list those that disagree
+    A wallet's expected balance is the balance_before of its first entry
+    (funds held before the ledger existed) plus the signed sum of every
+    entry. Wallets are checked in batches, one aggregate query each.
+    Returns: list of Discrepancy
+    """
+    money = DecimalField(max_digits=12, decimal_places=2)
+    signed = Case(
+        When(transactions__transaction_type__in=DEBIT_TYPES, then=-F('transactions__amount')),
+        default=F('transactions__amount'),
+        output_field=money,
+    )
+    opening = FuelTransaction.objects.filter(fuel_wallet=OuterRef('pk')).order_by('id').values('balance_before')[:1]
+
+    wallets = FuelWallet.objects.order_by('id')
+    if wallet_ids is not None:
+        wallets = wallets.filter(id__in=wallet_ids)
+    ids = list(wallets.values_list('id', flat=True))
+
+    discrepancies = []
+    for start in range(0, len(ids), VERIFY_BATCH_SIZE):
+        rows = FuelWallet.objects.filter(id__in=ids[start:start + VERIFY_BATCH_SIZE]).annotate(
+            net=Coalesce(Sum(signed), Value(Decimal('0.00')), output_field=money),
+            opening=Coalesce(Subquery(opening), Value(Decimal('0.00')), output_field=money),
+        ).order_by('id').values_list('id', 'current_balance', 'opening', 'net')
+        for wallet_id, recorded, opening_balance, net in rows:
+            expected = opening_balance + net
+            if recorded != expected:
+                discrepancies.append(Discrepancy(wallet_id, recorded, expected))
+    return discrepancies
@@ -0,0 +1,17 @@
+"""
+Backfill fuel wallet rollups
+Run once after deploying rollups, and after loading transactions that bypassed the ledger
+"""
+from django.core.management.base import BaseCommand
+from payment_system.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-wallet and monthly fuel rollups from the transaction ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('wallet_ids', nargs='*', type=int, help='Wallets to rebuild (default: all)')
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_rollups(options['wallet_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rollups for {rebuilt} fuel wallet(s)'))
@@ -0,0 +1,34 @@
+"""
+Process queued Stripe webhook events
+Run as a worker with --poll when STRIPE_WEBHOOK_PROCESS_IN_BACKGROUND is off, or once to replay failures
+"""
+import time
+from django.core.management.base import BaseCommand
+from payment_system.models import StripeWebhookEvent
+from payment_system.webhooks import INBOX_BATCH_SIZE, process_pending
+
+
+class Command(BaseCommand):
+    help = 'Apply pending Stripe webhook events from the inbox, in order per PaymentIntent'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Worker threads (default STRIPE_WEBHOOK_WORKERS)')
+        parser.add_argument('--batch-size', type=int, default=INBOX_BATCH_SIZE, help='Events read per round')
+        parser.add_argument('--poll', type=float, default=None, help='Keep running, checking for events every POLL seconds')
+        parser.add_argument('--retry-failed', action='store_true', help='Queue events parked as failed again first')
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            requeued = StripeWebhookEvent.objects.filter(status='failed').update(status='pending', attempts=0)
+            self.stdout.write(f'Requeued {requeued} failed event(s)')
+
+        while True:
+            started = time.perf_counter()
+            applied = process_pending(workers=options['workers'], batch_size=options['batch_size'])
+            if options['poll'] is None or applied:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Applied {applied} webhook event(s) in {time.perf_counter() - started:.2f} s'
+                ))
+            if options['poll'] is None:
+                break
+            time.sleep(options['poll'])
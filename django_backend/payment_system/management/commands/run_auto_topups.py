@@ -0,0 +1,28 @@
+"""
+Run automatic fuel top-ups
+Schedule every few minutes; each run creates PaymentIntents for wallets under their threshold
+"""
+from django.core.management.base import BaseCommand
+from payment_system.autotopup import TOPUP_BATCH_SIZE, TOPUP_CONCURRENCY, run_auto_topups
+from payment_system.stripe_service import stripe_service
+
+
+class Command(BaseCommand):
+    help = 'Create top-up PaymentIntents for every fuel wallet due an automatic top-up'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=TOPUP_BATCH_SIZE, help='Wallets per batch')
+        parser.add_argument('--concurrency', type=int, default=TOPUP_CONCURRENCY, help='Concurrent Stripe requests')
+
+    def handle(self, *args, **options):
+        report = run_auto_topups(batch_size=options['batch_size'], concurrency=options['concurrency'])
+        mode = 'mock' if stripe_service.mock_mode else 'live'
+        rate = report.created / report.seconds if report.seconds else 0
+        self.stdout.write(f'Due wallets:       {report.due}')
+        self.stdout.write(f'Already in flight: {report.in_flight}')
+        self.stdout.write(f'Duplicates:        {report.duplicates}')
+        self.stdout.write(f'Failed:            {report.failed}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {report.created} PaymentIntent(s) in {report.seconds:.2f} s '
+            f'({rate:.0f}/s, Stripe {mode} mode)'
+        ))
@@ -0,0 +1,23 @@
+"""
+Verify fuel wallet balances against the ledger
+Exits non-zero when any wallet balance differs from its transaction history
+"""
+from django.core.management.base import BaseCommand, CommandError
+from payment_system.ledger import verify_balances
+
+
+class Command(BaseCommand):
+    help = 'Recompute every fuel wallet balance from its transactions and report mismatches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('wallet_ids', nargs='*', type=int, help='Wallets to check (default: all)')
+
+    def handle(self, *args, **options):
+        discrepancies = verify_balances(options['wallet_ids'] or None)
+        for discrepancy in discrepancies:
+            self.stdout.write(self.style.ERROR(
+                f'Wallet {discrepancy.wallet_id}: balance {discrepancy.recorded}, ledger {discrepancy.expected}'
+            ))
+        if discrepancies:
+            raise CommandError(f'{len(discrepancies)} wallet(s) disagree with the ledger')
+        self.stdout.write(self.style.SUCCESS('Every fuel wallet balance matches its ledger'))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment_system', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fueltransaction',
+            name='idempotency_key',
+            field=models.CharField(blank=True, help_text='Client or payment key; a repeated key returns the original entry', max_length=255, null=True, unique=True),
+        ),
+    ]
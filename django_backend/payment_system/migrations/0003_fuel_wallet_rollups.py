@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:54
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ownership', '0002_keyset_pagination_indexes'),
+        ('payment_system', '0002_fuel_transaction_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FuelWalletRollup',
+            fields=[
+                ('fuel_wallet', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rollup', serialize=False, to='ownership.fuelwallet')),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('purchased', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('consumed', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('refunded', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('adjusted', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('engine_hours', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+            ],
+            options={
+                'verbose_name': 'Fuel Wallet Rollup',
+                'verbose_name_plural': 'Fuel Wallet Rollups',
+                'db_table': 'payment_system_fuel_wallet_rollup',
+            },
+        ),
+        migrations.CreateModel(
+            name='FuelWalletMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('purchased', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('consumed', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('refunded', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('adjusted', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('engine_hours', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('fuel_wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to='ownership.fuelwallet')),
+            ],
+            options={
+                'verbose_name': 'Fuel Wallet Monthly Rollup',
+                'verbose_name_plural': 'Fuel Wallet Monthly Rollups',
+                'db_table': 'payment_system_fuel_wallet_monthly_rollup',
+                'ordering': ['-month'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='fuelwalletmonthlyrollup',
+            constraint=models.UniqueConstraint(fields=('fuel_wallet', 'month'), name='unique_fuel_wallet_month'),
+        ),
+    ]
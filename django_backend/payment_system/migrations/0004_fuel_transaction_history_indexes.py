@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment_system', '0003_fuel_wallet_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fueltransaction',
+            index=models.Index(fields=['fuel_wallet', 'created_at', 'id'], name='payment_sys_fuel_wa_72d2b0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fueltransaction',
+            index=models.Index(fields=['created_at', 'id'], name='payment_sys_created_2a4b44_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fueltransaction',
+            index=models.Index(fields=['transaction_type', 'created_at', 'id'], name='payment_sys_transac_d9a371_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment_system', '0005_stripe_webhook_inbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentintent',
+            name='refund_required',
+            field=models.BooleanField(default=False, help_text="Paid after the booking's hold lapsed and its dates were rebooked"),
+        ),
+    ]
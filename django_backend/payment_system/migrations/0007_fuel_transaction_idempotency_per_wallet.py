@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-17 14:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment_system', '0006_payment_intent_refund_required'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='fueltransaction',
+            name='idempotency_key',
+            field=models.CharField(blank=True, help_text='Client or payment key, unique per wallet; a repeated key returns the original entry', max_length=255, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='fueltransaction',
+            constraint=models.UniqueConstraint(fields=('fuel_wallet', 'idempotency_key'), name='unique_fuel_wallet_idempotency_key'),
+        ),
+    ]
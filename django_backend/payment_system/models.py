@@ -50,6 +50,7 @@ class PaymentIntent(models.Model):
     # Metadata
     description = models.TextField(blank=True)
     metadata = models.JSONField(default=dict, blank=True)
+    refund_required = models.BooleanField(default=False, help_text="Paid after the booking's hold lapsed and its dates were rebooked")
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -91,6 +92,7 @@ class FuelTransaction(models.Model):
     # Additional details
     description = models.TextField(blank=True)
     engine_hours = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True, help_text="Engine hours for consumption")
+    idempotency_key = models.CharField(max_length=255, null=True, blank=True, help_text="Client or payment key, unique per wallet; a repeated key returns the original entry")
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -100,6 +102,120 @@ class FuelTransaction(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Fuel Transaction'
         verbose_name_plural = 'Fuel Transactions'
+        # Keyset paging and exports: one wallet's history, and every
+        # wallet's by date or by type
+        indexes = [
+            models.Index(fields=['fuel_wallet', 'created_at', 'id']),
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['transaction_type', 'created_at', 'id']),
+        ]
+        # Keys come from clients, so they are scoped to the wallet: the same
+        # key on another wallet is a different request
+        constraints = [
+            models.UniqueConstraint(fields=['fuel_wallet', 'idempotency_key'], name='unique_fuel_wallet_idempotency_key'),
+        ]
     
     def __str__(self):
         return f"{self.transaction_type} - ${self.amount} ({self.fuel_wallet.owner.phone})"
+    
+    def save(self, *args, **kwargs):
+        # The ledger is append-only: corrections are posted as adjustments
+        if not self._state.adding:
+            raise ValueError("Fuel transactions cannot be modified; post an adjustment instead")
+        super().save(*args, **kwargs)
+
+class FuelWalletRollup(models.Model):
+    """
+    Lifetime ledger totals for one fuel wallet
+    Maintained by the ledger on every entry, so the wallet screen reads one
+    row instead of scanning the wallet's whole history
+    """
+    
+    fuel_wallet = models.OneToOneField(FuelWallet, on_delete=models.CASCADE, primary_key=True, related_name='rollup')
+    
+    # Totals by transaction type; adjusted is signed
+    transaction_count = models.PositiveIntegerField(default=0)
+    purchased = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    consumed = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    refunded = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    adjusted = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    engine_hours = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    
+    class Meta:
+        db_table = 'payment_system_fuel_wallet_rollup'
+        verbose_name = 'Fuel Wallet Rollup'
+        verbose_name_plural = 'Fuel Wallet Rollups'
+    
+    def __str__(self):
+        return f"Rollup - wallet {self.fuel_wallet_id} ({self.transaction_count} transactions)"
+
+class FuelWalletMonthlyRollup(models.Model):
+    """
+    Ledger totals for one fuel wallet in one calendar month of TIME_ZONE
+    """
+    
+    fuel_wallet = models.ForeignKey(FuelWallet, on_delete=models.CASCADE, related_name='monthly_rollups')
+    month = models.DateField(help_text="First day of the month")
+    
+    transaction_count = models.PositiveIntegerField(default=0)
+    purchased = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    consumed = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    refunded = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    adjusted = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    engine_hours = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    
+    class Meta:
+        db_table = 'payment_system_fuel_wallet_monthly_rollup'
+        ordering = ['-month']
+        verbose_name = 'Fuel Wallet Monthly Rollup'
+        verbose_name_plural = 'Fuel Wallet Monthly Rollups'
+        constraints = [
+            models.UniqueConstraint(fields=['fuel_wallet', 'month'], name='unique_fuel_wallet_month'),
+        ]
+    
+    def __str__(self):
+        return f"Rollup - wallet {self.fuel_wallet_id} {self.month:%Y-%m}"
+
+class StripeWebhookEvent(models.Model):
+    """
+    Inbox of Stripe webhook deliveries - Task 7
+    Stored on receipt and acknowledged at once; a worker pool applies them
+    """
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('processed', 'Processed'),
+        ('skipped', 'Skipped'),
+        ('failed', 'Failed'),
+    ]
+    
+    # Stripe identifiers; a redelivered event id is never stored twice
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    payment_intent_id = models.CharField(max_length=200, blank=True, help_text="Events for one PaymentIntent are applied in order")
+    stripe_created = models.BigIntegerField(default=0, help_text="Stripe event creation time (Unix seconds)")
+    payload = models.JSONField(default=dict)
+    
+    # Processing state
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    
+    # Timestamps
+    received_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'payment_system_webhook_event'
+        ordering = ['id']
+        verbose_name = 'Stripe Webhook Event'
+        verbose_name_plural = 'Stripe Webhook Events'
+        indexes = [
+            models.Index(fields=['status', 'id']),
+            models.Index(fields=['payment_intent_id', 'stripe_created']),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_type} - {self.event_id} ({self.status})"
@@ -0,0 +1,91 @@
+"""
+Fuel Wallet Rollups
+Per-wallet lifetime and monthly ledger totals, kept current on every ledger entry
+"""
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, DateField, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from ownership.models import FuelWallet
+from .models import FuelTransaction, FuelWalletMonthlyRollup, FuelWalletRollup
+
+# Rollup column holding each transaction type's total
+TYPE_COLUMNS = {
+    'purchase': 'purchased',
+    'consumption': 'consumed',
+    'refund': 'refunded',
+    'adjustment': 'adjusted',
+}
+
+# Wallets rebuilt per transaction by rebuild_rollups
+REBUILD_BATCH_SIZE = 500
+
+
+def entry_month(created_at):
+    """First day of the month an entry is bucketed under"""
+    return timezone.localtime(created_at).date().replace(day=1)
+
+
+def _bump(model, lookup, changes):
+    """Add changes to the row matching lookup, creating it on first use"""
+    if not model.objects.filter(**lookup).update(**{name: F(name) + value for name, value in changes.items()}):
+        model.objects.create(**lookup, **changes)
+
+
+def apply_entry(entry):
+    """
+    Add a new ledger entry to its wallet's rollups
+    Must run in the transaction that posted the entry, after the wallet row
+    was locked, so two entries never race to create the same rollup row.
+    """
+    changes = {'transaction_count': 1, TYPE_COLUMNS[entry.transaction_type]: entry.amount}
+    if entry.engine_hours:
+        changes['engine_hours'] = entry.engine_hours
+    _bump(FuelWalletRollup, {'fuel_wallet_id': entry.fuel_wallet_id}, changes)
+    _bump(FuelWalletMonthlyRollup, {
+        'fuel_wallet_id': entry.fuel_wallet_id, 'month': entry_month(entry.created_at),
+    }, changes)
+
+
+def _totals():
+    totals = {
+        column: Sum('amount', filter=Q(transaction_type=transaction_type), default=Decimal('0.00'))
+        for transaction_type, column in TYPE_COLUMNS.items()
+    }
+    totals['transaction_count'] = Count('id')
+    totals['engine_hours'] = Sum('engine_hours', default=Decimal('0.00'))
+    return totals
+
+
+def rebuild_rollups(wallet_ids=None):
+    """
+    Recompute rollups from the ledger, for entries written before rollups
+    existed or without going through the ledger
+    Each batch locks its wallets, so entries posted meanwhile wait for the
+    batch rather than bumping rows it is replacing.
+    Returns: number of wallets rebuilt
+    """
+    wallets = FuelWallet.objects.order_by('id')
+    if wallet_ids is not None:
+        wallets = wallets.filter(id__in=wallet_ids)
+    ids = list(wallets.values_list('id', flat=True))
+
+    for start in range(0, len(ids), REBUILD_BATCH_SIZE):
+        batch = ids[start:start + REBUILD_BATCH_SIZE]
+        with transaction.atomic():
+            list(FuelWallet.objects.select_for_update().filter(id__in=batch).values_list('id', flat=True))
+            FuelWalletRollup.objects.filter(fuel_wallet_id__in=batch).delete()
+            FuelWalletMonthlyRollup.objects.filter(fuel_wallet_id__in=batch).delete()
+
+            entries = FuelTransaction.objects.filter(fuel_wallet_id__in=batch).order_by()
+            FuelWalletRollup.objects.bulk_create(
+                FuelWalletRollup(**row)
+                for row in entries.values('fuel_wallet_id').annotate(**_totals())
+            )
+            monthly = entries.annotate(month=TruncMonth('created_at', output_field=DateField()))
+            FuelWalletMonthlyRollup.objects.bulk_create(
+                FuelWalletMonthlyRollup(**row)
+                for row in monthly.values('fuel_wallet_id', 'month').annotate(**_totals())
+            )
+    return len(ids)
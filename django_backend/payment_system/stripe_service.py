@@ -2,6 +2,7 @@
 Stripe Payment Service for Tasks 6-10
 Handles Stripe API integration for yacht platform payments
 """
+import hashlib
 import os
 import logging
 from decimal import Decimal
@@ -28,17 +29,22 @@ class StripeService:
             logger.info("Stripe service initialized")
             self.mock_mode = True  # Keep in mock mode until stripe package is installed
     
-    def create_payment_intent(self, amount, currency='usd', description='', metadata=None):
+    def create_payment_intent(self, amount, currency='usd', description='', metadata=None, idempotency_key=None):
         """
         Create Stripe PaymentIntent - Task 6
+        A repeated idempotency_key returns the PaymentIntent first created with it
         Returns: (success: bool, payment_intent_data: dict, error: str)
         """
         try:
             if self.mock_mode:
-                # Mock payment intent for development
+                # Mock payment intent for development; keyed requests get a
+                # distinct id per key, the same one on every retry
+                payment_intent_id = f'pi_mock_{int(amount * 100)}_{currency}'
+                if idempotency_key:
+                    payment_intent_id += f'_{hashlib.md5(idempotency_key.encode()).hexdigest()[:16]}'
                 mock_payment_intent = {
-                    'id': f'pi_mock_{int(amount * 100)}_{currency}',
-                    'client_secret': f'pi_mock_{int(amount * 100)}_{currency}_secret_mock',
+                    'id': payment_intent_id,
+                    'client_secret': f'{payment_intent_id}_secret_mock',
                     'amount': int(amount * 100),  # Stripe uses cents
                     'currency': currency,
                     'status': 'requires_payment_method',
@@ -51,7 +57,7 @@ class StripeService:
                 return True, mock_payment_intent, None
             
             # Real Stripe implementation would go here when package is available
-            # stripe.PaymentIntent.create(...)
+            # stripe.PaymentIntent.create(..., idempotency_key=idempotency_key)
             
         except Exception as e:
             logger.error(f"Error creating payment intent: {e}")
@@ -19,6 +19,7 @@ urlpatterns = [
     # Task 8 - Fuel Wallet (View + History) endpoints
     path('fuel-wallet/', views_task8.get_fuel_wallet, name='get-fuel-wallet'),
     path('fuel-wallet/transactions/', views_task8.get_fuel_transaction_history, name='get-fuel-transaction-history'),
+    path('fuel-wallet/transactions/export/', views_task8.export_fuel_transactions, name='export-fuel-transactions'),
     path('fuel-wallet/consume/', views_task8.simulate_fuel_consumption, name='simulate-fuel-consumption'),
     
     # Task 9 - Stripe PaymentIntent (Fuel Top-Up) endpoints
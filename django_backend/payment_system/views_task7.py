@@ -2,16 +2,17 @@
 Task 7 - Stripe Webhook (Confirm Rental) Views
 Handle Stripe webhook events for payment confirmations
 """
-import json
-from datetime import datetime
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
-from django.utils import timezone
 from django.contrib.auth import get_user_model
 from bookings.models import Booking
-from .models import PaymentIntent, FuelTransaction
+from bookings.locking import boat_booking_lock
+from bookings.occupancy import get_occupancy_index
+from .models import PaymentIntent
+from .ledger import post_entry
 from .stripe_service import stripe_service
+from .webhooks import record_event, schedule_processing
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,7 +24,8 @@ def stripe_webhook(request):
     """
     Task 7 - Handle Stripe webhook events
     POST /webhooks/stripe/
-    Processes payment_intent.succeeded events to confirm rental bookings
+    Stores the event in the webhook inbox and acknowledges it at once; the
+    inbox workers confirm rental bookings and credit fuel top-ups
     """
     try:
         payload = request.body
@@ -36,41 +38,16 @@ def stripe_webhook(request):
             logger.error(f"Webhook signature verification failed: {error}")
             return HttpResponse(status=400)
         
-        event_type = event_data.get('type')
-        logger.info(f"Received webhook event: {event_type}")
-        
-        # Handle payment_intent.succeeded events - Task 7
-        if event_type == 'payment_intent.succeeded':
-            payment_intent_data = event_data['data']['object']
-            payment_intent_id = payment_intent_data['id']
-            
-            success = handle_payment_succeeded(payment_intent_id, payment_intent_data)
-            
-            if success:
-                logger.info(f"Successfully processed payment_intent.succeeded for {payment_intent_id}")
-                return HttpResponse(status=200)
-            else:
-                logger.error(f"Failed to process payment_intent.succeeded for {payment_intent_id}")
-                return HttpResponse(status=500)
-        
-        # Handle payment_intent.payment_failed events
-        elif event_type == 'payment_intent.payment_failed':
-            payment_intent_data = event_data['data']['object']
-            payment_intent_id = payment_intent_data['id']
-            
-            success = handle_payment_failed(payment_intent_id, payment_intent_data)
-            
-            if success:
-                logger.info(f"Successfully processed payment_intent.payment_failed for {payment_intent_id}")
-                return HttpResponse(status=200)
-            else:
-                logger.error(f"Failed to process payment_intent.payment_failed for {payment_intent_id}")
-                return HttpResponse(status=500)
-        
+        # Stripe redelivers until acknowledged, so a repeated event id is
+        # acknowledged again without being queued twice
+        event, created = record_event(event_data, payload)
+        if created:
+            logger.info(f"Queued webhook event {event.event_id}: {event.event_type}")
+            schedule_processing()
         else:
-            # Unhandled event type
-            logger.info(f"Unhandled webhook event type: {event_type}")
-            return HttpResponse(status=200)
+            logger.info(f"Duplicate webhook event {event.event_id} ignored")
+        
+        return HttpResponse(status=200)
         
     except Exception as e:
         logger.error(f"Error processing webhook: {e}")
@@ -79,7 +56,7 @@ def stripe_webhook(request):
 def handle_payment_succeeded(payment_intent_id, payment_intent_data):
     """
     Handle successful payment - Task 7
-    Confirms rental booking and updates status
+    Confirms rental booking and updates status; called by the webhook inbox
     """
     try:
         # Find the payment intent record
@@ -100,10 +77,29 @@ def handle_payment_succeeded(payment_intent_id, payment_intent_data):
             booking = payment_record.booking
             
             # Confirm the rental booking - Task 7 core requirement
-            booking.status = 'confirmed'
-            booking.save()
-            
-            logger.info(f"Rental booking {booking.id} confirmed via payment {payment_intent_id}")
+            # The hold may have lapsed before payment arrived, so confirm only
+            # if nobody has taken the dates since
+            with boat_booking_lock(booking.boat_id):
+                occupancy = get_occupancy_index(booking.boat_id, verify=True)
+                taken = [
+                    o for o in occupancy.conflicts(booking.start_date, booking.end_date)
+                    if not (o.source == 'booking' and o.id == booking.id)
+                ]
+                if taken:
+                    # Recorded on the payment so the refund is not lost once
+                    # the webhook event is marked processed
+                    payment_record.refund_required = True
+                    payment_record.save(update_fields=['refund_required', 'updated_at'])
+                    booking.status = 'cancelled'
+                    booking.hold_expires_at = None
+                    booking.save()
+                    logger.error(f"Rental booking {booking.id} paid via {payment_intent_id} after its hold lapsed and the dates were rebooked; refund required")
+                else:
+                    booking.status = 'confirmed'
+                    booking.hold_expires_at = None
+                    booking.save()
+                    
+                    logger.info(f"Rental booking {booking.id} confirmed via payment {payment_intent_id}")
             
             # Optional: Send confirmation email/SMS (would be implemented in notifications)
             # Optional: Create calendar event
@@ -112,20 +108,13 @@ def handle_payment_succeeded(payment_intent_id, payment_intent_data):
         elif payment_record.payment_type == 'fuel_topup' and payment_record.fuel_wallet:
             fuel_wallet = payment_record.fuel_wallet
             
-            # Add fuel credits
-            balance_before = fuel_wallet.current_balance
-            fuel_wallet.current_balance += payment_record.amount
-            fuel_wallet.total_purchased += payment_record.amount
-            fuel_wallet.save()
-            
-            # Create transaction record
-            FuelTransaction.objects.create(
-                fuel_wallet=fuel_wallet,
+            # Add fuel credits; keyed by payment so webhook retries credit once
+            post_entry(
+                fuel_wallet,
+                'purchase',
+                payment_record.amount,
+                idempotency_key=f"payment:{payment_intent_id}",
                 payment_intent=payment_record,
-                transaction_type='purchase',
-                amount=payment_record.amount,
-                balance_before=balance_before,
-                balance_after=fuel_wallet.current_balance,
                 description=f"Fuel top-up via payment {payment_intent_id}"
             )
             
@@ -208,6 +197,7 @@ def payment_status(request, booking_id):
             'payment_intent_id': latest_payment.stripe_payment_intent_id,
             'amount': str(latest_payment.amount),
             'currency': latest_payment.currency,
+            'refund_required': latest_payment.refund_required,
             'created_at': latest_payment.created_at.isoformat(),
         })
         
@@ -3,19 +3,48 @@ Task 8 - Fuel Wallet (View + History) Views
 API endpoints for fuel wallet management and transaction history
 """
 import json
+from datetime import datetime, time, timedelta
+from django.db.models import Count, Sum
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from decimal import Decimal
 from ownership.models import FuelWallet
-from .models import FuelTransaction
+from .models import FuelTransaction, FuelWalletMonthlyRollup, FuelWalletRollup
+from .ledger import IdempotencyConflict, InsufficientFunds, post_entry
+from yachtak_api.conditional import conditional_on
+from yachtak_api.pagination import InvalidCursor, paginate
+from yachtak_api.serializers import FUEL_TRANSACTION, InvalidFields, json_response, sparse
+from yachtak_api.streaming import stream_rows, streaming_export
 import logging
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+# Months of rollups shown on the wallet screen
+MONTHLY_SUMMARY_MONTHS = 12
+
+def _rollup_totals(rollup):
+    return {
+        'transactions': rollup.transaction_count,
+        'purchased': str(rollup.purchased),
+        'consumed': str(rollup.consumed),
+        'refunded': str(rollup.refunded),
+        'adjusted': str(rollup.adjusted),
+        'engine_hours': str(rollup.engine_hours),
+    }
+
+def _fuel_wallet_scope(request):
+    user_phone = request.GET.get('user_phone', '+201234567890')
+    return [
+        FuelWallet.objects.filter(owner__phone=user_phone),
+        FuelTransaction.objects.filter(fuel_wallet__owner__phone=user_phone),
+    ]
+
 @require_http_methods(["GET"])
+@conditional_on(_fuel_wallet_scope)
 def get_fuel_wallet(request):
     """
     Task 8 - Get fuel wallet details and balance
@@ -33,8 +62,8 @@ def get_fuel_wallet(request):
                 'error': 'User not found'
             }, status=404)
         
-        # Get or create fuel wallet
-        fuel_wallet, created = FuelWallet.objects.get_or_create(
+        # Get or create fuel wallet, with its ledger rollup
+        fuel_wallet, created = FuelWallet.objects.select_related('rollup').get_or_create(
             owner=user,
             defaults={
                 'current_balance': Decimal('0.00'),
@@ -61,22 +90,19 @@ def get_fuel_wallet(request):
                 'balance_after': str(transaction.balance_after),
                 'description': transaction.description,
                 'engine_hours': str(transaction.engine_hours) if transaction.engine_hours else None,
-                'booking_id': transaction.booking.id if transaction.booking else None,
+                'booking_id': transaction.booking_id,
                 'created_at': transaction.created_at.isoformat(),
             })
         
-        # Calculate usage statistics
-        total_transactions = FuelTransaction.objects.filter(fuel_wallet=fuel_wallet).count()
-        
-        consumption_transactions = FuelTransaction.objects.filter(
-            fuel_wallet=fuel_wallet,
-            transaction_type='consumption'
-        )
+        # Usage statistics come from rollups kept current by the ledger
+        try:
+            rollup = fuel_wallet.rollup
+        except FuelWalletRollup.DoesNotExist:
+            rollup = FuelWalletRollup(fuel_wallet=fuel_wallet)
         
-        total_engine_hours = sum(
-            t.engine_hours or Decimal('0') 
-            for t in consumption_transactions
-        )
+        monthly_rollups = FuelWalletMonthlyRollup.objects.filter(
+            fuel_wallet=fuel_wallet
+        ).order_by('-month')[:MONTHLY_SUMMARY_MONTHS]
         
         return JsonResponse({
             'success': True,
@@ -94,10 +120,15 @@ def get_fuel_wallet(request):
                 'updated_at': fuel_wallet.updated_at.isoformat(),
             },
             'transaction_summary': {
-                'total_transactions': total_transactions,
+                'total_transactions': rollup.transaction_count,
                 'recent_transactions_count': len(transactions_data),
-                'total_engine_hours': str(total_engine_hours),
+                'total_engine_hours': str(rollup.engine_hours),
+                'totals_by_type': _rollup_totals(rollup),
             },
+            'monthly_summary': [
+                {'month': monthly.month.strftime('%Y-%m'), **_rollup_totals(monthly)}
+                for monthly in monthly_rollups
+            ],
             'recent_transactions': transactions_data,
         })
         
@@ -108,79 +139,98 @@ def get_fuel_wallet(request):
             'error': 'Failed to get fuel wallet'
         }, status=500)
 
+def _transaction_filters(request):
+    """Filters shared by the transaction history and export"""
+    return {
+        'user_phone': request.GET.get('user_phone'),
+        'wallet_id': request.GET.get('wallet_id'),
+        'transaction_type': request.GET.get('transaction_type'),
+        'since': request.GET.get('since'),
+        'until': request.GET.get('until'),
+    }
+
+def _day_start(value, name):
+    try:
+        day = datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'{name} must be a date (YYYY-MM-DD)')
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+def _filtered_transactions(filters):
+    """
+    Transactions matching filters, each one a condition on an indexed column
+    Dates are inclusive days; until covers the whole day.
+    Raises: ValueError for an unknown type or a malformed date
+    """
+    transactions_query = FuelTransaction.objects.all()
+    if filters['wallet_id']:
+        transactions_query = transactions_query.filter(fuel_wallet_id=filters['wallet_id'])
+    if filters['user_phone']:
+        transactions_query = transactions_query.filter(
+            fuel_wallet_id__in=FuelWallet.objects.filter(owner__phone=filters['user_phone']).values('id')
+        )
+    if filters['transaction_type']:
+        if filters['transaction_type'] not in dict(FuelTransaction.TRANSACTION_TYPE_CHOICES):
+            raise ValueError(f"Unknown transaction_type: {filters['transaction_type']}")
+        transactions_query = transactions_query.filter(transaction_type=filters['transaction_type'])
+    if filters['since']:
+        transactions_query = transactions_query.filter(created_at__gte=_day_start(filters['since'], 'since'))
+    if filters['until']:
+        until = _day_start(filters['until'], 'until') + timedelta(days=1)
+        transactions_query = transactions_query.filter(created_at__lt=until)
+    return transactions_query
+
 @require_http_methods(["GET"])
 def get_fuel_transaction_history(request):
     """
     Get complete fuel transaction history
-    GET /fuel-wallet/transactions/?user_phone=+1234567890&limit=50&transaction_type=purchase
+    GET /fuel-wallet/transactions/?user_phone=+1234567890&limit=50&cursor=...&transaction_type=purchase&since=2025-01-01&until=2025-12-31
+    Returns: One page of transactions, newest first; pass pagination.next_cursor for the next page
     """
     try:
-        user_phone = request.GET.get('user_phone', '+201234567890')
-        limit = int(request.GET.get('limit', 50))
-        transaction_type = request.GET.get('transaction_type')  # Optional filter
+        filters = _transaction_filters(request)
+        filters['user_phone'] = filters['user_phone'] or '+201234567890'  # Demo mode
         
         try:
-            user = User.objects.get(phone=user_phone)
-            fuel_wallet = FuelWallet.objects.get(owner=user)
-        except (User.DoesNotExist, FuelWallet.DoesNotExist):
+            fuel_wallet = FuelWallet.objects.get(owner__phone=filters['user_phone'])
+        except FuelWallet.DoesNotExist:
             return JsonResponse({
                 'success': False,
                 'error': 'User or fuel wallet not found'
             }, status=404)
         
-        # Build query
-        transactions_query = FuelTransaction.objects.filter(fuel_wallet=fuel_wallet)
-        
-        if transaction_type:
-            transactions_query = transactions_query.filter(transaction_type=transaction_type)
-        
-        transactions = transactions_query.order_by('-created_at')[:limit]
-        
-        transactions_data = []
-        for transaction in transactions:
-            transactions_data.append({
-                'id': transaction.id,
-                'transaction_type': transaction.transaction_type,
-                'amount': str(transaction.amount),
-                'balance_before': str(transaction.balance_before),
-                'balance_after': str(transaction.balance_after),
-                'description': transaction.description,
-                'engine_hours': str(transaction.engine_hours) if transaction.engine_hours else None,
-                'booking': {
-                    'id': transaction.booking.id,
-                    'boat_name': f"{transaction.booking.boat.model} {transaction.booking.boat.name}",
-                    'start_date': transaction.booking.start_date.isoformat(),
-                } if transaction.booking else None,
-                'payment_intent_id': transaction.payment_intent.stripe_payment_intent_id if transaction.payment_intent else None,
-                'created_at': transaction.created_at.isoformat(),
-            })
-        
-        # Calculate filtered summary
-        filtered_count = transactions_query.count()
-        filtered_total = sum(
-            transaction.amount 
-            for transaction in transactions_query
+        filters['wallet_id'] = fuel_wallet.id
+        transactions_query = _filtered_transactions({**filters, 'user_phone': None})
+        plan, _ = sparse(FUEL_TRANSACTION, request)
+        transactions, page = paginate(
+            plan.values(transactions_query, 'created_at', 'id'), request, ('-created_at', '-id')
         )
+        transactions_data = [plan.from_values(row) for row in transactions]
         
-        return JsonResponse({
+        # Summary of everything matching the filters, not just this page
+        summary = transactions_query.order_by().aggregate(count=Count('id'), total=Sum('amount'))
+        
+        return json_response({
             'success': True,
             'transactions': transactions_data,
             'summary': {
-                'total_transactions': filtered_count,
+                'total_transactions': summary['count'],
                 'returned_transactions': len(transactions_data),
-                'total_amount': str(filtered_total),
-                'filter_applied': transaction_type,
+                'total_amount': str((summary['total'] or Decimal('0')).quantize(Decimal('0.01'))),
+                'filter_applied': filters['transaction_type'],
             },
+            'filters': filters,
+            'pagination': page,
             'fuel_wallet': {
                 'current_balance': str(fuel_wallet.current_balance),
                 'is_low_balance': fuel_wallet.is_low_balance,
             }
         })
         
-    except ValueError:
+    except (InvalidCursor, InvalidFields, ValueError) as e:
         return JsonResponse({
             'success': False,
-            'error': 'Invalid limit parameter'
+            'error': str(e)
         }, status=400)
     except Exception as e:
         logger.error(f"Error getting transaction history: {e}")
@@ -189,6 +239,33 @@ def get_fuel_transaction_history(request):
             'error': 'Failed to get transaction history'
         }, status=500)
 
+@require_http_methods(["GET"])
+def export_fuel_transactions(request):
+    """
+    Export every fuel transaction matching the filters in one streamed response
+    GET /fuel-wallet/transactions/export/?user_phone=+1234567890&wallet_id=1&transaction_type=consumption&since=2025-01-01&until=2025-12-31&format=csv|json|ndjson&fields=...
+    Without user_phone or wallet_id every wallet is exported. Rows are read
+    and written a chunk at a time, so memory stays flat however many match.
+    """
+    try:
+        filters = _transaction_filters(request)
+        plan, _ = sparse(FUEL_TRANSACTION, request)
+        transactions_query = plan.values(_filtered_transactions(filters)).order_by('-created_at', '-id')
+        return streaming_export(
+            request, 'transactions', stream_rows(transactions_query, plan.from_values),
+            meta={'filters': filters}, filename='fuel_transactions', csv_columns=plan.flat_keys(),
+        )
+        
+    except ValueError as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
+    except Exception as e:
+        logger.error(f"Error exporting fuel transactions: {e}")
+        return JsonResponse({
+            'error': 'Failed to export fuel transactions'
+        }, status=500)
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def simulate_fuel_consumption(request):
@@ -219,13 +296,6 @@ def simulate_fuel_consumption(request):
                 'error': 'User or fuel wallet not found'
             }, status=404)
         
-        # Check sufficient balance
-        if fuel_wallet.current_balance < amount:
-            return JsonResponse({
-                'success': False,
-                'error': f'Insufficient fuel balance. Current: ${fuel_wallet.current_balance}, Required: ${amount}'
-            }, status=400)
-        
         # Get booking if provided
         booking = None
         if booking_id:
@@ -235,22 +305,28 @@ def simulate_fuel_consumption(request):
             except Booking.DoesNotExist:
                 pass
         
-        # Create consumption transaction
-        balance_before = fuel_wallet.current_balance
-        fuel_wallet.current_balance -= amount
-        fuel_wallet.total_consumed += amount
-        fuel_wallet.save()
-        
-        transaction = FuelTransaction.objects.create(
-            fuel_wallet=fuel_wallet,
-            booking=booking,
-            transaction_type='consumption',
-            amount=amount,
-            balance_before=balance_before,
-            balance_after=fuel_wallet.current_balance,
-            engine_hours=engine_hours,
-            description=f"Fuel consumption: {engine_hours} engine hours" + (f" for booking {booking_id}" if booking else "")
-        )
+        # Create consumption transaction; the balance check happens in the
+        # same statement that debits the wallet
+        try:
+            transaction = post_entry(
+                fuel_wallet,
+                'consumption',
+                amount,
+                idempotency_key=data.get('idempotency_key') or request.headers.get('Idempotency-Key'),
+                booking=booking,
+                engine_hours=engine_hours,
+                description=f"Fuel consumption: {engine_hours} engine hours" + (f" for booking {booking_id}" if booking else "")
+            )
+        except InsufficientFunds as e:
+            return JsonResponse({
+                'success': False,
+                'error': f'Insufficient fuel balance. Current: ${e.balance}, Required: ${amount}'
+            }, status=400)
+        except IdempotencyConflict as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            }, status=409)
         
         logger.info(f"Fuel consumption recorded: ${amount} for {engine_hours} hours")
         
@@ -9,6 +9,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import get_user_model
 from decimal import Decimal
 from ownership.models import FuelWallet
+from .autotopup import in_flight_topups
 from .models import PaymentIntent
 from .stripe_service import stripe_service
 import logging
@@ -171,6 +172,17 @@ def auto_topup_fuel(request):
                 'threshold': str(fuel_wallet.low_balance_threshold),
             })
         
+        # One auto top-up at a time: hand back the one awaiting payment
+        in_flight = in_flight_topups().filter(fuel_wallet=fuel_wallet).order_by('-created_at').first()
+        if in_flight:
+            return JsonResponse({
+                'success': True,
+                'message': 'Auto top-up already in progress',
+                'payment_intent_id': in_flight.stripe_payment_intent_id,
+                'client_secret': in_flight.stripe_client_secret,
+                'amount': float(in_flight.amount),
+            })
+        
         # Create payment intent for auto top-up amount
         topup_amount = fuel_wallet.auto_topup_amount
         
@@ -188,7 +200,8 @@ def auto_topup_fuel(request):
             amount=float(topup_amount),
             currency='usd',
             description=description,
-            metadata=metadata
+            metadata=metadata,
+            idempotency_key=f"auto-topup:{fuel_wallet.id}:{fuel_wallet.updated_at.isoformat()}"
         )
         
         if not success:
@@ -0,0 +1,240 @@
+"""
+Stripe Webhook Inbox
+Durable receipt of webhook events and a worker pool that applies them in order per PaymentIntent
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Exists, Max, OuterRef
+from django.utils import timezone
+from .models import StripeWebhookEvent
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Pending events claimed per dispatch round
+INBOX_BATCH_SIZE = 500
+
+# Attempts before an event is parked as failed for manual replay
+MAX_ATTEMPTS = 5
+
+# A claim older than this belongs to a dispatcher that died mid-event
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def _handlers():
+    # The handlers live with the webhook view, which imports this module
+    from .views_task7 import handle_payment_failed, handle_payment_succeeded
+    return {
+        'payment_intent.succeeded': handle_payment_succeeded,
+        'payment_intent.payment_failed': handle_payment_failed,
+    }
+
+
+def record_event(event, payload):
+    """
+    Store a verified webhook event unless its id was stored before
+    Events without an id (hand-written mock deliveries) are keyed by a hash
+    of the raw payload, so an identical redelivery is still recognized.
+    Returns: (event, created)
+    """
+    event_id = event.get('id') or f'evt_payload_{hashlib.sha256(payload).hexdigest()[:32]}'
+    data_object = (event.get('data') or {}).get('object') or {}
+    payment_intent_id = data_object.get('id', '') if event.get('type', '').startswith('payment_intent.') else ''
+    try:
+        with transaction.atomic():
+            return StripeWebhookEvent.objects.create(
+                event_id=event_id,
+                event_type=event.get('type', ''),
+                payment_intent_id=payment_intent_id or data_object.get('payment_intent') or '',
+                stripe_created=event.get('created') or 0,
+                payload=event,
+            ), True
+    except IntegrityError:
+        return StripeWebhookEvent.objects.get(event_id=event_id), False
+
+
+def _apply(event):
+    """Run the handler for one event; returns (status, error)"""
+    handler = _handlers().get(event.event_type)
+    if handler is None:
+        return 'skipped', 'Unhandled event type'
+    data_object = event.payload['data']['object']
+    if handler(data_object['id'], data_object):
+        return 'processed', ''
+    return 'pending' if event.attempts + 1 < MAX_ATTEMPTS else 'failed', 'Handler reported failure'
+
+
+def _claim(events):
+    """
+    Mark a stream's events as being processed by this worker, in one UPDATE
+    Claims nothing while another dispatcher is still processing an event
+    for the same PaymentIntent. If another dispatcher claimed part of the
+    stream first, the part this one got is handed back.
+    Returns: whether every event was claimed
+    """
+    ids = [event.pk for event in events]
+    claimed_at = timezone.now()
+    claimable = StripeWebhookEvent.objects.filter(pk__in=ids, status='pending')
+    if events[0].payment_intent_id:
+        # SQLite evaluates the subquery per row, after earlier rows of this
+        # same UPDATE changed, so the stream's own events are left out
+        busy = StripeWebhookEvent.objects.filter(
+            payment_intent_id=OuterRef('payment_intent_id'), status='processing',
+        ).exclude(pk__in=ids)
+        claimable = claimable.filter(~Exists(busy))
+    claimed = claimable.update(status='processing', claimed_at=claimed_at)
+    if claimed == len(ids):
+        return True
+    if claimed:
+        _release(ids, claimed_at)
+    return False
+
+
+def _release(ids, claimed_at=None):
+    """Return claimed events that were not processed to the queue"""
+    claims = StripeWebhookEvent.objects.filter(pk__in=ids, status='processing')
+    if claimed_at is not None:
+        claims = claims.filter(claimed_at=claimed_at)
+    claims.update(status='pending', claimed_at=None)
+
+
+def _finish(event, status, error):
+    StripeWebhookEvent.objects.filter(pk=event.pk).update(
+        status=status, attempts=event.attempts + 1, last_error=error,
+        processed_at=timezone.now() if status in ('processed', 'skipped') else None,
+    )
+
+
+def _process_stream(events):
+    """
+    Apply one PaymentIntent's events in Stripe creation order
+    An event older than one already applied for the same PaymentIntent is
+    skipped, so a late payment_failed cannot undo a processed success. The
+    stream stops at the first failure, or if it cannot be claimed; later
+    events wait for the next process_pending run.
+    Returns: (events applied, whether the stream stopped early)
+    """
+    try:
+        if not _claim(events):
+            return 0, True
+        applied = 0
+        latest = None
+        if events[0].payment_intent_id:
+            latest = StripeWebhookEvent.objects.filter(
+                payment_intent_id=events[0].payment_intent_id, status='processed',
+            ).aggregate(latest=Max('stripe_created'))['latest']
+        for position, event in enumerate(events):
+            # Handlers commit their own writes; a crash before the status is
+            # saved reruns the event, and the handlers are safe to rerun
+            if latest is not None and event.stripe_created < latest:
+                status, error = 'skipped', 'Superseded by a newer event for the PaymentIntent'
+            else:
+                try:
+                    status, error = _apply(event)
+                except Exception as e:
+                    status = 'pending' if event.attempts + 1 < MAX_ATTEMPTS else 'failed'
+                    error = str(e)
+            _finish(event, status, error)
+            if status == 'processed':
+                applied += 1
+                latest = max(latest or 0, event.stripe_created)
+            elif status != 'skipped':
+                logger.error(f"Webhook event {event.event_id} ({event.event_type}) failed: {error}")
+                _release([later.pk for later in events[position + 1:]])
+                return applied, True
+        return applied, False
+    finally:
+        connection.close()
+
+
+def _stream_key(event):
+    return event.payment_intent_id or event.event_id
+
+
+def _streams(events, blocked):
+    """Events grouped by PaymentIntent, each group in Stripe creation order"""
+    streams = OrderedDict()
+    for event in events:
+        if _stream_key(event) not in blocked:
+            streams.setdefault(_stream_key(event), []).append(event)
+    for stream in streams.values():
+        stream.sort(key=lambda event: (event.stripe_created, event.id))
+    return list(streams.values())
+
+
+def process_pending(workers=None, batch_size=INBOX_BATCH_SIZE):
+    """
+    Apply every pending inbox event
+    Each round reads a batch of pending events in arrival order and hands
+    each PaymentIntent's events to one worker thread, which applies them in
+    order; streams for different PaymentIntents run in parallel. A round
+    ends before the next is read, and events are claimed one at a time, so
+    several dispatchers (one per web worker, say) can drain the same inbox.
+    A PaymentIntent whose stream stopped early gets no further events until
+    the next run, which retries from its oldest pending event.
+    Returns: number of events applied
+    """
+    workers = workers or settings.STRIPE_WEBHOOK_WORKERS
+    StripeWebhookEvent.objects.filter(
+        status='processing', claimed_at__lt=timezone.now() - CLAIM_TIMEOUT,
+    ).update(status='pending')
+    applied = 0
+    blocked = set()
+    last_id = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            events = list(StripeWebhookEvent.objects.filter(status='pending', id__gt=last_id).order_by('id')[:batch_size])
+            if not events:
+                break
+            last_id = events[-1].id
+            streams = _streams(events, blocked)
+            for stream, (stream_applied, stopped) in zip(streams, executor.map(_process_stream, streams)):
+                applied += stream_applied
+                if stopped:
+                    blocked.add(_stream_key(stream[0]))
+    return applied
+
+
+class InboxDrainer:
+    """
+    Background thread that drains the inbox after events arrive
+    wake() is cheap and safe to call from request threads; deliveries that
+    arrive during a drain trigger another pass.
+    """
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def wake(self):
+        self._wake.set()
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='stripe-webhook-inbox', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        try:
+            while self._wake.wait(timeout=60):
+                self._wake.clear()
+                try:
+                    process_pending()
+                except Exception as e:
+                    logger.error(f"Error draining webhook inbox: {e}")
+        finally:
+            connection.close()
+
+
+_drainer = InboxDrainer()
+
+
+def schedule_processing():
+    """Drain the inbox in the background once the current transaction commits"""
+    if settings.STRIPE_WEBHOOK_PROCESS_IN_BACKGROUND:
+        transaction.on_commit(_drainer.wake)
@@ -0,0 +1,174 @@
+"""
+Response Caching
+Declarative per-view cache policies with tag invalidation and hit/miss metrics
+"""
+import hashlib
+import threading
+import uuid
+from collections import Counter
+from functools import wraps
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.http import HttpResponse
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Counters for this process: hits, misses, stores and errors per policy,
+# and invalidations per tag family ('boat' for 'boat:12')
+_metrics = {}
+_invalidations = Counter()
+_metrics_lock = threading.Lock()
+
+
+def _count(name, event):
+    with _metrics_lock:
+        _metrics.setdefault(name, Counter())[event] += 1
+
+
+def cache_metrics():
+    """Hit, miss, store and error counts with the hit ratio per policy, and tag invalidations"""
+    with _metrics_lock:
+        policies = {name: dict(counts) for name, counts in _metrics.items()}
+        invalidations = dict(_invalidations)
+    for counts in policies.values():
+        lookups = counts.get('hits', 0) + counts.get('misses', 0)
+        counts['hit_ratio'] = round(counts.get('hits', 0) / lookups, 3) if lookups else None
+    return {'policies': policies, 'invalidations': invalidations}
+
+
+def reset_cache_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+        _invalidations.clear()
+
+
+def _tag_key(tag):
+    return f'tag:{tag}'
+
+
+def _new_version():
+    # Random rather than a counter: a tag evicted from the cache must not
+    # come back at a version some old response was stored under
+    return uuid.uuid4().hex
+
+
+def _tag_versions(cache, tags):
+    keys = [_tag_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def invalidate_tags(*tags, alias='default'):
+    """Retire every response cached under any of tags"""
+    try:
+        caches[alias].set_many({_tag_key(tag): _new_version() for tag in tags}, timeout=None)
+    except Exception as e:
+        logger.warning(f"Failed to invalidate cache tags {tags}: {e}")
+        return
+    with _metrics_lock:
+        _invalidations.update(tag.split(':')[0] for tag in tags)
+
+
+def invalidate_on(model, *tags, alias='default'):
+    """
+    Invalidate tags whenever a row of model is saved or deleted
+    Tags are formatted with the instance's attributes, so 'boat:{boat_id}'
+    on Booking retires the cached responses of the booked boat only.
+    """
+    def handler(sender, instance, **kwargs):
+        names = [tag.format(**instance.__dict__) for tag in tags]
+        invalidate_tags(*names, alias=alias)
+        # Again after commit: a request that read the old rows while the
+        # transaction was open may have stored them under the new version
+        transaction.on_commit(lambda: invalidate_tags(*names, alias=alias))
+
+    uid = f'cache:{model._meta.label}:{",".join(tags)}'
+    post_save.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+
+
+def request_fingerprint(request, vary, *extra):
+    """Digest of the path, today's date and the vary query parameters of a request"""
+    parts = [request.path, timezone.localdate().isoformat()]
+    parts.extend(f'{param}={",".join(request.GET.getlist(param))}' for param in sorted(vary))
+    parts.extend(str(value) for value in extra)
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+class CachePolicy:
+    """
+    How the responses of one view are cached
+    name labels keys and metrics, and ttl is in seconds. vary lists the
+    query parameters the response depends on; any others are left out of
+    the key, so tracking parameters do not split the cache. tags are
+    formatted with the view's URL kwargs, e.g. 'boat:{boat_id}'.
+    """
+
+    def __init__(self, name, ttl, vary=(), tags=(), alias='default'):
+        self.name = name
+        self.ttl = ttl
+        self.vary = tuple(sorted(vary))
+        self.tags = tuple(tags)
+        self.alias = alias
+
+    def key(self, cache, request, kwargs):
+        """
+        Cache key for a request
+        The current tag versions are part of the key, so a response computed
+        while a tag is bumped is stored where no later request will look.
+        """
+        tags = [tag.format(**kwargs) for tag in self.tags]
+        return f'view:{self.name}:{request_fingerprint(request, self.vary, *_tag_versions(cache, tags))}'
+
+
+def cached(policy):
+    """
+    Serve a GET view from the cache according to policy
+    Only 200 responses with a body in memory are stored. When the cache
+    backend is unreachable the view runs uncached.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            try:
+                cache = caches[policy.alias]
+                key = policy.key(cache, request, kwargs)
+                entry = cache.get(key)
+            except Exception as e:
+                logger.warning(f"Cache unavailable for {policy.name}: {e}")
+                _count(policy.name, 'errors')
+                return view(request, *args, **kwargs)
+
+            if entry is not None:
+                _count(policy.name, 'hits')
+                status, content_type, content = entry
+                response = HttpResponse(content, status=status, content_type=content_type)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            _count(policy.name, 'misses')
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                try:
+                    cache.set(key, (response.status_code, response['Content-Type'], response.content), policy.ttl)
+                    _count(policy.name, 'stores')
+                except Exception as e:
+                    logger.warning(f"Failed to cache {policy.name}: {e}")
+                    _count(policy.name, 'errors')
+            response['X-Cache'] = 'MISS'
+            return response
+
+        wrapper.cache_policy = policy
+        return wrapper
+
+    return decorator
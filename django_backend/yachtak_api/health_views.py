@@ -4,6 +4,7 @@ Comprehensive system health monitoring endpoints
 """
 from django.http import JsonResponse
 from django.db import connection
+from django.core.cache import cache
 from django.contrib.auth import get_user_model
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
@@ -17,6 +18,8 @@ from ownership.models import FractionalOwnership, FuelWallet
 from payment_system.models import PaymentIntent
 from inquiries.models import Inquiry, LeadSource
 from notify_system.models import Notification, NotificationTemplate
+from .caching import cache_metrics
+from .singleflight import single_flight_metrics
 
 User = get_user_model()
 
@@ -345,4 +348,33 @@ def api_status(request):
             'timestamp': timezone.now().isoformat(),
             'error': str(e),
             'message': 'API status check failed'
-        }, status=500)
\ No newline at end of file
+        }, status=500)
+
+@require_http_methods(["GET"])
+def cache_health(request):
+    """Cache backend round trip and per-policy hit/miss metrics for this worker"""
+    backend = type(cache).__name__
+    try:
+        start_time = time.time()
+        cache.set('health:probe', 'ok', 10)
+        if cache.get('health:probe') != 'ok':
+            raise RuntimeError('probe value was not read back')
+        
+        return JsonResponse({
+            'status': 'healthy',
+            'timestamp': timezone.now().isoformat(),
+            'backend': backend,
+            'response_time_ms': round((time.time() - start_time) * 1000, 2),
+            'metrics': cache_metrics(),
+            'single_flight': single_flight_metrics(),
+        })
+    
+    except Exception as e:
+        return JsonResponse({
+            'status': 'unhealthy',
+            'timestamp': timezone.now().isoformat(),
+            'backend': backend,
+            'error': str(e),
+            'metrics': cache_metrics(),
+            'single_flight': single_flight_metrics(),
+        }, status=503)
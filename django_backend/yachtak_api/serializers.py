@@ -0,0 +1,397 @@
+"""
+Response Serializers
+Precompiled field plans shared by every view that returns bookings, boats, owners or wallets
+"""
+from operator import attrgetter
+from types import SimpleNamespace
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.http import HttpResponse
+from boats.models import Boat
+from bookings.models import Booking
+from inquiries.models import Inquiry
+from notify_system.models import Notification
+from ownership.models import FractionalOwnership, FuelWallet
+from payment_system.models import FuelTransaction, PaymentIntent
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = DjangoJSONEncoder(separators=(',', ':'))
+
+# Distinct ?fields= selections remembered per plan; clients choose the
+# selection, so the memo is bounded
+MAX_SELECTIONS_PER_PLAN = 128
+
+
+class InvalidFields(ValueError):
+    """Raised for a ?fields= entry the endpoint cannot return"""
+
+
+def dumps(data):
+    """Encode data as JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_encoder.default)
+    return _encoder.encode(data).encode()
+
+
+def json_response(data, status=200):
+    """JsonResponse equivalent that encodes through dumps()"""
+    return HttpResponse(dumps(data), content_type='application/json', status=status)
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def _decimal(value):
+    return str(value) if value is not None else None
+
+
+def _coerce(value):
+    """Converter for computed values, whose type is only known at runtime"""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, (int, float, bool, str)) or value is None:
+        return value
+    return str(value)
+
+
+def _converter(field):
+    if isinstance(field, (models.DateField, models.TimeField)):
+        # DateTimeField subclasses DateField
+        return _isoformat
+    if isinstance(field, models.DecimalField):
+        return _decimal
+    return None
+
+
+class Prop:
+    """
+    A model property in a plan, with the fields it is computed from
+    Declaring the inputs lets the .values() path evaluate the property's own
+    getter against plain column values without building the model.
+    """
+
+    def __init__(self, name, *requires):
+        self.name = name
+        self.requires = requires
+
+
+class FieldPlan:
+    """
+    Field list for one model, resolved to getters and converters once
+    Entries are a field name, a Prop, (key, field_name) to rename, or
+    (key, FieldPlan) to nest a foreign key. Unknown names fail when the plan
+    is built, not on the first request.
+    """
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = tuple(fields)
+        self._steps = []
+        self._selections = {}
+        self.related = []
+        self.only = []
+        self.columns = []
+        self._value_steps = self._compile(self.columns, '')
+
+        for key, source, kind, extra in self._resolved():
+            if kind == 'nested':
+                self._steps.append((key, attrgetter(source), extra.serialize_nullable))
+                self.related.append(source)
+                self.related.extend(f'{source}__{path}' for path in extra.related)
+                self.only.append(source)
+                self.only.extend(f'{source}__{path}' for path in extra.only)
+            elif kind == 'prop':
+                self._steps.append((key, attrgetter(source), _coerce))
+                self.only.extend(name for name in extra.requires if name not in self.only)
+            else:
+                self._steps.append((key, attrgetter(source), extra))
+                if source not in self.only:
+                    self.only.append(source)
+
+    def _resolved(self):
+        """(key, source, kind, extra) for each entry"""
+        for spec in self.fields:
+            if isinstance(spec, Prop):
+                prop = getattr(self.model, spec.name, None)
+                if not isinstance(prop, property):
+                    raise ValueError(f"{self.model.__name__}.{spec.name} is not a property")
+                for name in spec.requires:
+                    self.model._meta.get_field(name)
+                yield spec.name, spec.name, 'prop', spec
+                continue
+
+            key, source = spec if isinstance(spec, tuple) else (spec, spec)
+            if isinstance(source, FieldPlan):
+                field = self.model._meta.get_field(key)
+                if not field.many_to_one and not field.one_to_one:
+                    raise ValueError(f"{self.model.__name__}.{key} is not a foreign key")
+                yield key, key, 'nested', source
+            else:
+                yield key, source, 'field', _converter(self.model._meta.get_field(source))
+
+    def _compile(self, columns, prefix):
+        """Steps that build an output dict from a .values() row keyed by column"""
+        steps = []
+        for key, source, kind, extra in self._resolved():
+            if kind == 'nested':
+                # The foreign key column tells a null relation from an empty one
+                if prefix + source not in columns:
+                    columns.append(prefix + source)
+                nested = extra._compile(columns, f'{prefix}{source}__')
+                steps.append((key, 'nested', prefix + source, nested))
+            elif kind == 'prop':
+                getter = getattr(self.model, source).fget
+                names = [(name, prefix + name) for name in extra.requires]
+                for _, column in names:
+                    if column not in columns:
+                        columns.append(column)
+                steps.append((key, 'prop', getter, names))
+            else:
+                if prefix + source not in columns:
+                    columns.append(prefix + source)
+                steps.append((key, 'field', prefix + source, extra))
+        return steps
+
+    def serialize(self, obj):
+        """Dict for one model instance"""
+        data = {}
+        for key, getter, convert in self._steps:
+            value = getter(obj)
+            data[key] = value if convert is None else convert(value)
+        return data
+
+    def serialize_nullable(self, obj):
+        return self.serialize(obj) if obj is not None else None
+
+    def serialize_many(self, objs):
+        return [self.serialize(obj) for obj in objs]
+
+    def from_values(self, row):
+        """Dict for one row of queryset.values(*plan.columns)"""
+        return _build(self._value_steps, row)
+
+    def values(self, queryset, *extra):
+        """
+        queryset narrowed to the columns this plan reads, rows as dicts
+        extra names further columns to fetch, such as pagination keys.
+        """
+        columns = self.columns + [name for name in extra if name not in self.columns]
+        return queryset.values(*(columns or ['pk']))
+
+    def load(self, queryset, *extra):
+        """
+        queryset with select_related and only() set up for serialize()
+        extra names further fields to load, as for values().
+        """
+        if self.related:
+            queryset = queryset.select_related(*self.related)
+        return queryset.only(*(self.only + [name for name in extra if name not in self.only] or ['pk']))
+
+    def serialize_queryset(self, queryset, chunk_size=None):
+        """
+        Serialize a queryset without instantiating models
+        Reads only the plan's columns in one query, joins included.
+        chunk_size streams the rows through iterator() instead of a list.
+        """
+        rows = self.values(queryset)
+        if chunk_size:
+            return (self.from_values(row) for row in rows.iterator(chunk_size=chunk_size))
+        return [self.from_values(row) for row in rows]
+
+    def flat_keys(self, prefix=''):
+        """Dotted key of every value in the output, nested plans flattened, for CSV headers"""
+        keys = []
+        for key, _, kind, extra in self._resolved():
+            if kind == 'nested':
+                keys.extend(extra.flat_keys(f'{prefix}{key}.'))
+            else:
+                keys.append(prefix + key)
+        return keys
+
+    def extend(self, *fields):
+        """
+        New plan with fields added
+        An entry whose key is already in the plan replaces it in place.
+        """
+        added = {_spec_key(spec): spec for spec in fields}
+        merged = [added.pop(_spec_key(spec), spec) for spec in self.fields]
+        return FieldPlan(self.model, merged + list(added.values()))
+
+    def without(self, *keys):
+        """New plan with the given keys left out"""
+        return FieldPlan(self.model, [spec for spec in self.fields if _spec_key(spec) not in keys])
+
+    def select(self, keys):
+        """
+        Plan limited to keys, in this plan's order
+        'boat.name' keeps just that field of a nested plan; 'boat' keeps
+        all of it.
+        Raises: InvalidFields for a key the plan does not have
+        """
+        selection = tuple(keys)
+        plan = self._selections.get(selection)
+        if plan is not None:
+            return plan
+
+        wanted = {}
+        for key in selection:
+            head, _, rest = key.partition('.')
+            if head not in wanted:
+                wanted[head] = set()
+            if wanted[head] is not None:
+                wanted[head] = None if not rest else wanted[head] | {rest}
+
+        specs = []
+        for spec in self.fields:
+            key = _spec_key(spec)
+            if key not in wanted:
+                continue
+            nested = wanted.pop(key)
+            if nested is not None:
+                if not (isinstance(spec, tuple) and isinstance(spec[1], FieldPlan)):
+                    raise InvalidFields(f"'{key}' has no sub-fields")
+                spec = (key, spec[1].select(sorted(nested)))
+            specs.append(spec)
+        if wanted:
+            raise InvalidFields(f"Unknown field: {sorted(wanted)[0]}")
+
+        plan = FieldPlan(self.model, specs)
+        if len(self._selections) >= MAX_SELECTIONS_PER_PLAN:
+            self._selections.clear()
+        self._selections[selection] = plan
+        return plan
+
+
+def requested_fields(request):
+    """
+    Keys named in ?fields=, or None when every field is wanted
+    Raises: InvalidFields for an empty list
+    """
+    raw = request.GET.get('fields')
+    if raw is None:
+        return None
+    keys = [key.strip() for key in raw.split(',') if key.strip()]
+    if not keys:
+        raise InvalidFields('fields must name at least one field')
+    return keys
+
+
+def sparse(plan, request, extra=()):
+    """
+    Plan for the ?fields= of a request, plus which extra keys were asked for
+    extra lists keys a view adds itself on top of the plan, such as a
+    boat's features.
+    Returns: (plan, set of requested extra keys)
+    """
+    keys = requested_fields(request)
+    if keys is None:
+        return plan, set(extra)
+    extras = {key for key in keys if key in extra}
+    return plan.select([key for key in keys if key not in extras]), extras
+
+
+def _spec_key(spec):
+    if isinstance(spec, Prop):
+        return spec.name
+    return spec[0] if isinstance(spec, tuple) else spec
+
+
+def _build(steps, row):
+    data = {}
+    for key, kind, source, extra in steps:
+        if kind == 'field':
+            value = row[source]
+            data[key] = value if extra is None else extra(value)
+        elif kind == 'nested':
+            data[key] = _build(extra, row) if row[source] is not None else None
+        else:
+            inputs = SimpleNamespace(**{name: row[column] for name, column in extra})
+            data[key] = _coerce(source(inputs))
+    return data
+
+
+# Shared plans
+
+User = get_user_model()
+
+BOAT_SUMMARY = FieldPlan(Boat, ['id', 'name', 'model', 'location'])
+
+BOAT = FieldPlan(Boat, [
+    'id', 'name', 'model', 'capacity', 'location', 'allow_public_rental',
+    'daily_rate', 'length', 'description', 'image_url',
+])
+
+BOAT_DETAIL = BOAT.extend('beam', 'created_at', 'updated_at')
+
+USER_SUMMARY = FieldPlan(User, ['phone', 'first_name', 'last_name'])
+
+BOOKING = FieldPlan(Booking, [
+    'id', ('boat', BOAT_SUMMARY), 'booking_type', 'status', 'start_date', 'end_date',
+    'guest_count', 'total_amount', Prop('duration_days', 'start_date', 'end_date'),
+    'notes', 'created_at',
+])
+
+RENTAL_BOOKING = BOOKING.extend(('boat', BOAT_SUMMARY.extend('daily_rate')), 'hold_expires_at')
+
+USER_BOOKING = BOOKING.extend('start_time', 'end_time')
+
+BOOKING_LIST = USER_BOOKING.extend(('user', USER_SUMMARY))
+
+BOOKING_DETAIL = BOOKING_LIST.extend(
+    ('boat', BOAT_SUMMARY.extend('daily_rate')),
+    ('user', USER_SUMMARY.extend('email')),
+    'updated_at',
+)
+
+OWNERSHIP = FieldPlan(FractionalOwnership, [
+    'id', ('boat', BOAT_SUMMARY), ('owner', USER_SUMMARY), 'share_percentage', 'is_active',
+    'annual_day_limit', 'annual_hour_limit', 'current_year_days_used', 'current_year_hours_used',
+    Prop('remaining_days', 'annual_day_limit', 'current_year_days_used'),
+    Prop('remaining_hours', 'annual_hour_limit', 'current_year_hours_used'),
+    'purchase_price', 'created_at',
+])
+
+OWNER_OWNERSHIP = OWNERSHIP.without('owner')
+
+OWNERSHIP_DETAIL = OWNERSHIP.extend(
+    ('boat', BOAT_SUMMARY.extend('daily_rate')),
+    ('owner', USER_SUMMARY.extend('email')),
+    'updated_at',
+)
+
+FUEL_WALLET = FieldPlan(FuelWallet, [
+    'id', ('owner', USER_SUMMARY), 'current_balance', 'total_purchased', 'total_consumed',
+    'low_balance_threshold', 'auto_topup_enabled', 'auto_topup_amount',
+    Prop('is_low_balance', 'current_balance', 'low_balance_threshold'), 'created_at',
+    ('last_transaction', 'updated_at'),
+])
+
+FUEL_WALLET_DETAIL = FUEL_WALLET.without('last_transaction').extend(
+    ('owner', USER_SUMMARY.extend('email')), 'updated_at',
+)
+
+FUEL_TRANSACTION = FieldPlan(FuelTransaction, [
+    'id', ('fuel_wallet', FieldPlan(FuelWallet, ['id', ('owner', FieldPlan(User, ['phone']))])),
+    'transaction_type', 'amount', 'balance_before', 'balance_after', 'engine_hours', 'description',
+    ('booking', FieldPlan(Booking, ['id', ('boat', BOAT_SUMMARY), 'start_date', 'end_date'])),
+    ('payment_intent', FieldPlan(PaymentIntent, [('id', 'stripe_payment_intent_id'), 'status', 'amount'])),
+    'created_at',
+])
+
+INQUIRY = FieldPlan(Inquiry, [
+    'id', Prop('full_name', 'first_name', 'last_name'), 'email', 'phone', 'company',
+    'inquiry_type', ('boat', FieldPlan(Boat, ['id', 'name', 'model'])), 'status', 'priority',
+    'source', Prop('budget_display', 'budget_range_min', 'budget_range_max'), 'timeline',
+    'lead_score', 'is_qualified', 'last_contact_date', 'next_follow_up_date', 'created_at',
+])
+
+NOTIFICATION = FieldPlan(Notification, [
+    'id', ('type', 'notification_type'), 'title', 'message', 'priority', 'action_url',
+    'action_text', 'is_read', 'is_archived', 'read_at', 'created_at', 'expires_at', 'metadata',
+])
@@ -1,5 +1,6 @@
 
 import os
+import sys
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -63,6 +64,11 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # On-disk test database: the in-memory one uses shared-cache table
+        # locks that fail instead of waiting, which breaks threaded tests
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -78,6 +84,52 @@ DATABASES = {
 #     }
 # }
 
+# Cache - CACHE_BACKEND picks locmem (per process), file (shared by workers
+# on one host) or redis (any Redis-compatible server at REDIS_URL, such as a
+# local redis-server or Valkey stand-in)
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'yachtak',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/0'),
+    },
+}
+CACHES = {
+    'default': {
+        **CACHE_BACKENDS[os.getenv('CACHE_BACKEND', 'locmem')],
+        'KEY_PREFIX': 'yachtak',
+        'TIMEOUT': 300,
+    }
+}
+
+# Directory the precompressed catalog snapshot is published to and shared
+# between workers from. Empty keeps each worker's snapshot in memory only:
+# a worker then never hears of catalog writes made in another worker and
+# serves its own snapshot until restarted, so use it with a single worker
+CATALOG_SNAPSHOT_DIR = os.getenv('CATALOG_SNAPSHOT_DIR', str(BASE_DIR / '.snapshots' / 'catalog'))
+
+# Rebuild the snapshot on a background thread shortly after catalog writes;
+# turn off to rebuild only with the publish_catalog_snapshot command. Until
+# a rebuild lands, catalog reads are served by the views
+CATALOG_SNAPSHOT_REBUILD_IN_BACKGROUND = os.getenv('CATALOG_SNAPSHOT_REBUILD_IN_BACKGROUND', 'true').lower() == 'true'
+
+# Tests keep snapshots in memory and out of the working tree, and never
+# rebuild on a thread that outlives the test's transaction
+if 'test' in sys.argv[1:2]:
+    CATALOG_SNAPSHOT_DIR = ''
+    CATALOG_SNAPSHOT_REBUILD_IN_BACKGROUND = False
+
+# Let concurrent identical requests in different workers wait on one
+# computation through a lock in the cache (needs the file or redis backend)
+SINGLE_FLIGHT_ACROSS_WORKERS = os.getenv('SINGLE_FLIGHT_ACROSS_WORKERS', 'false').lower() == 'true'
+
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
 USE_I18N = True
@@ -97,6 +149,17 @@ AUTH_USER_MODEL = 'accounts.User'
 #     'ROTATE_REFRESH_TOKENS': True,
 # }
 
+# Minutes a pending rental holds its dates while awaiting payment
+RENTAL_HOLD_MINUTES = int(os.getenv('RENTAL_HOLD_MINUTES', '30'))
+
+# Threads applying queued Stripe webhook events; each PaymentIntent's events
+# stay on one thread, in order
+STRIPE_WEBHOOK_WORKERS = int(os.getenv('STRIPE_WEBHOOK_WORKERS', '4'))
+
+# Drain the webhook inbox on a background thread as events arrive; turn off
+# when the process_webhook_events command runs as its own worker
+STRIPE_WEBHOOK_PROCESS_IN_BACKGROUND = os.getenv('STRIPE_WEBHOOK_PROCESS_IN_BACKGROUND', 'true').lower() == 'true'
+
 # Twilio SMS/OTP Configuration
 TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
@@ -0,0 +1,219 @@
+"""
+Single-Flight Requests
+Concurrent identical requests wait on one in-flight computation and share its result
+"""
+import threading
+import time
+import uuid
+from collections import Counter
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from .caching import request_fingerprint
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Counters for this process, per flight: leaders computed a result,
+# coalesced requests shared one computed in this worker, remote requests
+# shared one computed by another worker, timeouts gave up waiting
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def _count(name, event):
+    with _metrics_lock:
+        _metrics.setdefault(name, Counter())[event] += 1
+
+
+def single_flight_metrics():
+    """Leader, coalesced, remote, timeout and error counts per flight"""
+    with _metrics_lock:
+        return {name: dict(counts) for name, counts in _metrics.items()}
+
+
+def reset_single_flight_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+
+class _Call:
+    """One in-flight computation and the requests waiting on it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent computations of the same key
+    Within a worker, the first caller for a key computes and later callers
+    block until it finishes. With across_workers, the leader also takes a
+    lock in the cache backend and publishes its result there, so leaders in
+    other workers wait for it instead of computing again. across_workers
+    defaults to the SINGLE_FLIGHT_ACROSS_WORKERS setting, which needs a
+    cache shared between workers (file or redis). share(result) decides
+    whether a result may be handed to other workers. A waiter that times
+    out computes for itself.
+    """
+
+    def __init__(self, name, wait_timeout=10, across_workers=None, lock_ttl=30,
+                 poll_interval=0.05, share=None, alias='default'):
+        self.name = name
+        self.wait_timeout = wait_timeout
+        self.across_workers = across_workers
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self.share = share or (lambda result: True)
+        self.alias = alias
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, compute):
+        """Result of compute() for key, computed once for every concurrent caller"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if call.done.wait(self.wait_timeout):
+                _count(self.name, 'coalesced')
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            _count(self.name, 'timeouts')
+            return compute()
+
+        try:
+            call.result = self._lead(key, compute)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _shared(self):
+        if self.across_workers is None:
+            return getattr(settings, 'SINGLE_FLIGHT_ACROSS_WORKERS', False)
+        return self.across_workers
+
+    def _lead(self, key, compute):
+        if not self._shared():
+            _count(self.name, 'leaders')
+            return compute()
+
+        lock_key = f'flight:{self.name}:{key}'
+        token = uuid.uuid4().hex
+        try:
+            cache = caches[self.alias]
+            acquired = cache.add(lock_key, token, self.lock_ttl)
+            if not acquired:
+                result = self._await_remote(cache, lock_key)
+                if result is not None:
+                    _count(self.name, 'remote')
+                    return result
+        except Exception as e:
+            logger.warning(f"Single-flight lock unavailable for {self.name}: {e}")
+            _count(self.name, 'errors')
+            _count(self.name, 'leaders')
+            return compute()
+
+        _count(self.name, 'leaders')
+        try:
+            result = compute()
+            if acquired and self.share(result):
+                # Published under the lock's token so waiters never pick up
+                # the result of an earlier flight
+                cache.set(f'{lock_key}:{token}', result, self.lock_ttl)
+            return result
+        finally:
+            if acquired:
+                try:
+                    if cache.get(lock_key) == token:
+                        cache.delete(lock_key)
+                except Exception as e:
+                    logger.warning(f"Failed to release single-flight lock for {self.name}: {e}")
+
+    def _await_remote(self, cache, lock_key):
+        """Result published by the worker holding lock_key, or None to compute locally"""
+        deadline = time.monotonic() + self.wait_timeout
+        token = cache.get(lock_key)
+        while token is not None:
+            result = cache.get(f'{lock_key}:{token}')
+            if result is not None:
+                return result
+            if cache.get(lock_key) != token:
+                # The leader publishes before it releases the lock, so one
+                # more look finds its result unless it chose not to share
+                return cache.get(f'{lock_key}:{token}')
+            if time.monotonic() >= deadline:
+                _count(self.name, 'timeouts')
+                return None
+            time.sleep(self.poll_interval)
+        return None
+
+
+class _Streamed:
+    """A streaming response, handed to whichever caller takes it first"""
+
+    def __init__(self, response):
+        self.response = response
+        self._lock = threading.Lock()
+
+    def take(self):
+        with self._lock:
+            response, self.response = self.response, None
+        return response
+
+
+def _ok(entry):
+    return isinstance(entry, tuple) and entry[0] == 200
+
+
+def single_flight_view(name, vary=(), **options):
+    """
+    Coalesce concurrent identical GETs to a view
+    Requests are identical when their path and vary query parameters match.
+    Every waiter gets a copy of the leader's response with all its headers;
+    only 200 responses are shared across workers. A streaming response can
+    be read once, so it goes back untouched to one caller and the other
+    waiters run the view themselves. Streaming views should coalesce the
+    work underneath the stream with SingleFlight.do instead.
+    """
+    flight = SingleFlight(name, share=_ok, **options)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            def compute():
+                response = view(request, *args, **kwargs)
+                if response.streaming:
+                    return _Streamed(response)
+                return (response.status_code, list(response.items()), response.content)
+
+            result = flight.do(request_fingerprint(request, vary), compute)
+            if isinstance(result, _Streamed):
+                response = result.take()
+                return response if response is not None else view(request, *args, **kwargs)
+
+            status, headers, content = result
+            response = HttpResponse(content, status=status)
+            for header, value in headers:
+                response[header] = value
+            return response
+
+        wrapper.single_flight = flight
+        return wrapper
+
+    return decorator
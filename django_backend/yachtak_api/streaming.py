@@ -0,0 +1,139 @@
+"""
+Streaming Responses
+Constant-memory JSON, NDJSON and CSV bodies for large list exports
+"""
+import csv
+from django.http import StreamingHttpResponse
+from .serializers import dumps
+
+# Rows fetched from the database cursor per round trip
+STREAM_CHUNK_SIZE = 2000
+
+# Encoded rows are joined into writes of about this many bytes so the
+# server is not handed one tiny chunk per row
+STREAM_BUFFER_SIZE = 64 * 1024
+
+STREAM_FORMATS = ('json', 'ndjson')
+
+
+def stream_rows(queryset, serialize, chunk_size=None):
+    """
+    Serialized rows of queryset, read through a server-side cursor
+    iterator() skips the queryset result cache, so only one chunk of rows
+    is alive at a time. Pass a .values() queryset to skip building models.
+    Prefetches need an explicit chunk_size, which this always passes.
+    """
+    for obj in queryset.iterator(chunk_size=chunk_size or STREAM_CHUNK_SIZE):
+        yield serialize(obj)
+
+
+def _buffered(pieces):
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= STREAM_BUFFER_SIZE:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _json_pieces(key, rows, meta):
+    head = dumps(meta or {})[:-1]
+    yield head + (b',' if len(head) > 1 else b'') + dumps(key) + b':['
+    first = True
+    for row in rows:
+        yield dumps(row) if first else b',' + dumps(row)
+        first = False
+    yield b']}'
+
+
+def _ndjson_pieces(rows):
+    for row in rows:
+        yield dumps(row) + b'\n'
+
+
+def streaming_json_response(key, rows, meta=None, filename=None):
+    """
+    Stream {**meta, key: [rows...]} as one JSON document
+    meta is encoded up front, so it must not depend on the rows.
+    """
+    response = StreamingHttpResponse(
+        _buffered(_json_pieces(key, rows, meta)), content_type='application/json'
+    )
+    if filename:
+        response['Content-Disposition'] = f'attachment; filename="{filename}.json"'
+    return response
+
+
+def streaming_ndjson_response(rows, filename=None):
+    """Stream rows as newline-delimited JSON, one object per line"""
+    response = StreamingHttpResponse(
+        _buffered(_ndjson_pieces(rows)), content_type='application/x-ndjson'
+    )
+    if filename:
+        response['Content-Disposition'] = f'attachment; filename="{filename}.ndjson"'
+    return response
+
+
+class _Line:
+    """File-like target that hands back what csv.writer writes instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def _flatten(row, prefix=''):
+    flat = {}
+    for key, value in row.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f'{prefix}{key}.'))
+        else:
+            flat[prefix + key] = value
+    return flat
+
+
+def _csv_pieces(rows, columns):
+    writer = csv.writer(_Line())
+    yield writer.writerow(columns).encode()
+    for row in rows:
+        flat = _flatten(row)
+        yield writer.writerow([flat.get(column) for column in columns]).encode()
+
+
+def streaming_csv_response(rows, columns, filename=None):
+    """
+    Stream rows as CSV with a header line
+    Nested objects become dotted columns (booking.boat.name); columns fixes
+    their order, and a null nested object leaves its columns empty.
+    """
+    response = StreamingHttpResponse(
+        _buffered(_csv_pieces(rows, columns)), content_type='text/csv; charset=utf-8'
+    )
+    if filename:
+        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def stream_format(request, formats=STREAM_FORMATS):
+    """Export format from ?format=, json unless another of formats is asked for"""
+    fmt = request.GET.get('format', 'json')
+    if fmt not in formats:
+        raise ValueError(f"format must be one of: {', '.join(formats)}")
+    return fmt
+
+
+def streaming_export(request, key, rows, meta=None, filename=None, csv_columns=None):
+    """
+    JSON or NDJSON streaming response for rows, following ?format=
+    Passing csv_columns also allows format=csv with those columns.
+    """
+    fmt = stream_format(request, STREAM_FORMATS + ('csv',) if csv_columns else STREAM_FORMATS)
+    if fmt == 'csv':
+        return streaming_csv_response(rows, csv_columns, filename=filename)
+    if fmt == 'ndjson':
+        return streaming_ndjson_response(rows, filename=filename)
+    return streaming_json_response(key, rows, meta=meta, filename=filename)
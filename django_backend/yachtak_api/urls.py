@@ -2,7 +2,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.http import JsonResponse
-from .health_views import health_check, database_health, test_all_systems, api_status
+from .health_views import health_check, database_health, test_all_systems, api_status, cache_health
 
 def healthz(request):
     """Health check endpoint - Task 15 requirement"""
@@ -31,4 +31,5 @@ urlpatterns = [
     path('health/database/', database_health, name='database_health'),
     path('health/test-systems/', test_all_systems, name='test_all_systems'),
     path('health/api/', api_status, name='api_status'),
+    path('health/cache/', cache_health, name='cache_health'),
 ]
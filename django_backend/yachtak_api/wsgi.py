@@ -1,6 +1,23 @@
 
 import os
+import logging
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yachtak_api.settings')
 application = get_wsgi_application()
+
+# Build the autocomplete index before the first keystroke arrives; a
+# failure here only means the first lookup builds it instead
+try:
+    from boats.autocomplete import get_autocomplete_index
+    get_autocomplete_index()
+except Exception as e:
+    logging.getLogger(__name__).warning(f"Autocomplete index not built at startup: {e}")
+
+# Publish (or load) the catalog snapshot up front; requests never build it,
+# and fall through to the catalog views until it exists
+try:
+    from boats.snapshot import warm_snapshot
+    warm_snapshot()
+except Exception as e:
+    logging.getLogger(__name__).warning(f"Catalog snapshot not published at startup: {e}")